@@ -0,0 +1,333 @@
+"""
+Content-addressed cache of images built by subtests, kept across jobs
+
+``build()`` hashes the Dockerfile, every file in the build context
+directory, the IDs of all ``FROM`` base images and the build options
+into a ``CACHE_REPO/<hash>`` image name.  When that image already exists
+it's re-tagged instead of re-built, otherwise it's built with that name.
+Either way the name is added to the subtest's ``preserve_fqins``, and
+every cached name is preserved by deferred cleanup and the
+``garbage_check`` intratest.  The ``build_cache_index`` file records
+when each entry was last used, the least recently used entries are
+removed once there are more than ``build_cache_max_entries`` of them,
+or they total more than ``build_cache_max_mb``.
+
+Subtests exercising ``docker build`` itself should set ``build_cache``
+to ``no``, then ``build()`` always runs a plain ``docker build``.  So
+does any build with one of the ``FRESH_OPTIONS`` (e.g. ``--no-cache``),
+since a cached image is exactly what those options ask to avoid.
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import fcntl
+import hashlib
+import json
+import os
+import shlex
+import stat
+import threading
+import time
+from config import get_as_list
+from dockercmd import DockerCmd
+from output import mustpass
+
+
+#: Repository name of every cached image
+CACHE_REPO = 'dockertest-cache'
+
+#: Number of hash hex digits used in cached image names
+HASH_DIGITS = 32
+
+#: Build options requesting a fresh build, which is never cached
+FRESH_OPTIONS = ('--no-cache', '--pull')
+
+#: Serializes index updates from threaded subtests, fcntl only locks processes
+_LOCK = threading.Lock()
+
+
+def enabled(config):
+    """Return True if caching is enabled, and has an index file"""
+    return bool(config.get('build_cache', False) and
+                config.get('build_cache_index'))
+
+
+def split_tags(subargs):
+    """
+    Return (options, tags) from list of ``docker build`` option strings
+
+    :param subargs: List of options, any item may hold several (e.g.
+                    ``'--force-rm -t name'``)
+    """
+    words = []
+    for subarg in subargs:
+        words += shlex.split(subarg)
+    options = []
+    tags = []
+    words = iter(words)
+    for word in words:
+        if word in ('-t', '--tag'):
+            tags.append(next(words))
+        elif word.startswith('--tag='):
+            tags.append(word[len('--tag='):])
+        else:
+            options.append(word)
+    return options, tags
+
+
+def wants_fresh(options):
+    """
+    Return True if any of options is one of the enabled ``FRESH_OPTIONS``
+
+    :param options: List of build options, as returned by ``split_tags()``
+    """
+    for option in options:
+        name, _, value = option.partition('=')
+        if name in FRESH_OPTIONS and value.lower() not in ('false', '0'):
+            return True
+    return False
+
+
+def base_images(dockerfile):
+    """
+    Return list of images named by ``FROM`` instructions in dockerfile
+
+    :param dockerfile: Contents of a Dockerfile
+    """
+    images = []
+    stages = set()
+    for line in dockerfile.splitlines():
+        words = line.split()
+        if len(words) < 2 or words[0].upper() != 'FROM':
+            continue
+        # Later stages may build FROM an earlier stage
+        if words[1].lower() not in stages:
+            images.append(words[1])
+        if len(words) > 3 and words[2].upper() == 'AS':
+            stages.add(words[3].lower())
+    return images
+
+
+def context_digest(contextdir):
+    """
+    Return hex digest of every path, mode and file content in contextdir
+
+    ``.dockerignore`` is not applied, which only makes the cache miss
+    more often.
+    """
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(contextdir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            relpath = os.path.relpath(path, contextdir)
+            mode = os.lstat(path).st_mode
+            digest.update('%s\0%o\0' % (relpath, stat.S_IMODE(mode)))
+            if stat.S_ISLNK(mode):
+                digest.update(os.readlink(path))
+            else:
+                with open(path, 'rb') as context_file:
+                    for chunk in iter(lambda: context_file.read(65536), ''):
+                        digest.update(chunk)
+            digest.update('\0')
+    return digest.hexdigest()
+
+
+def image_id(subtest, name):
+    """Return ID of local image name, or None if it doesn't exist"""
+    cmdresult = DockerCmd(subtest, 'inspect',
+                          ['--type=image', '--format={{.Id}}', name],
+                          verbose=False).execute()
+    if cmdresult.exit_status != 0:
+        return None
+    return cmdresult.stdout.strip() or None
+
+
+def cache_fqin(subtest, contextdir, options, dockerfile=None):
+    """
+    Return cached image name for build, or None if it can't be cached
+
+    :param subtest: ``Subtest`` or ``SubSubtest`` instance building
+    :param contextdir: Build context, only local directories are cacheable
+    :param options: List of build options, excluding tags
+    :param dockerfile: Dockerfile path, or None for one in contextdir
+    """
+    if not os.path.isdir(contextdir):
+        return None
+    if dockerfile is None:
+        dockerfile = os.path.join(contextdir, 'Dockerfile')
+    with open(dockerfile, 'rb') as dockerfile_file:
+        contents = dockerfile_file.read()
+    digest = hashlib.sha256()
+    digest.update('%s\0' % contents)
+    for name in base_images(contents):
+        base_id = image_id(subtest, name)
+        if base_id is None:
+            subtest.logdebug("Not caching build, base image %s is not "
+                             "present", name)
+            return None
+        digest.update('%s\0' % base_id)
+    digest.update('%s\0' % context_digest(contextdir))
+    digest.update('\0'.join(options))
+    return '%s/%s' % (CACHE_REPO, digest.hexdigest()[:HASH_DIGITS])
+
+
+def preserve(config, fqin):
+    """Add fqin to the ``preserve_fqins`` CSV in config"""
+    fqins = get_as_list(config.get('preserve_fqins') or '')
+    if fqin not in fqins:
+        config['preserve_fqins'] = ','.join(fqins + [fqin])
+
+
+class Index(object):
+
+    """
+    Locked read/modify/write of the ``build_cache_index`` JSON file
+
+    Entries map cached image names to dictionaries of ``used`` time,
+    ``size`` bytes and the ``test`` which built them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock_file = None
+
+    def __enter__(self):
+        _LOCK.acquire()
+        try:
+            dirpath = os.path.dirname(self.path)
+            if dirpath and not os.path.isdir(dirpath):
+                os.makedirs(dirpath)
+            self._lock_file = open(self.path + '.lock', 'ab')
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.path, 'rb') as index_file:
+                    self.entries = json.load(index_file)
+            except (IOError, ValueError):
+                self.entries = {}
+        except:
+            self._release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                # Never leave a partially written index
+                temp_path = self.path + '.tmp'
+                with open(temp_path, 'wb') as index_file:
+                    json.dump(self.entries, index_file, indent=2,
+                              sort_keys=True)
+                os.rename(temp_path, self.path)
+        finally:
+            self._release()
+
+    def _release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # Also unlocks
+            self._lock_file = None
+        _LOCK.release()
+
+    def expired(self, max_entries, max_bytes, keep=()):
+        """
+        Return least recently used names beyond limits, dropping them
+
+        :param max_entries: Maximum number of entries to keep
+        :param max_bytes: Maximum total size of entries to keep
+        :param keep: Names never expired
+        """
+        by_age = sorted(self.entries.iteritems(),
+                        key=lambda item: item[1]['used'])
+        total = sum(entry['size'] for _, entry in by_age)
+        count = len(by_age)
+        expired = []
+        for name, entry in by_age:
+            if count <= max_entries and total <= max_bytes:
+                break
+            if name in keep:
+                continue
+            expired.append(name)
+            del self.entries[name]
+            count -= 1
+            total -= entry['size']
+        return expired
+
+
+def cached_fqins(config):
+    """Return list of cached image names, empty if caching is disabled"""
+    if not enabled(config):
+        return []
+    try:
+        with open(config['build_cache_index'], 'rb') as index_file:
+            return sorted(json.load(index_file))
+    except (IOError, ValueError):
+        return []
+
+
+def record(subtest, fqin):
+    """Mark fqin used now, remove expired entries"""
+    config = subtest.config
+    cmdresult = DockerCmd(subtest, 'inspect',
+                          ['--type=image', '--format={{.Size}}', fqin],
+                          verbose=False).execute()
+    try:
+        size = int(cmdresult.stdout.strip())
+    except ValueError:
+        size = 0
+    max_entries = int(config.get('build_cache_max_entries', 20))
+    max_bytes = float(config.get('build_cache_max_mb', 4096)) * 1024 * 1024
+    with Index(config['build_cache_index']) as index:
+        index.entries[fqin] = {'used': time.time(), 'size': size,
+                               'test': subtest.config_section}
+        expired = index.expired(max_entries, max_bytes, keep=(fqin,))
+    if not expired:
+        return
+    subtest.logdebug("Expiring least recently used build cache "
+                     "images: %s", ', '.join(expired))
+    cmdresult = DockerCmd(subtest, 'rmi', ['--force'] + expired,
+                          verbose=False).execute()
+    if cmdresult.exit_status != 0:
+        subtest.logwarning("Failed to expire build cache images: %s",
+                           cmdresult.stderr.strip())
+
+
+def build(subtest, contextdir, subargs=None, dockerfile=None):
+    """
+    Build (or re-use) image, tagging it with any ``-t`` names in subargs
+
+    :param subtest: ``Subtest`` or ``SubSubtest`` instance building
+    :param contextdir: Build context directory, or URL (never cached)
+    :param subargs: List of ``docker build`` options, any of
+                    ``FRESH_OPTIONS`` disables caching
+    :param dockerfile: Dockerfile path, or None for one in contextdir
+    :raise DockerExecError: If a docker command fails
+    :return: Cached image name, or None if it wasn't cached
+    """
+    subargs = list(subargs or [])
+    fqin = None
+    if enabled(subtest.config):
+        options, tags = split_tags(subargs)
+        if wants_fresh(options):
+            subtest.logdebug("Not caching build, options request a fresh "
+                             "build: %s", ' '.join(options))
+        else:
+            fqin = cache_fqin(subtest, contextdir, options, dockerfile)
+    # Dockerfile's contents are hashed, not it's path
+    if dockerfile is not None:
+        subargs += ['--file', dockerfile]
+    if fqin is None:
+        mustpass(DockerCmd(subtest, 'build',
+                           subargs + [contextdir]).execute())
+        return None
+    if image_id(subtest, fqin) is None:
+        mustpass(DockerCmd(subtest, 'build',
+                           subargs + ['-t', fqin, contextdir]).execute())
+    else:
+        subtest.loginfo("Reusing cached build %s", fqin)
+        for tag in tags:
+            mustpass(DockerCmd(subtest, 'tag', [fqin, tag]).execute())
+    preserve(subtest.config, fqin)
+    record(subtest, fqin)
+    return fqin
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+
+def mock(mod_path):
+    name_list = mod_path.split('.')
+    child_name = name_list.pop()
+    child_mod = sys.modules.get(mod_path, types.ModuleType(child_name))
+    if len(name_list) == 0:  # child_name is left-most basic module
+        if child_name not in sys.modules:
+            sys.modules[child_name] = child_mod
+        return sys.modules[child_name]
+    else:
+        # New or existing child becomes parent
+        recurse_path = ".".join(name_list)
+        parent_mod = mock(recurse_path)
+        if not hasattr(sys.modules[recurse_path], child_name):
+            setattr(parent_mod, child_name, child_mod)
+            # full-name also points at child module
+            sys.modules[mod_path] = child_mod
+        return sys.modules[mod_path]
+
+
+class FakeCmdResult(object):
+
+    def __init__(self, **dargs):
+        for key, val in dargs.items():
+            setattr(self, key, val)
+
+    def __str__(self):
+        return self.command
+
+#: Commands run, and names of images which exist (mapped to their ID)
+RUN_CACHE = []
+IMAGES = {}
+
+
+def run(command, *args, **dargs):
+    RUN_CACHE.append(command)
+    words = command.split()
+    stdout = ''
+    exit_status = 0
+    if words[1] == 'inspect':
+        if words[-1] not in IMAGES:
+            exit_status = 1
+        elif words[-2] == '--format={{.Size}}':
+            stdout = '1048576\n'
+        else:
+            stdout = IMAGES[words[-1]] + '\n'
+    elif words[1] == 'build':
+        for index, word in enumerate(words):
+            if word == '-t':
+                IMAGES[words[index + 1]] = 'sha256:built'
+    elif words[1] == 'rmi':
+        for name in words[3:]:
+            IMAGES.pop(name, None)
+    return FakeCmdResult(command=command, stdout=stdout, stderr='',
+                         exit_status=exit_status, duration=0)
+
+# Mock module and mock function run in one command
+setattr(mock('autotest.client.utils'), 'run', run)
+setattr(mock('autotest.client.utils'), 'CmdResult', FakeCmdResult)
+setattr(mock('autotest.client.shared.error'), 'CmdError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestFail', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestNAError', Exception)
+setattr(mock('autotest.client.shared.error'), 'AutotestError', Exception)
+mock('autotest.client.shared.utils')
+
+
+class BuildCacheTestBase(unittest.TestCase):
+
+    def setUp(self):
+        import buildcache
+        import subtestbase
+        self.buildcache = buildcache
+        del RUN_CACHE[:]
+        IMAGES.clear()
+        IMAGES['busybox:latest'] = 'sha256:base'
+        self.tmpdir = tempfile.mkdtemp(self.__class__.__name__)
+        self.context = os.path.join(self.tmpdir, 'context')
+        os.mkdir(self.context)
+        self.write('Dockerfile', 'FROM busybox:latest\nADD script /\n')
+        self.write('script', '#!/bin/sh\ntrue\n')
+        self.index_path = os.path.join(self.tmpdir, 'cache', 'index.json')
+        config = {'docker_path': '/usr/bin/docker', 'docker_options': '',
+                  'docker_timeout': 60.0, 'preserve_fqins': 'busybox:latest',
+                  'build_cache': True, 'build_cache_index': self.index_path,
+                  'build_cache_max_entries': 20, 'build_cache_max_mb': 4096}
+
+        class FakeSubtest(subtestbase.SubBase):
+            config_section = 'docker_cli/fake'
+
+        self.subtest = FakeSubtest()
+        self.subtest.config = config
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        del self.buildcache
+
+    def write(self, filename, contents):
+        with open(os.path.join(self.context, filename), 'wb') as new_file:
+            new_file.write(contents)
+
+    def commands(self, subcmd):
+        return [command for command in RUN_CACHE
+                if command.split()[1] == subcmd]
+
+    def index(self):
+        with open(self.index_path, 'rb') as index_file:
+            return json.load(index_file)
+
+
+class HelpersTest(BuildCacheTestBase):
+
+    def test_split_tags(self):
+        self.assertEqual(self.buildcache.split_tags(['--force-rm -t foo',
+                                                     '--tag=bar', '--pull',
+                                                     '--tag', 'baz']),
+                         (['--force-rm', '--pull'], ['foo', 'bar', 'baz']))
+
+    def test_base_images(self):
+        dockerfile = ("# FROM comment\nFROM golang:1 AS builder\n"
+                      "RUN make\nfrom busybox\nCOPY --from=builder / /\n"
+                      "FROM builder\n")
+        self.assertEqual(self.buildcache.base_images(dockerfile),
+                         ['golang:1', 'busybox'])
+
+    def test_context_digest(self):
+        digest = self.buildcache.context_digest
+        first = digest(self.context)
+        self.assertEqual(digest(self.context), first)
+        os.chmod(os.path.join(self.context, 'script'), 0755)
+        second = digest(self.context)
+        self.assertNotEqual(second, first)
+        self.write('script', '#!/bin/sh\nfalse\n')
+        self.assertNotEqual(digest(self.context), second)
+
+    def test_cache_fqin(self):
+        fqin = self.buildcache.cache_fqin(self.subtest, self.context, [])
+        self.assertTrue(fqin.startswith('dockertest-cache/'))
+        self.assertEqual(len(fqin.split('/')[1]),
+                         self.buildcache.HASH_DIGITS)
+        self.assertNotEqual(self.buildcache.cache_fqin(self.subtest,
+                                                       self.context,
+                                                       ['--pull']), fqin)
+        IMAGES['busybox:latest'] = 'sha256:updated'
+        self.assertNotEqual(self.buildcache.cache_fqin(self.subtest,
+                                                       self.context, []),
+                            fqin)
+        del IMAGES['busybox:latest']
+        self.assertEqual(self.buildcache.cache_fqin(self.subtest,
+                                                    self.context, []), None)
+
+
+class BuildTest(BuildCacheTestBase):
+
+    def test_miss_then_hit(self):
+        fqin = self.buildcache.build(self.subtest, self.context,
+                                     ['--force-rm -t foo'])
+        build = self.commands('build')
+        self.assertEqual(build, ['/usr/bin/docker build --force-rm -t foo '
+                                 '-t %s %s' % (fqin, self.context)])
+        self.assertIn(fqin, self.subtest.config['preserve_fqins'])
+        self.assertEqual(self.index()[fqin]['size'], 1048576)
+        self.assertEqual(self.buildcache.cached_fqins(self.subtest.config),
+                         [fqin])
+        del RUN_CACHE[:]
+        self.assertEqual(self.buildcache.build(self.subtest, self.context,
+                                               ['--force-rm -t foo']), fqin)
+        self.assertEqual(self.commands('build'), [])
+        self.assertEqual(self.commands('tag'),
+                         ['/usr/bin/docker tag %s foo' % fqin])
+
+    def test_disabled(self):
+        self.subtest.config['build_cache'] = False
+        self.assertEqual(self.buildcache.build(self.subtest, self.context,
+                                               ['-t foo']), None)
+        self.assertEqual(self.commands('build'),
+                         ['/usr/bin/docker build -t foo %s' % self.context])
+        self.assertFalse(os.path.exists(self.index_path))
+        self.assertEqual(self.buildcache.cached_fqins(self.subtest.config),
+                         [])
+
+    def test_fresh(self):
+        for options in (['--no-cache -t foo'], ['--pull=true', '-t', 'foo']):
+            del RUN_CACHE[:]
+            self.assertEqual(self.buildcache.build(self.subtest, self.context,
+                                                   options), None)
+            self.assertEqual(self.commands('build'),
+                             ['/usr/bin/docker build %s %s'
+                              % (' '.join(options), self.context)])
+        self.assertFalse(os.path.exists(self.index_path))
+        self.assertFalse(self.buildcache.wants_fresh(['--pull=false',
+                                                      '--force-rm']))
+
+    def test_url(self):
+        url = 'https://example.com/context.tar.gz'
+        self.assertEqual(self.buildcache.build(self.subtest, url,
+                                               ['-t', 'foo']), None)
+        self.assertEqual(self.commands('build'),
+                         ['/usr/bin/docker build -t foo %s' % url])
+
+    def test_expire(self):
+        self.subtest.config['build_cache_max_entries'] = 1
+        first = self.buildcache.build(self.subtest, self.context)
+        self.write('script', 'changed')
+        second = self.buildcache.build(self.subtest, self.context)
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.commands('rmi'),
+                         ['/usr/bin/docker rmi --force %s' % first])
+        self.assertEqual(self.index().keys(), [second])
+        self.assertNotIn(first, IMAGES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403,C0413
+
+from StringIO import StringIO
+import microbench
+microbench.mock_autotest()
+from config import ConfigDict
+
+
+def ini_text(size):
+    """Return ini-file contents with size options of assorted types"""
+    lines = ['[bench]']
+    for num in xrange(size):
+        lines.append('#: Documentation for option number %d' % num)
+        lines.append(('int_%d = %d', 'float_%d = %d.5', 'bool_%d = %s',
+                      'str_%d = value %d, %%(int_0)s')[num % 4]
+                     % (num, num if num % 4 != 2 else bool(num % 3)))
+    return '\n'.join(lines) + '\n'
+
+
+class ConfigDictRead(microbench.Benchmark):
+
+    def setup(self, size):
+        self.ini = StringIO(ini_text(size))
+
+    def run(self):
+        ConfigDict('bench').read(self.ini)
+
+
+class ConfigDictGetAll(microbench.Benchmark):
+
+    def setup(self, size):
+        self.configdict = ConfigDict('bench')
+        self.configdict.read(StringIO(ini_text(size)))
+
+    def run(self):
+        return [self.configdict[key] for key in self.configdict]
+
+
+if __name__ == '__main__':
+    microbench.main()
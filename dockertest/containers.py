@@ -24,12 +24,14 @@ Where/when ***possible***, both parameters and return values follow this order:
 # pylint: disable=W0403
 
 import json
+import time
 from autotest.client import utils
 from autotest.client.shared import error
 from output import OutputGood
 from output import TextTable
 from config import get_as_list
 from subtestbase import SubBase
+import tracer
 from xceptions import DockerTestError
 
 
@@ -253,9 +255,18 @@ class DockerContainers(object):
                                  cmd))
         if timeout is None:
             timeout = self.timeout
-        return utils.run(docker_cmd,
-                         verbose=self.verbose,
-                         timeout=timeout)
+        start = time.time()
+        cmdresult = None
+        try:
+            cmdresult = utils.run(docker_cmd,
+                                  verbose=self.verbose,
+                                  timeout=timeout)
+            return cmdresult
+        except error.CmdError, detail:
+            cmdresult = getattr(detail, 'result_obj', None)
+            raise
+        finally:
+            tracer.record(self.subtest, cmd, docker_cmd, start, cmdresult)
 
     def docker_cmd_check(self, cmd, timeout=None):
         """
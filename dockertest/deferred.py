@@ -0,0 +1,144 @@
+"""
+Bulk, concurrent removal of things registered by ``SubBase.defer_cleanup()``
+
+Each owner's containers are removed with a single ``docker rm`` command,
+and images with a single ``docker rmi``.  Owners are processed
+concurrently, one kind at a time in ``DEFERRED_CLEANUP_KINDS`` order, so
+no image is removed while a container might still be using it.
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import os.path
+import shutil
+from multiprocessing.pool import ThreadPool
+import buildcache
+from config import get_as_list
+from dockercmd import DockerCmd
+from images import DockerImage
+import reaper
+from subtestbase import DEFERRED_CLEANUP_KINDS
+
+
+def preserved(subtest, kind):
+    """
+    Return set of container or image names configured to never remove
+
+    :param subtest: ``Subtest`` instance draining deferred cleanups
+    :param kind: ``'container'`` or ``'image'``
+    """
+    if kind == 'container':
+        return set(get_as_list(subtest.config.get('preserve_cnames') or ''))
+    names = set(get_as_list(subtest.config.get('preserve_fqins') or ''))
+    names.add(DockerImage.full_name_from_defaults(subtest.config))
+    names.update(buildcache.cached_fqins(subtest.config))
+    return names
+
+
+def remove_docker(subtest, subcmd, subargs, names):
+    """
+    Remove names with one docker command, return error message or None
+
+    Names which no longer exist (e.g. removed by ``cleanup()``) are okay.
+
+    :param subtest: ``Subtest`` instance draining deferred cleanups
+    :param subcmd: ``'rm'`` or ``'rmi'``
+    :param subargs: List of options for subcmd
+    :param names: List of container or image names/IDs
+    """
+    cmdresult = DockerCmd(subtest, subcmd, subargs + names,
+                          verbose=False).execute()
+    if cmdresult.exit_status == 0:
+        return None
+    errors = [line for line in cmdresult.stderr.splitlines()
+              if line.strip() and 'No such' not in line]
+    if not errors:
+        return None
+    return '\n'.join(errors)
+
+
+def remove_containers(subtest, names):
+    """Force removal of containers and their volumes, see remove_docker()"""
+    if reaper.submit(subtest, 'container', names):
+        return None
+    return remove_docker(subtest, 'rm', ['--force', '--volumes'], names)
+
+
+def remove_images(subtest, names):
+    """Force removal of images, see remove_docker()"""
+    if reaper.submit(subtest, 'image', names):
+        return None
+    return remove_docker(subtest, 'rmi', ['--force'], names)
+
+
+def remove_tmpdirs(subtest, paths):  # pylint: disable=W0613
+    """Recursively remove directory paths, return error message or None"""
+    errors = []
+    for path in paths:
+        if not os.path.isdir(path):
+            continue
+        try:
+            shutil.rmtree(path)
+        except (IOError, OSError), xcept:
+            errors.append('%s: %s' % (path, xcept))
+    if not errors:
+        return None
+    return '\n'.join(errors)
+
+
+#: Mapping of ``DEFERRED_CLEANUP_KINDS`` to removal functions
+REMOVERS = {'container': remove_containers,
+            'image': remove_images,
+            'tmpdir': remove_tmpdirs}
+
+
+def drain(subtest, registries, workers):
+    """
+    Remove everything registered, in bulk, with up to ``workers`` threads
+
+    :param subtest: ``Subtest`` instance draining deferred cleanups
+    :param registries: List of (owner name, ``SubBase.deferred_cleanup``)
+    :param workers: Maximum number of concurrent removal commands
+    :return: Set of owner names with any removal failures (logged)
+    """
+    failures = set()
+    for kind in DEFERRED_CLEANUP_KINDS:
+        if kind == 'tmpdir':
+            keep = set()
+        elif not subtest.config.get('remove_after_test', True):
+            keep = None  # Everything
+        else:
+            keep = preserved(subtest, kind)
+        batches = []
+        for owner, registry in registries:
+            names = registry[kind]
+            # Registries are drained, even if nothing is removed
+            registry[kind] = []
+            if keep is None:
+                continue
+            names = [name for name in names if name not in keep]
+            if names:
+                batches.append((owner, names))
+        if not batches:
+            continue
+        remover = REMOVERS[kind]
+        call = lambda batch, remover=remover: remover(subtest, batch[1])
+        if workers > 1 and len(batches) > 1:
+            pool = ThreadPool(min(workers, len(batches)))
+            try:
+                errors = pool.map(call, batches)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            errors = [call(batch) for batch in batches]
+        for (owner, names), error in zip(batches, errors):
+            if error is None:
+                subtest.logdebug("Removed deferred %s cleanups of %s: %s",
+                                 kind, owner, ', '.join(names))
+            else:
+                failures.add(owner)
+                subtest.logerror("Deferred %s cleanup of %s failed: %s",
+                                 kind, owner, error)
+    return failures
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+
+def mock(mod_path):
+    name_list = mod_path.split('.')
+    child_name = name_list.pop()
+    child_mod = sys.modules.get(mod_path, types.ModuleType(child_name))
+    if len(name_list) == 0:  # child_name is left-most basic module
+        if child_name not in sys.modules:
+            sys.modules[child_name] = child_mod
+        return sys.modules[child_name]
+    else:
+        # New or existing child becomes parent
+        recurse_path = ".".join(name_list)
+        parent_mod = mock(recurse_path)
+        if not hasattr(sys.modules[recurse_path], child_name):
+            setattr(parent_mod, child_name, child_mod)
+            # full-name also points at child module
+            sys.modules[mod_path] = child_mod
+        return sys.modules[mod_path]
+
+
+class FakeCmdResult(object):
+
+    def __init__(self, **dargs):
+        for key, val in dargs.items():
+            setattr(self, key, val)
+
+#: Commands run, and stderr to fail with for commands containing a key
+RUN_CACHE = []
+RUN_ERRORS = {}
+
+
+def run(command, *args, **dargs):
+    RUN_CACHE.append(command)
+    stderr = ''
+    for substring, error in RUN_ERRORS.items():
+        if substring in command:
+            stderr = error
+    return FakeCmdResult(command=command, stdout='', stderr=stderr,
+                         exit_status=int(bool(stderr)), duration=0)
+
+# Mock module and mock function run in one command
+setattr(mock('autotest.client.utils'), 'run', run)
+setattr(mock('autotest.client.utils'), 'CmdResult', FakeCmdResult)
+setattr(mock('autotest.client.shared.error'), 'CmdError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestFail', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestNAError', Exception)
+setattr(mock('autotest.client.shared.error'), 'AutotestError', Exception)
+mock('autotest.client.shared.utils')
+
+
+class DeferredTest(unittest.TestCase):
+
+    config = {'docker_path': '/usr/bin/docker', 'docker_options': '',
+              'docker_timeout': 60.0, 'remove_after_test': True,
+              'preserve_cnames': 'keeper', 'preserve_fqins': '',
+              'docker_repo_name': 'busybox', 'docker_repo_tag': 'latest',
+              'docker_registry_host': '', 'docker_registry_user': ''}
+
+    def setUp(self):
+        import deferred
+        import subtestbase
+        self.deferred = deferred
+        del RUN_CACHE[:]
+        RUN_ERRORS.clear()
+        self.tmpdir = tempfile.mkdtemp(self.__class__.__name__)
+
+        class FakeSubtest(subtestbase.SubBase):
+            config = dict(self.config)
+
+        self.subtest = FakeSubtest()
+        self.owners = []
+        for name in ('one', 'two'):
+            owner = FakeSubtest()
+            tmpdir = os.path.join(self.tmpdir, name)
+            os.mkdir(tmpdir)
+            owner.defer_cleanup('tmpdir', tmpdir)
+            owner.defer_cleanup('image', '%s_image' % name, 'busybox:latest')
+            owner.defer_cleanup('container', '%s_a' % name, '%s_b' % name,
+                                'keeper')
+            self.owners.append((name, owner.deferred_cleanup))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        del self.deferred
+
+    def test_bulk_ordered(self):
+        failures = self.deferred.drain(self.subtest, self.owners, 2)
+        self.assertEqual(failures, set())
+        self.assertEqual(len(RUN_CACHE), 4)
+        # Containers before any image, preserved names excluded
+        self.assertEqual(sorted(RUN_CACHE[:2]),
+                         ['/usr/bin/docker rm --force --volumes one_a one_b',
+                          '/usr/bin/docker rm --force --volumes two_a two_b'])
+        self.assertEqual(sorted(RUN_CACHE[2:]),
+                         ['/usr/bin/docker rmi --force one_image',
+                          '/usr/bin/docker rmi --force two_image'])
+        self.assertEqual(os.listdir(self.tmpdir), [])
+        for _, registry in self.owners:
+            self.assertEqual(sum(registry.values(), []), [])
+
+    def test_failures(self):
+        RUN_ERRORS['one_image'] = 'Error: image is referenced'
+        RUN_ERRORS['two_a'] = 'Error: No such container: two_a'
+        failures = self.deferred.drain(self.subtest, self.owners, 1)
+        self.assertEqual(failures, set(['one']))
+
+    def test_remove_after_test(self):
+        self.subtest.config['remove_after_test'] = False
+        self.deferred.drain(self.subtest, self.owners, 2)
+        self.assertEqual(RUN_CACHE, [])
+        # Temporary directories are always removed
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_unknown_kind(self):
+        self.assertRaises(ValueError, self.subtest.defer_cleanup, 'volume',
+                          'foo')
+
+
+if __name__ == '__main__':
+    unittest.main()
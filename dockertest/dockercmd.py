@@ -9,6 +9,7 @@ Frequently used docker CLI operations/data
 import time
 from autotest.client import utils
 from subtestbase import SubBase
+import tracer
 from xceptions import DockerNotImplementedError
 from xceptions import DockerExecError, DockerTestError
 from xceptions import DockerCommandError
@@ -43,6 +44,10 @@ class DockerCmdBase(object):
     #: Silence all logging messages
     quiet = False
 
+    #: Optional file-like object also receiving stdout ``write()``\s as
+    #: output arrives, before the command finishes.
+    stdout_tee = None
+
     def __init__(self, subtest, subcmd, subargs=None, timeout=None,
                  verbose=True):
         self._cmdresult = None
@@ -280,14 +285,40 @@ class DockerCmd(DockerCmdBase):  # pylint: disable=R0903
         else:
             str_stdin = ""
         if self.verbose:
-            self.subtest.logdebug("Executing %s%s", str(self), str_stdin)
-        self.cmdresult = utils.run(self.command, timeout=self.timeout,
-                                   stdin=stdin, verbose=False,
-                                   ignore_status=True)
+            self.subtest.logdebug("Executing %s%s", self, str_stdin)
+        start = time.time()
+        cmdresult = None
+        try:
+            cmdresult = utils.run(self.command, timeout=self.timeout,
+                                  stdin=stdin, verbose=False,
+                                  ignore_status=True,
+                                  stdout_tee=self.stdout_tee)
+        finally:
+            tracer.record(self.subtest, self.subcmd, self.command, start,
+                          cmdresult)
+        self.cmdresult = cmdresult
         # Return value, not reference
         return self.cmdresult
 
 
+class PipedDockerCmd(DockerCmd):  # pylint: disable=R0903
+
+    """
+    DockerCmd whose subargs pipe through (``|``) further shell commands
+
+    The exit status is non-zero if any command in the pipeline fails,
+    not only the last one.
+    """
+
+    @property
+    def command(self):
+        """
+        String representation of command + subcommand & args, with pipefail
+        """
+        return ("set -o pipefail; %s"
+                % super(PipedDockerCmd, self).command)
+
+
 class AsyncDockerCmd(DockerCmdBase):
 
     """
@@ -297,6 +328,9 @@ class AsyncDockerCmd(DockerCmdBase):
     #: Private, class assumes exclusive access and no locking is performed
     _async_job = None
 
+    #: Private, ``time.time()`` of last ``execute()``, None once traced
+    _trace_start = None
+
     def execute(self, stdin=None):
         """
         Start execution of asynchronous docker command
@@ -319,9 +353,11 @@ class AsyncDockerCmd(DockerCmdBase):
         else:
             str_stdin = ""
         if self.verbose:
-            self.subtest.logdebug("Async-execute: %s%s", str(self), str_stdin)
+            self.subtest.logdebug("Async-execute: %s%s", self, str_stdin)
+        self._trace_start = time.time()
         self._async_job = utils.AsyncJob(self.command, verbose=False,
-                                         stdin=stdin, close_fds=True)
+                                         stdin=stdin, close_fds=True,
+                                         stdout_tee=self.stdout_tee)
         return self.cmdresult
 
     def wait_for_ready(self, cid=None, timeout=None, timestep=0.2):
@@ -388,7 +424,13 @@ class AsyncDockerCmd(DockerCmdBase):
             self.subtest.logdebug("Waiting %s for async-command to finish",
                                   timeout)
         self._async_job.wait_for(timeout)
-        return self.cmdresult
+        cmdresult = self.cmdresult
+        # Only once per execute(), callers may wait() repeatedly
+        if self._trace_start is not None:
+            tracer.record(self.subtest, self.subcmd, self.command,
+                          self._trace_start, cmdresult, background=True)
+            self._trace_start = None
+        return cmdresult
 
     @property
     def done(self):
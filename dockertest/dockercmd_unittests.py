@@ -278,6 +278,16 @@ class DockerCmdTestBasic(DockerCmdTestBase):
         self.assertAlmostEqual(cmdresult.duration, 123)
         # pylint: enable=E1101
 
+    def test_piped_dockercmd(self):
+        docker_command = self.dockercmd.PipedDockerCmd(self.fake_subtest,
+                                                       'save',
+                                                       ['foo', '|', 'gzip'])
+        expected = ("set -o pipefail; %s %s save foo | gzip"
+                    % (self.defaults['docker_path'],
+                       self.defaults['docker_options']))
+        self.assertEqual(docker_command.command, expected)
+        self.assertEqual(docker_command.execute().command, expected)
+
     def test_no_fail_docker_cmd(self):
         docker_command = self.dockercmd.DockerCmd(self.fake_subtest,
                                                   'fake_subcommand')
@@ -332,6 +342,39 @@ class AsyncDockerCmd(DockerCmdTestBase):
         self.assertEqual(docker_cmd.stderr, "STDERR")
         self.assertEqual(docker_cmd.process_id, -1)
 
+    def test_trace_once(self):
+        recorded = []
+
+        def fake_record(*args, **dargs):  # pylint: disable=W0613
+            recorded.append(args)
+        record = self.dockercmd.tracer.record
+        self.dockercmd.tracer.record = fake_record
+        try:
+            docker_cmd = self.dockercmd.AsyncDockerCmd(self.fake_subtest,
+                                                       'fake_subcommand')
+            docker_cmd.execute()
+            docker_cmd.wait()
+            docker_cmd.wait()
+            self.assertEqual(len(recorded), 1)
+            docker_cmd.execute()
+            docker_cmd.wait()
+            self.assertEqual(len(recorded), 2)
+        finally:
+            self.dockercmd.tracer.record = record
+
+    def test_stdout_tee(self):
+        docker_cmd = self.dockercmd.AsyncDockerCmd(self.fake_subtest,
+                                                   'fake_subcommand')
+        docker_cmd.execute()
+        # mocked AsyncJob has '.dargs' pylint: disable=W0212
+        self.assertEqual(docker_cmd._async_job.dargs['stdout_tee'], None)
+        docker_cmd = self.dockercmd.AsyncDockerCmd(self.fake_subtest,
+                                                   'fake_subcommand')
+        docker_cmd.stdout_tee = sys.stdout
+        docker_cmd.execute()
+        self.assertEqual(docker_cmd._async_job.dargs['stdout_tee'],
+                         sys.stdout)
+
 
 if __name__ == '__main__':
     unittest.main()
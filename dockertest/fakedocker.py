@@ -0,0 +1,576 @@
+#!/usr/bin/env python
+"""
+Stand-in for the docker CLI and daemon, for offline framework testing
+
+Driven entirely by a JSON state file, this module impersonates just
+enough of ``docker`` (``ps``, ``images``, ``inspect``, ``info``,
+``version``, ``kill``, ``rm`` and ``rmi``) and the Engine API (``GET``
+of ``/info``, ``/version``, ``/_ping``, ``/containers/json``,
+``/images/json`` and ``/containers/<id>/json``) for the dockertest
+library to be unit-tested and benchmarked against thousands of
+containers and images, without any docker daemon.
+
+A state file may list explicit ``containers`` and ``images``, and/or a
+``generate`` mapping, to synthesize that many additional (deterministic)
+ones on load, for example::
+
+    {"generate": {"containers": 5000, "images": 2000, "running": 0.1},
+     "latency": {"ps": 0.25, "images": 0.1, "default": 0.01,
+                 "/containers/json": 0.2}}
+
+``latency`` maps CLI sub-commands and API paths to seconds slept before
+answering, with ``default`` applying to all others.  Commands which
+modify the inventory write it back to the state file, so the fake
+stays consistent across invocations.  Point the ``docker_path`` option
+at ``fakedocker.py --state <file>``, and/or run
+``fakedocker.py --state <file> serve <socket>`` to pass the socket to
+``docker_daemon.SocketClient``.  The state file may also be given by the
+``FAKEDOCKER_STATE`` environment variable.
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import BaseHTTPServer
+import fcntl
+import hashlib
+import json
+import os
+import re
+import SocketServer
+import sys
+import threading
+import time
+import urlparse
+
+
+#: Environment variable naming state file, when not given by ``--state``
+STATE_ENV = 'FAKEDOCKER_STATE'
+
+#: Column headers printed by ``docker ps -a --no-trunc``
+PS_COLUMNS = ('CONTAINER ID', 'IMAGE', 'COMMAND', 'CREATED', 'STATUS',
+              'PORTS', 'NAMES')
+
+#: Column headers printed by ``docker images --no-trunc``
+IMAGES_COLUMNS = ('REPOSITORY', 'TAG', 'IMAGE ID', 'CREATED', 'SIZE')
+
+#: Minimum spaces between table columns, like docker's tabwriter
+COLUMN_PADDING = 3
+
+#: Mapping of sub-command to it's options which take a value argument
+VALUE_OPTIONS = {'ps': ('-f', '--filter', '--format', '-n', '--last'),
+                 'images': ('-f', '--filter', '--format'),
+                 'inspect': ('-f', '--format', '--type'),
+                 'info': ('-f', '--format'),
+                 'version': ('-f', '--format'),
+                 'kill': ('-s', '--signal')}
+
+
+def fake_id(kind, index):
+    """Return deterministic 64-character hex ID for index-th kind of item"""
+    return hashlib.sha256('%s-%d' % (kind, index)).hexdigest()
+
+
+def synthesize(containers=0, images=0, running=0.0, start=0):
+    """
+    Return state dictionary with generated containers and images
+
+    :param containers: Number of containers to generate
+    :param images: Number of images to generate (at least one, if
+                   containers were requested)
+    :param running: Fraction of generated containers in running state
+    :param start: Offset of first generated item index, to avoid
+                  clashing with previously generated items
+    :return: Dictionary with ``containers`` and ``images`` lists
+    """
+    if containers and not images:
+        images = 1
+    now = int(time.time())
+    imgs = []
+    for index in xrange(start, start + images):
+        imgs.append({'Id': 'sha256:' + fake_id('image', index),
+                     'RepoTags': ['fake/image%d:latest' % index],
+                     'Created': now - index,
+                     'Size': 1048576 * (1 + index % 512)})
+    cntrs = []
+    pid = 1000
+    for index in xrange(start, start + containers):
+        is_running = index < int(containers * running) + start
+        cntrs.append({'Id': fake_id('container', index),
+                      'Names': ['/fake_container%d' % index],
+                      'Image': imgs[index % images]['RepoTags'][0],
+                      'ImageID': imgs[index % images]['Id'],
+                      'Command': '/bin/sh -c true',
+                      'Created': now - index,
+                      'Running': is_running,
+                      'Pid': pid + index if is_running else 0,
+                      'ExitCode': 0})
+    return {'containers': cntrs, 'images': imgs}
+
+
+def format_table(columns, rows):
+    """
+    Return string of docker-style table, with columns aligned by offset
+
+    :param columns: Sequence of column header strings
+    :param rows: Sequence of sequences, each with a string per column
+    """
+    widths = [len(column) for column in columns]
+    for row in rows:
+        widths = [max(width, len(value)) for width, value in zip(widths, row)]
+    lines = []
+    for row in [columns] + list(rows):
+        cells = [value.ljust(width + COLUMN_PADDING)
+                 for width, value in zip(widths[:-1], row[:-1])]
+        lines.append(''.join(cells) + row[-1])
+    return '\n'.join(lines) + '\n'
+
+
+def ago(timestamp):
+    """Return human-readable string of seconds since timestamp"""
+    seconds = max(0, int(time.time()) - timestamp)
+    for unit, size in (('days', 86400), ('hours', 3600), ('minutes', 60)):
+        if seconds >= size * 2:
+            return '%d %s ago' % (seconds // size, unit)
+    return '%d seconds ago' % seconds
+
+
+class FakeDockerError(Exception):
+
+    """
+    Command failed, ``str()`` is the message printed to stderr
+
+    :param message: Error message, without trailing newline
+    :param stdout: Output of any parts which succeeded, before failing
+    """
+
+    def __init__(self, message, stdout=''):
+        super(FakeDockerError, self).__init__(message)
+        self.stdout = stdout
+
+
+class FakeState(object):
+
+    """
+    Inventory of fake containers and images, persisted to a JSON file
+
+    Used as a context manager, the state file is exclusively locked and
+    re-loaded on entry, and stays locked until exit, so ``save()``
+    can't overwrite another process's changes.  Only one thread at a
+    time may be inside the ``with`` block.
+
+    :param path: Path to existing JSON state file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = None
+        self._statefile = None
+        # flock() doesn't exclude threads sharing this instance
+        self._lock = threading.Lock()
+        with open(path, 'rb') as statefile:
+            fcntl.flock(statefile, fcntl.LOCK_SH)
+            self.load(statefile)
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._statefile = open(self.path, 'r+b')
+            fcntl.flock(self._statefile, fcntl.LOCK_EX)
+            self.load(self._statefile)
+        except:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self._statefile is not None:
+                self._statefile.close()  # Also unlocks
+                self._statefile = None
+        finally:
+            self._lock.release()
+
+    def load(self, statefile):
+        """Replace inventory with contents of locked, open statefile"""
+        statefile.seek(0)
+        self.data = json.load(statefile)
+        generate = self.data.pop('generate', None)
+        self.data.setdefault('containers', [])
+        self.data.setdefault('images', [])
+        self.data.setdefault('latency', {})
+        if generate:
+            start = len(self.data['containers']) + len(self.data['images'])
+            generated = synthesize(start=start, **generate)
+            self.data['containers'] += generated['containers']
+            self.data['images'] += generated['images']
+
+    @property
+    def containers(self):
+        """List of container dictionaries"""
+        return self.data['containers']
+
+    @property
+    def images(self):
+        """List of image dictionaries"""
+        return self.data['images']
+
+    def delay(self, name):
+        """Sleep for configured latency of command or API path name"""
+        latency = self.data['latency']
+        time.sleep(latency.get(name, latency.get('default', 0)))
+
+    def save(self):
+        """
+        Write current inventory back into state file, locked by ``with``
+
+        :raise FakeDockerError: When called outside of a ``with`` block
+        """
+        if self._statefile is None:
+            raise FakeDockerError("Error: State file %s is not locked"
+                                  % self.path)
+        self._statefile.seek(0)
+        self._statefile.truncate()
+        json.dump(self.data, self._statefile)
+        self._statefile.flush()
+
+    def find_container(self, ref):
+        """Return container dictionary with ID, ID prefix or name ref"""
+        for container in self.containers:
+            if (container['Id'].startswith(ref) or
+                    '/%s' % ref in container['Names']):
+                return container
+        raise FakeDockerError("Error: No such container: %s" % ref)
+
+    def find_image(self, ref):
+        """Return image dictionary with ID, ID prefix or repo:tag ref"""
+        # Only IDs are matched by prefix, never a repo:tag's tag
+        if re.match(r'^(sha256:)?[0-9a-f]+$', ref):
+            prefix = ref.split(':')[-1]
+            for image in self.images:
+                if image['Id'].split(':')[-1].startswith(prefix):
+                    return image
+        if ':' not in ref.rsplit('/', 1)[-1]:
+            tagged = ref + ':latest'
+        else:
+            tagged = ref
+        for image in self.images:
+            if tagged in image['RepoTags']:
+                return image
+        raise FakeDockerError("Error: No such image: %s" % ref)
+
+    @staticmethod
+    def container_status(container):
+        """Return ``docker ps`` status string of container"""
+        if container['Running']:
+            return 'Up %s' % ago(container['Created'])[:-4]
+        return 'Exited (%d) %s' % (container['ExitCode'],
+                                   ago(container['Created']))
+
+    def inspect_container(self, container):
+        """Return ``docker inspect`` style dictionary of container"""
+        created = time.strftime('%Y-%m-%dT%H:%M:%S.000000000Z',
+                                time.gmtime(container['Created']))
+        status = 'running' if container['Running'] else 'exited'
+        return {'Id': container['Id'],
+                'Name': container['Names'][0],
+                'Created': created,
+                'Image': container['ImageID'],
+                'Config': {'Image': container['Image'],
+                           'Cmd': container['Command'].split()},
+                'State': {'Status': status,
+                          'Running': container['Running'],
+                          'Pid': container['Pid'],
+                          'ExitCode': container['ExitCode'],
+                          'StartedAt': created}}
+
+    def info(self):
+        """Return ``/info`` style dictionary"""
+        running = len([cntr for cntr in self.containers if cntr['Running']])
+        info = {'Containers': len(self.containers),
+                'ContainersRunning': running,
+                'ContainersStopped': len(self.containers) - running,
+                'Images': len(self.images),
+                'Driver': 'fake',
+                'NGoroutines': 1}
+        info.update(self.data.get('info', {}))
+        return info
+
+    def version(self):
+        """Return ``/version`` style dictionary"""
+        version = {'Version': '1.13.1', 'ApiVersion': '1.26'}
+        version.update(self.data.get('version', {}))
+        return version
+
+
+class FakeDocker(object):
+
+    """
+    Docker CLI impersonator, ``run()`` dispatches to ``cmd_<subcommand>``
+
+    :param state: ``FakeState`` instance to operate upon
+    """
+
+    def __init__(self, state):
+        self.state = state
+
+    def run(self, args):
+        """
+        Return exit status, stdout and stderr strings of running args
+
+        :param args: List of docker CLI arguments, starting with subcommand
+        """
+        if not args:
+            return 1, '', "Usage: docker COMMAND\n"
+        command = getattr(self, 'cmd_%s' % args[0], None)
+        if command is None:
+            return 1, '', ("docker: '%s' is not a docker command.\n"
+                           % args[0])
+        self.state.delay(args[0])
+        value_options = VALUE_OPTIONS.get(args[0], ())
+        options = []
+        operands = []
+        remaining = iter(args[1:])
+        for arg in remaining:
+            if arg in value_options:
+                # Keep option and it's value together, as --option=value
+                options.append('%s=%s' % (arg, next(remaining, '')))
+            elif arg.startswith('-'):
+                options.append(arg)
+            else:
+                operands.append(arg)
+        try:
+            with self.state:
+                return 0, command(options, operands), ''
+        except FakeDockerError, detail:
+            return 1, detail.stdout, '%s\n' % detail
+
+    def each(self, operands, action):
+        """
+        Call action on every operand, save state, return output lines
+
+        :param operands: List of container or image references
+        :param action: Callable modifying state for one operand, it's
+                       return value is printed on success
+        :raise FakeDockerError: After saving, reporting every failed
+                                operand
+        """
+        stdout = ''
+        errors = []
+        for ref in operands:
+            try:
+                stdout += '%s\n' % action(ref)
+            except FakeDockerError, detail:
+                errors.append(str(detail))
+        self.state.save()
+        if errors:
+            raise FakeDockerError('\n'.join(errors), stdout)
+        return stdout
+
+    def cmd_ps(self, options, _):  # pylint: disable=C0111
+        containers = self.state.containers
+        if '-a' not in options and '--all' not in options:
+            containers = [cntr for cntr in containers if cntr['Running']]
+        if '-q' in options or '--quiet' in options:
+            return ''.join('%s\n' % cntr['Id'][:12] for cntr in containers)
+        columns = PS_COLUMNS
+        if '--size' in options or '-s' in options:
+            columns += ('SIZE',)
+        rows = []
+        for cntr in containers:
+            row = [cntr['Id'], cntr['Image'], '"%s"' % cntr['Command'],
+                   ago(cntr['Created']), self.state.container_status(cntr),
+                   '', cntr['Names'][0][1:]]
+            if '--no-trunc' not in options:
+                row[0] = row[0][:12]
+            if len(columns) > len(PS_COLUMNS):
+                row.append('0 B')
+            rows.append(row)
+        return format_table(columns, rows)
+
+    def cmd_images(self, options, _):  # pylint: disable=C0111
+        if '-q' in options or '--quiet' in options:
+            return ''.join('%s\n' % image['Id'] for image in self.state.images)
+        rows = []
+        for image in self.state.images:
+            image_id = image['Id']
+            if '--no-trunc' not in options:
+                image_id = image_id.split(':')[-1][:12]
+            created = ago(image['Created'])
+            size = '%d MB' % (image['Size'] // 1048576)
+            for repotag in image['RepoTags'] or ['<none>:<none>']:
+                repo, tag = repotag.rsplit(':', 1)
+                rows.append([repo, tag, image_id, created, size])
+        return format_table(IMAGES_COLUMNS, rows)
+
+    def cmd_inspect(self, _, operands):  # pylint: disable=C0111
+        found = []
+        for ref in operands:
+            try:
+                found.append(self.state.inspect_container(
+                    self.state.find_container(ref)))
+            except FakeDockerError:
+                found.append(self.state.find_image(ref))
+        return json.dumps(found, indent=4) + '\n'
+
+    def cmd_info(self, _, __):  # pylint: disable=C0111
+        info = self.state.info()
+        return ''.join('%s: %s\n' % (key, info[key]) for key in sorted(info))
+
+    def cmd_version(self, _, __):  # pylint: disable=C0111
+        version = self.state.version()
+        return ('Client:\n Version:\t%s\n API version:\t%s\n'
+                % (version['Version'], version['ApiVersion']))
+
+    def cmd_kill(self, _, operands):  # pylint: disable=C0111
+        def kill(ref):  # pylint: disable=C0111
+            container = self.state.find_container(ref)
+            if not container['Running']:
+                raise FakeDockerError("Error response from daemon: "
+                                      "Container %s is not running" % ref)
+            container.update({'Running': False, 'Pid': 0, 'ExitCode': 137})
+            return ref
+        return self.each(operands, kill)
+
+    def cmd_rm(self, options, operands):  # pylint: disable=C0111
+        force = '-f' in options or '--force' in options
+
+        def remove(ref):  # pylint: disable=C0111
+            container = self.state.find_container(ref)
+            if container['Running'] and not force:
+                raise FakeDockerError("Error response from daemon: You cannot"
+                                      " remove a running container %s" % ref)
+            self.state.containers.remove(container)
+            return ref
+        return self.each(operands, remove)
+
+    def cmd_rmi(self, options, operands):  # pylint: disable=C0111
+        force = '-f' in options or '--force' in options
+
+        def remove(ref):  # pylint: disable=C0111
+            image = self.state.find_image(ref)
+            users = [cntr for cntr in self.state.containers
+                     if cntr['ImageID'] == image['Id']]
+            if users and not force:
+                raise FakeDockerError("Error response from daemon: conflict: "
+                                      "unable to remove %s, image is being "
+                                      "used by a container" % ref)
+            self.state.images.remove(image)
+            return 'Deleted: %s' % ref
+        return self.each(operands, remove)
+
+
+class FakeAPIHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    """Answer Engine API GET requests from ``self.server.state``"""
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass  # Unix socket client_address isn't loggable, and noisy anyway
+
+    def resource(self, path, query):
+        """Return object for API path and parsed query, raise KeyError"""
+        state = self.server.state
+        state.delay(path)
+        # Answer from current state file, CLI commands may have changed it
+        with state:
+            return self.locked_resource(state, path, query)
+
+    @staticmethod
+    def locked_resource(state, path, query):
+        """Return object for API path and query from locked, loaded state"""
+        if path == '/_ping':
+            return 'OK'
+        elif path == '/info':
+            return state.info()
+        elif path == '/version':
+            return state.version()
+        elif path == '/images/json':
+            return state.images
+        elif path == '/containers/json':
+            if query.get('all', ['0'])[0] in ('1', 'true'):
+                return state.containers
+            return [cntr for cntr in state.containers if cntr['Running']]
+        elif path.startswith('/containers/') and path.endswith('/json'):
+            try:
+                return state.inspect_container(
+                    state.find_container(path.split('/')[2]))
+            except FakeDockerError, detail:
+                raise KeyError(str(detail))
+        raise KeyError("page not found")
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Reply with JSON document, or 404 error"""
+        url = urlparse.urlparse(self.path)
+        path = url.path
+        # Strip optional API version prefix, i.e. /v1.26/info
+        if path.startswith('/v1.'):
+            path = '/' + path.split('/', 2)[2]
+        try:
+            query = urlparse.parse_qs(url.query)
+            body = json.dumps(self.resource(path, query))
+            status = 200
+        except KeyError, detail:
+            body = json.dumps({'message': detail.args[0]})
+            status = 404
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeDaemon(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+
+    """
+    Engine API impersonator listening on a unix socket
+
+    :param state: ``FakeState`` instance to answer from
+    :param socket_path: Path of unix socket to create
+    """
+
+    daemon_threads = True
+
+    def __init__(self, state, socket_path):
+        self.state = state
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        SocketServer.UnixStreamServer.__init__(self, socket_path,
+                                               FakeAPIHandler)
+
+    def server_close(self):
+        SocketServer.UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def main(argv):
+    """
+    Run docker CLI arguments, or ``serve <socket>``, return exit status
+
+    :param argv: Arguments, optionally beginning with ``--state <path>``
+    """
+    state_path = os.environ.get(STATE_ENV)
+    if argv[:1] == ['--state']:
+        state_path = argv[1]
+        argv = argv[2:]
+    if not state_path:
+        sys.stderr.write("%s not set and no --state given\n" % STATE_ENV)
+        return 2
+    state = FakeState(state_path)
+    if argv[:1] == ['serve']:
+        daemon = FakeDaemon(state, argv[1])
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            daemon.server_close()
+        return 0
+    exit_status, stdout, stderr = FakeDocker(state).run(argv)
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    return exit_status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import types
+import unittest
+
+
+def mock(mod_path):
+    name_list = mod_path.split('.')
+    child_name = name_list.pop()
+    child_mod = sys.modules.get(mod_path, types.ModuleType(child_name))
+    if len(name_list) == 0:  # child_name is left-most basic module
+        if child_name not in sys.modules:
+            sys.modules[child_name] = child_mod
+        return sys.modules[child_name]
+    else:
+        # New or existing child becomes parent
+        recurse_path = ".".join(name_list)
+        parent_mod = mock(recurse_path)
+        if not hasattr(sys.modules[recurse_path], child_name):
+            setattr(parent_mod, child_name, child_mod)
+            # full-name also points at child module
+            sys.modules[mod_path] = child_mod
+        return sys.modules[mod_path]
+
+# Mock module and exception class in one stroke
+setattr(mock('autotest.client.shared.error'), 'CmdError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestFail', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestNAError', Exception)
+setattr(mock('autotest.client.shared.error'), 'AutotestError', Exception)
+mock('autotest.client.utils')
+mock('autotest.client.shared.utils')
+
+
+class FakeDockerTestBase(unittest.TestCase):
+
+    def setUp(self):
+        import fakedocker
+        self.fakedocker = fakedocker
+        self.tmpdir = tempfile.mkdtemp(self.__class__.__name__)
+        self.state_path = os.path.join(self.tmpdir, 'state.json')
+        self.write_state({'generate': {'containers': 20, 'images': 5,
+                                       'running': 0.5}})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        del self.fakedocker
+
+    def write_state(self, data):
+        with open(self.state_path, 'wb') as statefile:
+            json.dump(data, statefile)
+
+    def run_docker(self, *args):
+        state = self.fakedocker.FakeState(self.state_path)
+        return self.fakedocker.FakeDocker(state).run(list(args))
+
+
+class SynthesizeTest(FakeDockerTestBase):
+
+    def test_counts(self):
+        state = self.fakedocker.synthesize(containers=10, images=3,
+                                           running=0.3)
+        self.assertEqual(len(state['containers']), 10)
+        self.assertEqual(len(state['images']), 3)
+        running = [cntr for cntr in state['containers'] if cntr['Running']]
+        self.assertEqual(len(running), 3)
+
+    def test_deterministic_ids(self):
+        first = self.fakedocker.synthesize(containers=3)
+        second = self.fakedocker.synthesize(containers=3)
+        self.assertEqual([cntr['Id'] for cntr in first['containers']],
+                         [cntr['Id'] for cntr in second['containers']])
+        self.assertEqual(len(first['images']), 1)
+
+    def test_generate_appends(self):
+        self.write_state({'containers': self.fakedocker.synthesize(
+            containers=2)['containers'], 'generate': {'containers': 2}})
+        state = self.fakedocker.FakeState(self.state_path)
+        ids = set(cntr['Id'] for cntr in state.containers)
+        self.assertEqual(len(ids), 4)
+
+
+class FormatTableTest(FakeDockerTestBase):
+
+    def test_texttable(self):
+        from output import TextTable
+        text = self.fakedocker.format_table(('ONE', 'TWO', 'THREE'),
+                                            [('1', '', 'three'),
+                                             ('a longer one', '2', '3')])
+        table = TextTable(text)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table[0]['ONE'], '1')
+        self.assertEqual(table[0]['TWO'], None)
+        self.assertEqual(table[1]['ONE'], 'a longer one')
+        self.assertEqual(table[1]['THREE'], '3')
+
+
+class FakeDockerTest(FakeDockerTestBase):
+
+    def test_ps(self):
+        from output import TextTable
+        exit_status, stdout, _ = self.run_docker('ps', '-a', '--no-trunc')
+        self.assertEqual(exit_status, 0)
+        table = TextTable(stdout)
+        self.assertEqual(len(table), 20)
+        self.assertEqual(len(table[0]['CONTAINER ID']), 64)
+        self.assertEqual(table[0]['NAMES'], 'fake_container0')
+        self.assertTrue(table[0]['STATUS'].startswith('Up'))
+        self.assertEqual(len(self.run_docker('ps')[1].splitlines()), 11)
+
+    def test_images(self):
+        from output import TextTable
+        stdout = self.run_docker('images', '--no-trunc')[1]
+        table = TextTable(stdout)
+        self.assertEqual(len(table), 5)
+        self.assertEqual(table[0]['REPOSITORY'], 'fake/image0')
+        self.assertEqual(table[0]['TAG'], 'latest')
+        self.assertTrue(table[0]['IMAGE ID'].startswith('sha256:'))
+
+    def test_inspect(self):
+        exit_status, stdout, _ = self.run_docker('inspect', 'fake_container1')
+        self.assertEqual(exit_status, 0)
+        inspected = json.loads(stdout)
+        self.assertEqual(inspected[0]['Name'], '/fake_container1')
+        self.assertTrue(inspected[0]['State']['Running'])
+        exit_status, _, stderr = self.run_docker('inspect', 'nothere')
+        self.assertEqual(exit_status, 1)
+        self.assertIn('No such image', stderr)
+
+    def test_rm_persists(self):
+        exit_status, _, stderr = self.run_docker('rm', 'fake_container0')
+        self.assertEqual(exit_status, 1)
+        self.assertIn('running', stderr)
+        self.assertEqual(self.run_docker('rm', '-f', 'fake_container0')[0], 0)
+        self.assertEqual(self.run_docker('rm', 'fake_container19')[0], 0)
+        stdout = self.run_docker('ps', '-a', '-q')[1]
+        self.assertEqual(len(stdout.splitlines()), 18)
+
+    def test_rm_each(self):
+        exit_status, stdout, stderr = self.run_docker(
+            'rm', 'fake_container19', 'missing', 'fake_container0',
+            'fake_container18')
+        self.assertEqual(exit_status, 1)
+        self.assertEqual(stdout.split(),
+                         ['fake_container19', 'fake_container18'])
+        self.assertEqual(len(stderr.splitlines()), 2)
+        self.assertIn('No such container: missing', stderr)
+        self.assertIn('running container fake_container0', stderr)
+        stdout = self.run_docker('ps', '-a', '-q')[1]
+        self.assertEqual(len(stdout.splitlines()), 18)
+
+    def test_value_options(self):
+        exit_status, stdout, _ = self.run_docker('inspect', '--format',
+                                                 '{{.Id}}', 'fake_container1')
+        self.assertEqual(exit_status, 0)
+        self.assertEqual(len(json.loads(stdout)), 1)
+        stdout = self.run_docker('ps', '--filter', 'status=exited', '-a',
+                                 '-q')[1]
+        self.assertEqual(len(stdout.splitlines()), 20)
+
+    def test_save_unlocked(self):
+        state = self.fakedocker.FakeState(self.state_path)
+        self.assertRaises(self.fakedocker.FakeDockerError, state.save)
+        with state:
+            del state.containers[0]
+            state.save()
+        self.assertEqual(len(self.run_docker('ps', '-a', '-q')[1].split()),
+                         19)
+
+    def test_find_image(self):
+        state = self.fakedocker.FakeState(self.state_path)
+        image = state.images[1]
+        digits = image['Id'].split(':')[1][:4]
+        self.assertEqual(state.find_image(digits), image)
+        self.assertEqual(state.find_image('sha256:' + digits), image)
+        self.assertEqual(state.find_image('fake/image1'), image)
+        # A tag is never matched against image IDs
+        self.assertRaises(self.fakedocker.FakeDockerError, state.find_image,
+                          'fake/image0:' + digits)
+
+    def test_kill_rmi(self):
+        self.assertEqual(self.run_docker('rmi', 'fake/image0')[0], 1)
+        for index in xrange(0, 20, 5):
+            self.run_docker('rm', '--force', 'fake_container%d' % index)
+        self.assertEqual(self.run_docker('kill', 'fake_container1')[0], 0)
+        self.assertEqual(self.run_docker('kill', 'fake_container1')[0], 1)
+        self.assertEqual(self.run_docker('rmi', 'fake/image0')[0], 0)
+        self.assertEqual(len(self.run_docker('images', '-q')[1].split()), 4)
+
+    def test_unknown(self):
+        exit_status, _, stderr = self.run_docker('frobnicate')
+        self.assertEqual(exit_status, 1)
+        self.assertIn('not a docker command', stderr)
+
+    def test_executable(self):
+        command = [sys.executable, self.fakedocker.__file__.replace('.pyc',
+                                                                    '.py'),
+                   '--state', self.state_path, 'info']
+        stdout = subprocess.check_output(command)
+        self.assertIn('Containers: 20', stdout.splitlines())
+
+
+class FakeDaemonTest(FakeDockerTestBase):
+
+    def setUp(self):
+        super(FakeDaemonTest, self).setUp()
+        import docker_daemon
+        self.socket_path = os.path.join(self.tmpdir, 'docker.sock')
+        state = self.fakedocker.FakeState(self.state_path)
+        self.daemon = self.fakedocker.FakeDaemon(state, self.socket_path)
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        self.client = docker_daemon.SocketClient(self.socket_path)
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join()
+        self.daemon.server_close()
+        super(FakeDaemonTest, self).tearDown()
+
+    def test_info_version(self):
+        info = self.client.get_json('/info')
+        self.assertEqual(info['Containers'], 20)
+        self.assertEqual(info['ContainersRunning'], 10)
+        self.assertEqual(self.client.version()['ApiVersion'], '1.26')
+
+    def test_containers(self):
+        self.assertEqual(len(self.client.get_json('/containers/json')), 10)
+        containers = self.client.get_json('/v1.26/containers/json?all=1')
+        self.assertEqual(len(containers), 20)
+        inspected = self.client.get_json('/containers/%s/json'
+                                         % containers[2]['Id'])
+        self.assertEqual(inspected['Name'], '/fake_container2')
+
+    def test_not_found(self):
+        self.assertRaises(ValueError, self.client.get_json,
+                          '/containers/nothere/json')
+        self.assertRaises(ValueError, self.client.get_json, '/bogus')
+
+    def test_cli_changes(self):
+        self.assertEqual(self.run_docker('rm', '-f', 'fake_container0')[0], 0)
+        self.assertEqual(len(self.client.get_json('/containers/json?all=1')),
+                         19)
+        self.assertEqual(self.client.get_json('/info')['ContainersRunning'],
+                         9)
+
+
+if __name__ == '__main__':
+    unittest.main()
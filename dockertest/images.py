@@ -26,6 +26,7 @@ Note: As in other places, the terms 'repo' and 'image' are used
 # pylint: disable=W0403
 
 import re
+import time
 from autotest.client import utils
 from autotest.client.shared import error
 from config import Config
@@ -33,6 +34,7 @@ from config import none_if_empty
 from config import get_as_list
 from output import OutputGood, TextTable
 from subtestbase import SubBase
+import tracer
 from xceptions import DockerTestError, DockerCommandError
 from xceptions import DockerFullNameFormatError
 
@@ -387,13 +389,20 @@ class DockerImages(object):
         if timeout is None:
             timeout = self.timeout
         from autotest.client.shared.error import CmdError
+        start = time.time()
+        cmdresult = None
         try:
-            return utils.run(docker_image_cmd,
-                             verbose=self.verbose,
-                             timeout=timeout)
+            cmdresult = utils.run(docker_image_cmd,
+                                  verbose=self.verbose,
+                                  timeout=timeout)
+            return cmdresult
         except CmdError, detail:
+            cmdresult = detail.result_obj
             raise DockerCommandError(detail.command, detail.result_obj,
                                      additional_text=detail.additional_text)
+        finally:
+            tracer.record(self.subtest, cmd, docker_image_cmd, start,
+                          cmdresult)
 
     def docker_cmd_check(self, cmd, timeout=None):
         """
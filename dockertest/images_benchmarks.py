@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403,C0413
+
+import microbench
+microbench.mock_autotest()
+from images import DockerImage
+
+
+#: Assorted full name formats, from most to least qualified
+FULL_NAMES = ('registry.example.com:5000/user%d/repo%d:tag',
+              'registry.example.com/repo%d-%d:latest',
+              'user%d/repo%d',
+              'repo%d_%d:1.0')
+
+
+class SplitToComponent(microbench.Benchmark):
+
+    def setup(self, size):
+        self.names = [FULL_NAMES[num % len(FULL_NAMES)] % (num, num)
+                      for num in xrange(size)]
+
+    def run(self):
+        for name in self.names:
+            DockerImage.split_to_component(name)
+
+
+if __name__ == '__main__':
+    microbench.main()
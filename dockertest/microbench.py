@@ -0,0 +1,258 @@
+"""
+Harness for timing dockertest library hot-paths with generated inputs
+
+Each ``*_benchmarks.py`` module defines ``Benchmark`` subclasses, then
+calls ``main()``.  Every benchmark runs once per entry in its ``sizes``,
+in a forked child process, so one's memory peak can't hide another's.
+Results (ops/sec and peak RSS growth) are printed, optionally merged
+into a JSON file, and compared against a baseline file with a tolerance.
+See ``run_benchmarks.sh`` to run all of them.
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import traceback
+import types
+
+
+#: Default fraction results may be worse than baseline before failing
+TOLERANCE = 0.25
+
+#: Peak memory growth (KiB) always tolerated, to ignore allocator noise
+MEMORY_SLACK_KB = 1024
+
+#: Number of timed repetitions, the fastest is reported
+REPEAT = 5
+
+
+def mock_autotest():
+    """
+    Insert placeholder ``autotest`` modules unless autotest is importable
+
+    Benchmarked library code only needs autotest at import time, this
+    lets benchmarks run from a plain source checkout.
+    """
+    try:
+        import autotest  # pylint: disable=W0612
+        return
+    except ImportError:
+        pass
+    for mod_path in ('autotest.client.shared.error',
+                     'autotest.client.shared.utils',
+                     'autotest.client.utils'):
+        parent = None
+        for depth in xrange(1, mod_path.count('.') + 2):
+            name = '.'.join(mod_path.split('.')[:depth])
+            module = sys.modules.setdefault(name, types.ModuleType(name))
+            if parent is not None:
+                setattr(parent, name.split('.')[-1], module)
+            parent = module
+    error = sys.modules['autotest.client.shared.error']
+    for name in ('AutotestError', 'CmdError', 'TestError', 'TestFail',
+                 'TestNAError'):
+        setattr(error, name, Exception)
+
+
+class Benchmark(object):
+
+    """
+    Abstract operation to time, on inputs of several sizes
+
+    Subclasses generate input in ``setup()``, which isn't timed,
+    then ``run()`` performs the operation being measured once.
+    """
+
+    #: Input sizes to run the benchmark with
+    sizes = (10, 100, 1000)
+
+    def setup(self, size):
+        """Generate input of size for ``run()``"""
+        pass
+
+    def run(self):
+        """Perform the timed operation once"""
+        raise NotImplementedError
+
+    def teardown(self):
+        """Release anything created by ``setup()``"""
+        pass
+
+
+def maxrss_kb():
+    """Return peak resident set size of this process, in KiB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def timed(func, loops):
+    """Return seconds elapsed calling func loops times"""
+    start = time.time()
+    for _ in xrange(loops):
+        func()
+    return time.time() - start
+
+
+def measure(benchmark, size, min_time):
+    """
+    Return results dictionary from running benchmark instance
+
+    :param benchmark: ``Benchmark`` instance
+    :param size: Input size passed to ``setup()``
+    :param min_time: Minimum seconds each timed repetition must take
+    """
+    benchmark.setup(size)
+    try:
+        start_kb = maxrss_kb()
+        loops = 1
+        elapsed = timed(benchmark.run, loops)
+        while elapsed < min_time:
+            # Aim slightly past min_time, but never less than double
+            estimate = int(loops * min_time * 1.2 / max(elapsed, 1e-6))
+            loops = max(loops * 2, estimate)
+            elapsed = timed(benchmark.run, loops)
+        for _ in xrange(REPEAT - 1):
+            elapsed = min(elapsed, timed(benchmark.run, loops))
+    finally:
+        benchmark.teardown()
+    return {'ops_per_sec': loops / max(elapsed, 1e-9),
+            'loops': loops,
+            'peak_kb': maxrss_kb() - start_kb}
+
+
+def measure_forked(benchmark_class, size, min_time):
+    """
+    Return ``measure()`` results, from a child process
+
+    :raise RuntimeError: With child's traceback, if it failed
+    """
+    readfd, writefd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # child
+        os.close(readfd)
+        status = 0
+        try:
+            output = json.dumps(measure(benchmark_class(), size, min_time))
+        except Exception:  # pylint: disable=W0703
+            output = json.dumps({'error': traceback.format_exc()})
+            status = 1
+        with os.fdopen(writefd, 'wb') as writer:
+            writer.write(output)
+        os._exit(status)  # pylint: disable=W0212
+    os.close(writefd)
+    with os.fdopen(readfd, 'rb') as reader:
+        output = reader.read()
+    os.waitpid(pid, 0)
+    results = json.loads(output)
+    if 'error' in results:
+        raise RuntimeError("%s(%d) failed:\n%s"
+                           % (benchmark_class.__name__, size,
+                              results['error']))
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Return list of messages about results worse than baseline
+
+    :param results: Mapping of benchmark key to results dictionary
+    :param baseline: Mapping of benchmark key to results dictionary
+    :param tolerance: Fraction worse than baseline which is acceptable
+    """
+    regressions = []
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        now = results[key]
+        then = baseline[key]
+        if now['ops_per_sec'] < then['ops_per_sec'] * (1.0 - tolerance):
+            regressions.append("%s: %0.1f ops/sec is %0.0f%% slower than "
+                               "baseline %0.1f"
+                               % (key, now['ops_per_sec'],
+                                  100.0 * (1 - now['ops_per_sec'] /
+                                           then['ops_per_sec']),
+                                  then['ops_per_sec']))
+        limit_kb = max(then['peak_kb'] * (1.0 + tolerance),
+                       then['peak_kb'] + MEMORY_SLACK_KB)
+        if now['peak_kb'] > limit_kb:
+            regressions.append("%s: peak memory %d KiB exceeds baseline "
+                               "%d KiB" % (key, now['peak_kb'],
+                                           then['peak_kb']))
+    return regressions
+
+
+def benchmark_classes(module):
+    """Return list of ``Benchmark`` subclasses defined in module"""
+    found = []
+    for value in vars(module).values():
+        if (isinstance(value, type) and issubclass(value, Benchmark) and
+                value.__module__ == module.__name__):
+            found.append(value)
+    return sorted(found, key=lambda cls: cls.__name__)
+
+
+def load_results(path):
+    """Return results mapping from JSON file at path, or empty dict"""
+    if not os.path.isfile(path):
+        return {}
+    with open(path, 'rb') as resultsfile:
+        return json.load(resultsfile)['results']
+
+
+def save_results(path, results):
+    """Merge results mapping into JSON file at path"""
+    merged = load_results(path)
+    merged.update(results)
+    with open(path, 'wb') as resultsfile:
+        json.dump({'python': platform.python_version(),
+                   'machine': platform.machine(),
+                   'results': merged}, resultsfile, indent=2,
+                  separators=(',', ': '), sort_keys=True)
+
+
+def parse_args(argv):
+    """Return parsed benchmark command-line options"""
+    parser = argparse.ArgumentParser(description='Run micro-benchmarks')
+    parser.add_argument('--output', help='merge results into JSON file')
+    parser.add_argument('--baseline',
+                        help='fail on regressions from JSON baseline file')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='fraction worse than baseline which is okay')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum seconds per timed repetition')
+    parser.add_argument('--sizes', type=lambda csv: [int(size) for size
+                                                     in csv.split(',')],
+                        help='CSV of sizes, overriding benchmark defaults')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Run all benchmarks in ``__main__`` module, exit non-zero on regression
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parse_args(argv)
+    results = {}
+    for benchmark_class in benchmark_classes(sys.modules['__main__']):
+        for size in args.sizes or benchmark_class.sizes:
+            key = '%s/%d' % (benchmark_class.__name__, size)
+            results[key] = measure_forked(benchmark_class, size,
+                                          args.min_time)
+            sys.stdout.write("%-40s %14.1f ops/sec %8d KiB peak\n" % (
+                key, results[key]['ops_per_sec'], results[key]['peak_kb']))
+    if args.output:
+        save_results(args.output, results)
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline),
+                              args.tolerance)
+        for regression in regressions:
+            sys.stderr.write("REGRESSION: %s\n" % regression)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+
+class MicrobenchTestBase(unittest.TestCase):
+
+    def setUp(self):
+        import microbench
+        self.microbench = microbench
+
+    def tearDown(self):
+        del self.microbench
+
+
+class CompareTest(MicrobenchTestBase):
+
+    baseline = {'fast/10': {'ops_per_sec': 1000.0, 'peak_kb': 100},
+                'big/10': {'ops_per_sec': 10.0, 'peak_kb': 10000}}
+
+    def test_within_tolerance(self):
+        results = {'fast/10': {'ops_per_sec': 800.0, 'peak_kb': 1000},
+                   'big/10': {'ops_per_sec': 100.0, 'peak_kb': 12000}}
+        self.assertEqual(self.microbench.compare(results, self.baseline,
+                                                 0.25), [])
+
+    def test_slower(self):
+        results = {'fast/10': {'ops_per_sec': 700.0, 'peak_kb': 100}}
+        regressions = self.microbench.compare(results, self.baseline, 0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('30% slower', regressions[0])
+
+    def test_memory(self):
+        results = {'big/10': {'ops_per_sec': 10.0, 'peak_kb': 13000}}
+        regressions = self.microbench.compare(results, self.baseline, 0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('peak memory', regressions[0])
+
+    def test_new_benchmark(self):
+        results = {'new/10': {'ops_per_sec': 1.0, 'peak_kb': 99999}}
+        self.assertEqual(self.microbench.compare(results, self.baseline), [])
+
+
+class MeasureTest(MicrobenchTestBase):
+
+    def setUp(self):
+        super(MeasureTest, self).setUp()
+
+        class Counter(self.microbench.Benchmark):
+
+            def setup(self, size):
+                self.size = size
+                self.calls = 0
+                self.torndown = False
+
+            def run(self):
+                self.calls += 1
+
+            def teardown(self):
+                self.torndown = True
+
+        self.counter = Counter()
+
+    def test_measure(self):
+        results = self.microbench.measure(self.counter, 42, 0.01)
+        self.assertEqual(self.counter.size, 42)
+        self.assertTrue(self.counter.torndown)
+        self.assertTrue(results['loops'] > 1)
+        self.assertTrue(self.counter.calls >=
+                        results['loops'] * self.microbench.REPEAT)
+        self.assertTrue(results['ops_per_sec'] > 0)
+        self.assertTrue(results['peak_kb'] >= 0)
+
+    def test_forked(self):
+        results = self.microbench.measure_forked(self.counter.__class__,
+                                                 10, 0.01)
+        self.assertTrue(results['ops_per_sec'] > 0)
+        # Parent copy was never touched
+        self.assertFalse(hasattr(self.counter, 'calls'))
+
+    def test_forked_error(self):
+        self.assertRaises(RuntimeError, self.microbench.measure_forked,
+                          self.microbench.Benchmark, 10, 0.01)
+
+
+class ResultsTest(MicrobenchTestBase):
+
+    def setUp(self):
+        super(ResultsTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp(self.__class__.__name__)
+        self.path = os.path.join(self.tmpdir, 'results.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        super(ResultsTest, self).tearDown()
+
+    def test_load_missing(self):
+        self.assertEqual(self.microbench.load_results(self.path), {})
+
+    def test_save_merges(self):
+        first = {'one/1': {'ops_per_sec': 1.0, 'peak_kb': 1}}
+        second = {'two/2': {'ops_per_sec': 2.0, 'peak_kb': 2}}
+        self.microbench.save_results(self.path, first)
+        self.microbench.save_results(self.path, second)
+        loaded = self.microbench.load_results(self.path)
+        self.assertEqual(sorted(loaded.keys()), ['one/1', 'two/2'])
+
+    def test_benchmark_classes(self):
+        module = types.ModuleType('fake_benchmarks')
+        exec ("import microbench\n"
+              "class Zed(microbench.Benchmark): pass\n"
+              "class Alpha(microbench.Benchmark): pass\n"
+              "Imported = microbench.Benchmark\n") in vars(module)
+        found = self.microbench.benchmark_classes(module)
+        self.assertEqual([cls.__name__ for cls in found], ['Alpha', 'Zed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
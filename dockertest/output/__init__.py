@@ -12,3 +12,4 @@ from . validate import OutputGood, OutputGoodBase, OutputNotBad
 from . validate import wait_for_output, mustpass, mustfail
 from . unseenlines import UnseenLines, UnseenlineMatchTimeout, UnseenlineMatch
 from . unseenlines import UnseenlineMatchPeek, NoUnseenlineMatch
+from . unseenlines import TimedLines
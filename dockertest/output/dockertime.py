@@ -4,6 +4,7 @@ Parse docker timestamps
 
 import re
 import datetime
+import collections
 
 
 # This class inherits a LOT of public methods, but most of what
@@ -85,20 +86,36 @@ class DockerTime(datetime.datetime):  # pylint: disable=R0903
             del dt  # not used, but specified in base
             return DockerTime.UTC.ZERO
 
+    #: Pre-compiled pattern for the common RFC3339Nano forms emitted by
+    #: docker (entire string is a single 'T' separated timestamp).
+    fast_regex = re.compile(r"^\s*(\d{4})-(\d{2})-(\d{2})T"
+                            r"(\d{2}):(\d{2}):(\d{2})"
+                            r"(?:\.(\d+))?"
+                            r"([zZ]|[+-]\d{2}:\d{2})?\s*$")
+
+    #: Maximum number of ``UTCOffset`` instances held by ``utc_offset()``
+    utc_offset_cache_size = 64
+
+    # Private cache of ``UTCOffset`` instances, in least-recently used order
+    _utc_offsets = collections.OrderedDict()
+
+    # Private cache of compiled fallback patterns, keyed by separator.
+    _patterns = {}
+
     def __new__(cls, isostr, sep=None):
-        if sep is None:
-            sep = 'T'
+        if sep is None or sep == 'T':
+            mobj = cls.fast_regex.match(isostr)
+            if mobj:
+                return cls.__new_from_match__(mobj)
         # datetime can output zulu time but not consume it.
-        base = "%s%s%s" % (r"(\s*\d{4})-(\d{2})-(\d{2})",
-                           sep,
-                           r"(\d{2}):(\d{2}):(\d{2})")
         keys = ['year', 'month', 'day',
                 'hour', 'minute', 'second']
         values = []
+        patterns = cls.__patterns__(sep)
         # Order is significant, some parsers depend on one-another
         parsers = [cls.__new_tzoffset__, cls.__new_zulu__, cls.__new_us__]
         for parser in parsers:
-            if parser(isostr, base, values, keys, cls.UTC()):
+            if parser(isostr, patterns, values, keys, cls.UTC()):
                 break  # Parsers return True on success
         if values == []:  # No parser was succesful
             raise ValueError("Malformed date time string %s" % isostr)
@@ -114,17 +131,90 @@ class DockerTime(datetime.datetime):  # pylint: disable=R0903
             self.__class__.__name__, self, self.microsecond)
 
     @classmethod
-    def __new_zulu__(cls, isostr, base, values, keys, tzn):
-        # Killall letter Z and z's
-        isostr.replace('z', ' ')
-        isostr.replace('Z', ' ')
+    def parse_many(cls, iterable, sep=None):
+        """
+        Return list of instances parsed from each string in ``iterable``
+
+        :param iterable: Iterable of ISO 8601 format strings
+        :param sep: Optional separation character ('T' by default)
+        :raise ValueError: if any item is unparseable
+        """
+        if sep is not None and sep != 'T':
+            return [cls(isostr, sep) for isostr in iterable]
+        # Avoid attribute lookups inside the loop
+        match = cls.fast_regex.match
+        from_match = cls.__new_from_match__
+        result = []
+        append = result.append
+        for isostr in iterable:
+            mobj = match(isostr)
+            if mobj:
+                append(from_match(mobj))
+            else:
+                append(cls(isostr))
+        return result
+
+    @classmethod
+    def utc_offset(cls, offset_string):
+        """
+        Return (possibly cached) ``UTCOffset`` instance for ``offset_string``
+
+        :param offset_string: Offset from UTC, e.g. ``'-04:00'``
+        """
+        cache = cls._utc_offsets
+        try:
+            tzn = cache.pop(offset_string)
+        except KeyError:
+            tzn = cls.UTCOffset(offset_string)
+            while len(cache) >= cls.utc_offset_cache_size:
+                cache.popitem(last=False)
+        cache[offset_string] = tzn  # most-recently used goes last
+        return tzn
+
+    @classmethod
+    def __new_from_match__(cls, mobj):
+        (year, month, day,
+         hour, minute, second, sec_frac, zone) = mobj.groups()
+        if sec_frac:
+            # Truncate decimal fraction into microseconds
+            microsecond = int(sec_frac[:6].ljust(6, '0'))
+        else:
+            microsecond = 0
+        if zone is None or zone in 'zZ':
+            tzn = cls.UTC()
+        else:
+            tzn = cls.utc_offset(zone)
+        return datetime.datetime.__new__(cls, int(year), int(month), int(day),
+                                         int(hour), int(minute), int(second),
+                                         microsecond, tzn)
+
+    @classmethod
+    def __patterns__(cls, sep):
+        if sep is None:
+            sep = 'T'
+        patterns = cls._patterns.get(sep)
+        if patterns is None:
+            base = "%s%s%s" % (r"(\s*\d{4})-(\d{2})-(\d{2})",
+                               sep,
+                               r"(\d{2}):(\d{2}):(\d{2})")
+            patterns = {'base': re.compile(base),
+                        'us': re.compile(base + r"\.(\d+)"),
+                        # optional non-capturing seconds-fraction
+                        # parsed by __new_us__()
+                        'tzoffset': re.compile(base +
+                                               r"(?:\.(\d+))?"
+                                               r"([+-]{1}\d{2}:\d{2})")}
+            cls._patterns[sep] = patterns
+        return patterns
+
+    @classmethod
+    def __new_zulu__(cls, isostr, patterns, values, keys, tzn):
         # may or may not have fractional seconds
-        has_us = cls.__new_us__(isostr, base, values, keys, tzn)
+        has_us = cls.__new_us__(isostr, patterns, values, keys, tzn)
         if has_us:
             return True
         else:
-            regex = re.compile(base)
-            mobj = regex.search(isostr)
+            mobj = patterns['base'].search(isostr)
             if mobj:
                 values += list(mobj.groups())
                 keys.append('tzinfo')
@@ -133,15 +223,13 @@ class DockerTime(datetime.datetime):  # pylint: disable=R0903
             return False
 
     @classmethod
-    def __new_us__(cls, isostr, base, values, keys, tzn):
+    def __new_us__(cls, isostr, patterns, values, keys, tzn):
         # Try with interpreted microseconds
-        regex = re.compile(base + r"\.(\d+)")
-        mobj = regex.search(isostr)
+        mobj = patterns['us'].search(isostr)
         if mobj:
             values += list(mobj.groups())
-            # Convert seconds decimal fraction into microseconds
-            sec_frac = float("0.%s" % values[-1])
-            values[-1] = int(sec_frac * 1000000)
+            # Truncate seconds decimal fraction into microseconds
+            values[-1] = int(values[-1][:6].ljust(6, '0'))
             keys.append('microsecond')
             values.append(tzn)
             keys.append('tzinfo')
@@ -149,16 +237,14 @@ class DockerTime(datetime.datetime):  # pylint: disable=R0903
         return False
 
     @classmethod
-    def __new_tzoffset__(cls, isostr, base, values, keys, tzn):
-        # Check if ends with +/-00:00 timezone offset, optional
-        # non-capturing seconds-fraction parsed by __new_us__()
-        regex = re.compile(base + r"(?:\.(\d+))?([+-]{1}\d{2}:\d{2})")
-        mobj = regex.search(isostr)
+    def __new_tzoffset__(cls, isostr, patterns, values, keys, tzn):
+        # Check if ends with +/-00:00 timezone offset
+        mobj = patterns['tzoffset'].search(isostr)
         if mobj:
-            tzn = cls.UTCOffset(mobj.group(8))
-            # Remove timezone from string, attempt parsing with __new_us__
+            tzn = cls.utc_offset(mobj.group(8))
+            # Remove timezone from string, seconds fraction is optional
             isostr = isostr[0:len(isostr) - len(mobj.group(8))]
-            return cls.__new_us__(isostr, base, values, keys, tzn)
+            return cls.__new_zulu__(isostr, patterns, values, keys, tzn)
         return False
 
     def is_undefined(self):
@@ -3,6 +3,7 @@
 import os
 import select
 import re
+import threading
 from time import time
 
 
@@ -138,6 +139,50 @@ class UnseenLines(object):
         self._integrate()
 
 
+class TimedLines(object):
+    """
+    File-like sink recording complete lines with their arrival time.
+    Intended as a ``stdout_tee`` for ``DockerCmd``/``AsyncDockerCmd``,
+    where ``write()`` is called from another thread as output arrives.
+    """
+
+    #: List of tuple(arrival time, line w/o newline), in order received
+    lines = None
+
+    def __init__(self):
+        self.lines = []
+        self._partial = ''
+        self._cond = threading.Condition()
+
+    def write(self, data):
+        """Record any complete lines in data, waking up ``wait_past()``"""
+        now = time()
+        with self._cond:
+            newlines = (self._partial + data).split('\n')
+            self._partial = newlines.pop()  # Incomplete (or empty)
+            if newlines:
+                self.lines += [(now, line.rstrip('\r'))
+                               for line in newlines]
+                self._cond.notify_all()
+
+    def flush(self):
+        """Lines are recorded as they complete, nothing to do"""
+        pass
+
+    def wait_past(self, idx, timeout):
+        """
+        Return lines beyond index ``idx``, waiting up to timeout for any
+
+        :param idx: Number of lines already seen by caller
+        :param timeout: Maximum seconds to wait for a new line
+        :returns: Possibly empty list of tuple(arrival time, line)
+        """
+        with self._cond:
+            if len(self.lines) <= idx and timeout > 0:
+                self._cond.wait(timeout)
+            return self.lines[idx:]
+
+
 class UnseenlineMatchTimeout(RuntimeError):
 
     """Exception raised from a ``*Match`` class, on timeout expiration"""
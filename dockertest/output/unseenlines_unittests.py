@@ -246,6 +246,35 @@ class UnseenLinesTestpty(UnseenLinesTestBase):
         self.assertEqual(nl.peek(), 'bar')
         self.assertEqual(nl.nextline(), None)
 
+
+class TimedLinesTest(unittest.TestCase):
+
+    def setUp(self):
+        from dockertest.output import TimedLines
+        self.timedlines = TimedLines()
+
+    def test_partial(self):
+        tl = self.timedlines
+        tl.write("foo\nba")
+        self.assertEqual([line for _, line in tl.lines], ['foo'])
+        tl.write("r\r\nbaz")
+        tl.flush()
+        self.assertEqual([line for _, line in tl.lines], ['foo', 'bar'])
+
+    def test_wait_past(self):
+        import threading
+        tl = self.timedlines
+        self.assertEqual(tl.wait_past(0, 0), [])
+        tl.write("foo\n")
+        self.assertEqual([line for _, line in tl.wait_past(0, 0)], ['foo'])
+        self.assertEqual(tl.wait_past(1, 0.01), [])
+        writer = threading.Timer(0.01, tl.write, ["bar\n"])
+        writer.start()
+        # Wakes on write, not by timing out
+        new = tl.wait_past(1, 60)
+        writer.join()
+        self.assertEqual([line for _, line in new], ['bar'])
+
 # FIXME: Need unittest for UnseenLineMatch
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403,C0413
+
+import os
+import tempfile
+import microbench
+microbench.mock_autotest()
+from fakedocker import PS_COLUMNS, format_table, synthesize
+from output import ColumnRanges, DockerTime, OutputGood, TextTable
+from output import TimedLines, UnseenLines
+
+
+class CmdResult(object):
+
+    """Just enough of autotest's CmdResult for OutputGood"""
+
+    def __init__(self, stdout, stderr='', exit_status=0):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_status = exit_status
+
+
+class ColumnRangesHeader(microbench.Benchmark):
+
+    sizes = (4, 16, 64)
+
+    def setup(self, size):
+        self.header = '   '.join('COLUMN %d' % num for num in xrange(size))
+
+    def run(self):
+        ColumnRanges(self.header)
+
+
+class TextTablePs(microbench.Benchmark):
+
+    def setup(self, size):
+        rows = []
+        for cntr in synthesize(containers=size)['containers']:
+            rows.append([cntr['Id'], cntr['Image'], cntr['Command'],
+                         '2 hours ago', 'Exited (0) 2 hours ago', '',
+                         cntr['Names'][0][1:]])
+        self.table = format_table(PS_COLUMNS, rows)
+
+    def run(self):
+        list(TextTable(self.table))
+
+
+class DockerTimeParseMany(microbench.Benchmark):
+
+    def setup(self, size):
+        self.timestamps = ['2017-%02d-%02dT%02d:%02d:%02d.%09d-04:00'
+                           % (1 + num % 12, 1 + num % 28, num % 24, num % 60,
+                              num % 60, num) for num in xrange(size)]
+
+    def run(self):
+        DockerTime.parse_many(self.timestamps)
+
+
+class OutputGoodCheck(microbench.Benchmark):
+
+    def setup(self, size):
+        self.cmdresult = CmdResult(''.join('line %d of container output\n'
+                                           % num for num in xrange(size)))
+
+    def run(self):
+        OutputGood(self.cmdresult)
+
+
+class TimedLinesWrite(microbench.Benchmark):
+
+    def setup(self, size):
+        # Writes arrive in chunks, splitting lines at arbitrary offsets
+        data = ''.join('line %d of container output\n' % num
+                       for num in xrange(size))
+        self.chunks = [data[offset:offset + 4096]
+                       for offset in xrange(0, len(data), 4096)]
+
+    def run(self):
+        timedlines = TimedLines()
+        for chunk in self.chunks:
+            timedlines.write(chunk)
+
+
+class UnseenLinesRead(microbench.Benchmark):
+
+    def setup(self, size):
+        self.fd, self.path = tempfile.mkstemp(prefix=self.__class__.__name__)
+        os.write(self.fd, ''.join('line %d of container output\n' % num
+                                  for num in xrange(size)))
+
+    def run(self):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        unseenlines = UnseenLines(self.fd)
+        while unseenlines.nextline() is not None:
+            pass
+
+    def teardown(self):
+        os.close(self.fd)
+        os.unlink(self.path)
+
+
+if __name__ == '__main__':
+    microbench.main()
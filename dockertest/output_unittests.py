@@ -486,5 +486,76 @@ class TestDtFromIso(unittest.TestCase):
     def test_unparsable(self):
         self.assertRaises(ValueError, self.dockertime, "2015-03-02 17:04:20z")
 
+    def test_offset_no_point(self):
+        import datetime
+        isostr = "2015-03-02T17:04:20-04:00"
+        dt = self.dockertime(isostr)
+        tz = self.dockertime.UTCOffset("-04:00")
+        expected = datetime.datetime(year=2015, month=3, day=2,
+                                     hour=17, minute=4, second=20,
+                                     tzinfo=tz)
+        self.assertEqual(dt, expected)
+
+    def test_other_sep(self):
+        dt = self.dockertime("2015-03-02 17:04:20.569Z", ' ')
+        expected = self.datetime(year=2015, month=3, day=2,
+                                 hour=17, minute=4, second=20,
+                                 microsecond=569000, tzinfo=self.utc)
+        self.assertEqual(dt, expected)
+
+    def test_other_sep_offset(self):
+        dt = self.dockertime("2015-03-02 17:04:20-04:00", ' ')
+        self.assertEqual(dt, self.dockertime("2015-03-02T17:04:20-04:00"))
+        self.assertEqual(dt.utcoffset(), self.datetime(2015, 3, 2, 13) -
+                         self.datetime(2015, 3, 2, 17))
+        dt = self.dockertime("2015-03-02 17:04:20.5+01:30", ' ')
+        self.assertEqual(dt, self.dockertime("2015-03-02T17:04:20.5+01:30"))
+
+    def test_utc_offset_cached(self):
+        first = self.dockertime.utc_offset("+01:30")
+        self.assertTrue(first is self.dockertime.utc_offset("+01:30"))
+        dt1 = self.dockertime("2015-03-02T17:04:20.1+01:30")
+        dt2 = self.dockertime("2015-03-02T17:04:21.2+01:30")
+        self.assertTrue(dt1.tzinfo is dt2.tzinfo)
+
+    def test_utc_offset_lru(self):
+        size = self.dockertime.utc_offset_cache_size
+        first = self.dockertime.utc_offset("+00:01")
+        for minute in xrange(size + 1):
+            self.dockertime.utc_offset("-%02d:%02d" % divmod(minute, 60))
+        self.assertTrue(len(self.dockertime._utc_offsets) <= size)
+        self.assertFalse(first is self.dockertime.utc_offset("+00:01"))
+
+    def test_parse_many(self):
+        isostrs = ["2015-03-02T17:04:20Z",
+                   "2015-03-02T17:04:20.569502125Z",
+                   "2016-04-06T09:53:33.265109190-04:00",
+                   "  ahhhh!2015-03-02T17:04:20z2015-03-02 17:04:20"]
+        expected = [self.dockertime(isostr) for isostr in isostrs]
+        self.assertEqual(self.dockertime.parse_many(isostrs), expected)
+        self.assertEqual(self.dockertime.parse_many(iter(isostrs)), expected)
+
+    def test_parse_many_unparsable(self):
+        self.assertRaises(ValueError, self.dockertime.parse_many,
+                          ["2015-03-02T17:04:20Z", "2015-03-02 17:04:20z"])
+
+
+class DockerTimeBulk(unittest.TestCase):
+
+    #: Number of timestamps to parse
+    count = 20000
+
+    def setUp(self):
+        import output
+        self.dockertime = output.DockerTime
+        self.isostrs = ["2016-04-%02dT%02d:%02d:%02d.%09d%s"
+                        % (1 + i % 28, i % 24, i % 60, (i * 7) % 60,
+                           i * 7919, ('Z', '-04:00', '+05:30')[i % 3])
+                        for i in xrange(self.count)]
+
+    def test_parse_many_same(self):
+        single = [self.dockertime(isostr) for isostr in self.isostrs]
+        self.assertEqual(self.dockertime.parse_many(self.isostrs), single)
+
 if __name__ == '__main__':
     unittest.main()
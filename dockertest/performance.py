@@ -0,0 +1,354 @@
+"""
+Helpers for collecting, summarizing and reporting timing measurements
+
+Performance subtests record samples (usually seconds) into named phases
+of a ``Samples`` instance.  The summary statistics are flattened into
+test keyvals for autotest, and the complete data set is written into
+a JSON results file, for consumption by other tools.
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+#: Names of summary statistics, in reporting order
+STATISTICS = ('count', 'min', 'mean', 'p50', 'p90', 'p99', 'max')
+
+#: Mapping of ``/proc/<pid>/status`` field names to ``proc_status()`` keys
+PROC_STATUS_FIELDS = {'VmRSS': 'rss_kb',
+                      'VmHWM': 'hwm_kb',
+                      'Threads': 'threads'}
+
+
+def percentile(ordered, percent):
+    """
+    Return nearest-rank ``percent`` percentile of sorted ``ordered`` values
+
+    :param ordered: Non-empty sequence of values, sorted in ascending order
+    :param percent: Percentile to return, from 0 through 100 (inclusive)
+    :raise ValueError: If ordered is empty, or percent is out of range
+    """
+    if not ordered:
+        raise ValueError("Percentile of empty sequence is undefined")
+    if percent < 0 or percent > 100:
+        raise ValueError("Percentile %s is not within 0 - 100" % percent)
+    rank = int(math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def summarize(samples):
+    """
+    Return dictionary of ``STATISTICS`` names to values for ``samples``
+
+    :param samples: Non-empty iterable of numeric values, in any order
+    :raise ValueError: If samples is empty
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        raise ValueError("Can't summarize empty list of samples")
+    return {'count': len(ordered),
+            'min': ordered[0],
+            'mean': sum(ordered) / float(len(ordered)),
+            'p50': percentile(ordered, 50),
+            'p90': percentile(ordered, 90),
+            'p99': percentile(ordered, 99),
+            'max': ordered[-1]}
+
+
+def parse_thresholds(items):
+    """
+    Return dictionary of '<phase>_<statistic>' to float limit from ``items``
+
+    :param items: Iterable of '<phase>_<statistic>:<limit>' strings,
+                  e.g. ``get_as_list(self.config['thresholds'])``.
+    :raise ValueError: If any item is malformed or names unknown statistic
+    """
+    thresholds = {}
+    for item in items:
+        try:
+            key, limit = item.rsplit(':', 1)
+            thresholds[key.strip()] = float(limit)
+        except ValueError:
+            raise ValueError("Malformed threshold '%s', expecting "
+                             "<phase>_<statistic>:<limit>" % item)
+        if key.strip().rsplit('_', 1)[-1] not in STATISTICS:
+            raise ValueError("Threshold '%s' statistic is not one of %s"
+                             % (item, ', '.join(STATISTICS)))
+    return thresholds
+
+
+def linear_fit(values):
+    """
+    Return least-squares slope and r-squared of ``values`` over their index
+
+    :param values: Sequence of at least two numbers, sampled at equal intervals
+    :returns: Tuple of slope (change per sample), and coefficient of
+              determination from 0.0 (no linear trend) to 1.0 (perfectly
+              linear).  A constant sequence has slope and r-squared of 0.0
+    :raise ValueError: If there are less than two values
+    """
+    count = len(values)
+    if count < 2:
+        raise ValueError("Can't fit a line through less than two values")
+    mean_x = (count - 1) / 2.0
+    mean_y = sum(values) / float(count)
+    s_xy = sum((index - mean_x) * (value - mean_y)
+               for index, value in enumerate(values))
+    s_xx = sum((index - mean_x) ** 2 for index in xrange(count))
+    s_yy = sum((value - mean_y) ** 2 for value in values)
+    if s_yy == 0:
+        return (0.0, 0.0)
+    return (s_xy / s_xx, s_xy ** 2 / (s_xx * s_yy))
+
+
+def proc_status(pid, procfs='/proc'):
+    """
+    Return dictionary of current resource usage by process ``pid``
+
+    :param pid: Process ID to examine
+    :param procfs: Mount point of the proc filesystem
+    :returns: Dictionary with ``PROC_STATUS_FIELDS`` values and ``fds`` keys
+    :raise IOError: If the process does not exist (any longer)
+    """
+    result = {}
+    with open(os.path.join(procfs, str(pid), 'status'), 'rb') as status:
+        for line in status:
+            name, _, value = line.partition(':')
+            key = PROC_STATUS_FIELDS.get(name)
+            if key is not None:
+                result[key] = int(value.split()[0])
+    try:
+        result['fds'] = len(os.listdir(os.path.join(procfs, str(pid), 'fd')))
+    except OSError, xcept:
+        raise IOError(str(xcept))
+    return result
+
+
+def present_images(subtest, images, wanted):
+    """
+    Return list of default image, then every ``wanted`` image present locally
+
+    :param subtest: Subtest or SubSubtest, warned about missing images
+    :param images: ``DockerImages`` instance
+    :param wanted: Iterable of fully qualified image names
+    """
+    fqins = [images.default_image]
+    for fqin in wanted:
+        if fqin in fqins:
+            continue
+        if images.list_imgs_with_full_name(fqin):
+            fqins.append(fqin)
+        else:
+            subtest.logwarning("Skipping image %s, not present locally", fqin)
+    return fqins
+
+
+def transfer_result(samples, size):
+    """
+    Return ``samples.as_dict()`` plus MB/s of each phase's median duration
+
+    :param samples: ``Samples`` of seconds taken to transfer size bytes
+    :param size: Number of bytes transferred by every sample
+    """
+    result = samples.as_dict(bytes=size)
+    result['mb_per_sec'] = OrderedDict()
+    for phase, stats in result['summary'].iteritems():
+        result['mb_per_sec'][phase] = size / 1048576.0 / stats['p50']
+    return result
+
+
+def report_transfers(subtest, results, filename):
+    """
+    Log and write keyvals of ``transfer_result()``s, write them as JSON
+
+    :param subtest: SubSubtest instance, keyvals and the JSON file go
+                    to it's ``parent_subtest``
+    :param results: Mapping of image name to ``transfer_result()``
+    :param filename: Name of JSON file in parent subtest's resultsdir
+    """
+    keyvals = {}
+    for fqin, result in results.iteritems():
+        prefix = 'streaming_%s' % re.sub(r'[^\w.-]', '_', fqin)
+        keyvals['%s_bytes' % prefix] = result['bytes']
+        for phase, stats in result['summary'].iteritems():
+            rate = result['mb_per_sec'][phase]
+            subtest.loginfo("%s %s: %0.2f MB/s", fqin, phase, rate)
+            keyvals['%s_%s_mb_per_sec' % (prefix, phase)] = rate
+            keyvals['%s_%s_seconds' % (prefix, phase)] = stats['p50']
+    subtest.parent_subtest.write_test_keyval(keyvals)
+    path = os.path.join(subtest.parent_subtest.resultsdir, filename)
+    with open(path, 'wb') as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+class Samples(object):
+
+    """
+    Ordered collection of measurement lists, keyed by phase name
+
+    :param unit: Name of the unit all samples are measured in
+    """
+
+    def __init__(self, unit='seconds'):
+        #: Unit of measurement for all samples
+        self.unit = unit
+        #: Mapping of phase name to list of samples, in phase-creation order
+        self.phases = OrderedDict()
+
+    def __len__(self):
+        return len(self.phases)
+
+    def __contains__(self, phase):
+        return phase in self.phases
+
+    def __getitem__(self, phase):
+        return self.phases[phase]
+
+    def add(self, phase, value):
+        """
+        Append ``value`` to list of samples for ``phase``
+
+        :param phase: Name of the phase being measured
+        :param value: Numeric measurement
+        """
+        self.phases.setdefault(phase, []).append(value)
+
+    def timer(self, phase):
+        """
+        Return context manager which adds its wall-clock duration to ``phase``
+
+        :param phase: Name of the phase being measured
+        """
+        return _PhaseTimer(self, phase)
+
+    def summary(self):
+        """
+        Return ordered dictionary of phase name to ``summarize()`` results
+        """
+        return OrderedDict((phase, summarize(values))
+                           for phase, values in self.phases.iteritems()
+                           if values)
+
+    def keyvals(self, prefix=None):
+        """
+        Return flattened summary as '<prefix>_<phase>_<statistic>' keyvals
+
+        :param prefix: Optional string to prepend to every key
+        """
+        keyvals = {}
+        for phase, stats in self.summary().iteritems():
+            for stat in STATISTICS:
+                if prefix:
+                    key = "%s_%s_%s" % (prefix, phase, stat)
+                else:
+                    key = "%s_%s" % (phase, stat)
+                keyvals[key] = stats[stat]
+        return keyvals
+
+    def exceeded(self, thresholds):
+        """
+        Return list of messages describing statistics above ``thresholds``
+
+        :param thresholds: Dictionary from ``parse_thresholds()``
+        """
+        messages = []
+        unit = ' %s' % self.unit if self.unit else ''
+        for phase, stats in self.summary().iteritems():
+            for stat in STATISTICS:
+                key = "%s_%s" % (phase, stat)
+                limit = thresholds.get(key)
+                if limit is not None and stats[stat] > limit:
+                    messages.append("%s %s%s exceeds threshold %s"
+                                    % (key, stats[stat], unit, limit))
+        return messages
+
+    def as_dict(self, **extra):
+        """
+        Return JSON-serializable representation including all samples
+
+        :param extra: Additional top-level items to include (e.g. parameters)
+        """
+        result = OrderedDict(extra)
+        result['unit'] = self.unit
+        result['summary'] = self.summary()
+        result['samples'] = self.phases
+        return result
+
+    def write_json(self, path, **extra):
+        """
+        Write ``as_dict()`` results as JSON into file at ``path``
+
+        :param path: Full path to file which will be overwritten
+        :param extra: Additional top-level items to include (e.g. parameters)
+        """
+        with open(path, 'wb') as results:
+            json.dump(self.as_dict(**extra), results, indent=2)
+            results.write('\n')
+
+
+class ResourceSampler(threading.Thread):
+
+    """
+    Background thread recording ``proc_status()`` of a process periodically
+
+    :param pid: Process ID to sample, e.g. from ``docker_daemon.pid()``
+    :param interval: Seconds between samples
+    """
+
+    def __init__(self, pid, interval=1.0):
+        super(ResourceSampler, self).__init__(name='ResourceSampler-%s' % pid)
+        self.daemon = True
+        self.pid = pid
+        self.interval = interval
+        #: Phase names are ``proc_status()`` keys, units vary by key
+        self.samples = Samples(unit=None)
+        self._stopped = threading.Event()
+
+    def sample(self):
+        """Record one sample, return False if the process has gone away"""
+        try:
+            status = proc_status(self.pid)
+        except IOError:
+            return False
+        for key, value in sorted(status.items()):
+            self.samples.add(key, value)
+        return True
+
+    def run(self):
+        while self.sample() and not self._stopped.is_set():
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        """Record a final sample, then stop and join the thread"""
+        self._stopped.set()
+        self.join()
+        self.sample()
+        return self.samples
+
+
+class _PhaseTimer(object):
+
+    # Context manager returned by Samples.timer(), records duration only
+    # when the body completes without an exception.
+
+    def __init__(self, samples, phase):
+        self.samples = samples
+        self.phase = phase
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.samples.add(self.phase, time.time() - self.start)
+        return False
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class PerformanceTestBase(unittest.TestCase):
+
+    def setUp(self):
+        import performance
+        self.performance = performance
+
+    def tearDown(self):
+        del self.performance
+
+
+class PercentileTest(PerformanceTestBase):
+
+    def test_empty(self):
+        self.assertRaises(ValueError, self.performance.percentile, [], 50)
+
+    def test_range(self):
+        self.assertRaises(ValueError, self.performance.percentile, [1], -1)
+        self.assertRaises(ValueError, self.performance.percentile, [1], 101)
+
+    def test_nearest_rank(self):
+        ordered = range(1, 101)
+        self.assertEqual(self.performance.percentile(ordered, 0), 1)
+        self.assertEqual(self.performance.percentile(ordered, 50), 50)
+        self.assertEqual(self.performance.percentile(ordered, 90), 90)
+        self.assertEqual(self.performance.percentile(ordered, 99), 99)
+        self.assertEqual(self.performance.percentile(ordered, 100), 100)
+
+    def test_single(self):
+        self.assertEqual(self.performance.percentile([42], 99), 42)
+
+
+class SummarizeTest(PerformanceTestBase):
+
+    def test_empty(self):
+        self.assertRaises(ValueError, self.performance.summarize, [])
+
+    def test_unordered(self):
+        stats = self.performance.summarize([3, 1, 4, 1, 5, 9, 2, 6])
+        self.assertEqual(stats['count'], 8)
+        self.assertEqual(stats['min'], 1)
+        self.assertEqual(stats['max'], 9)
+        self.assertAlmostEqual(stats['mean'], 31 / 8.0)
+        self.assertEqual(stats['p50'], 3)
+        self.assertEqual(stats['p99'], 9)
+        self.assertEqual(sorted(stats.keys()),
+                         sorted(self.performance.STATISTICS))
+
+
+class ThresholdsTest(PerformanceTestBase):
+
+    def test_parse(self):
+        thresholds = self.performance.parse_thresholds(['start_p90:1.5',
+                                                        ' rm_max : 10'])
+        self.assertEqual(thresholds, {'start_p90': 1.5, 'rm_max': 10.0})
+
+    def test_malformed(self):
+        self.assertRaises(ValueError,
+                          self.performance.parse_thresholds, ['start_p90'])
+        self.assertRaises(ValueError,
+                          self.performance.parse_thresholds, ['start_p90:x'])
+        self.assertRaises(ValueError,
+                          self.performance.parse_thresholds, ['start_p95:1'])
+
+
+class SamplesTest(PerformanceTestBase):
+
+    def setUp(self):
+        super(SamplesTest, self).setUp()
+        self.samples = self.performance.Samples()
+        for value in xrange(1, 11):
+            self.samples.add('create', value / 10.0)
+            self.samples.add('start', value)
+
+    def test_phase_order(self):
+        self.samples.add('aaa', 1)
+        self.assertEqual(self.samples.phases.keys(),
+                         ['create', 'start', 'aaa'])
+        self.assertEqual(self.samples.summary().keys(),
+                         ['create', 'start', 'aaa'])
+        self.assertTrue('aaa' in self.samples)
+        self.assertEqual(len(self.samples), 3)
+
+    def test_keyvals(self):
+        keyvals = self.samples.keyvals('foo')
+        self.assertEqual(len(keyvals), 2 * len(self.performance.STATISTICS))
+        self.assertEqual(keyvals['foo_start_max'], 10)
+        self.assertEqual(keyvals['foo_create_count'], 10)
+        self.assertEqual(self.samples.keyvals()['start_p50'], 5)
+
+    def test_exceeded(self):
+        thresholds = {'start_p50': 5, 'start_max': 9.5, 'create_p99': 0.5,
+                      'missing_max': 0}
+        messages = self.samples.exceeded(thresholds)
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(messages[0].startswith('create_p99'))
+        self.assertTrue(messages[1].startswith('start_max'))
+
+    def test_timer(self):
+        with self.samples.timer('timed'):
+            pass
+        self.assertEqual(len(self.samples['timed']), 1)
+        self.assertTrue(self.samples['timed'][0] >= 0)
+
+    def test_timer_exception(self):
+        def fail():
+            with self.samples.timer('failed'):
+                raise IOError()
+        self.assertRaises(IOError, fail)
+        self.assertFalse('failed' in self.samples)
+
+    def test_write_json(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'results.json')
+            self.samples.write_json(path, cycles=10)
+            with open(path, 'rb') as results:
+                data = json.load(results)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(data['cycles'], 10)
+        self.assertEqual(data['unit'], 'seconds')
+        self.assertEqual(len(data['samples']['start']), 10)
+        self.assertEqual(data['summary']['start']['max'], 10)
+
+
+class LinearFitTest(PerformanceTestBase):
+
+    def test_too_few(self):
+        self.assertRaises(ValueError, self.performance.linear_fit, [1])
+
+    def test_constant(self):
+        self.assertEqual(self.performance.linear_fit([5, 5, 5]), (0.0, 0.0))
+
+    def test_linear(self):
+        slope, r_squared = self.performance.linear_fit([1, 3, 5, 7])
+        self.assertAlmostEqual(slope, 2.0)
+        self.assertAlmostEqual(r_squared, 1.0)
+
+    def test_noisy(self):
+        slope, r_squared = self.performance.linear_fit([10, 1, 9, 2, 10])
+        self.assertTrue(abs(slope) < 1)
+        self.assertTrue(r_squared < 0.1)
+
+
+class ProcStatusTest(PerformanceTestBase):
+
+    def test_self(self):
+        status = self.performance.proc_status(os.getpid())
+        self.assertEqual(sorted(status.keys()),
+                         ['fds', 'hwm_kb', 'rss_kb', 'threads'])
+        self.assertTrue(status['rss_kb'] > 0)
+        self.assertTrue(status['hwm_kb'] >= status['rss_kb'])
+        self.assertTrue(status['threads'] >= 1)
+        self.assertTrue(status['fds'] >= 3)
+
+    def test_missing(self):
+        procfs = tempfile.mkdtemp()
+        try:
+            self.assertRaises(IOError, self.performance.proc_status,
+                              1, procfs)
+            os.makedirs(os.path.join(procfs, '1'))
+            with open(os.path.join(procfs, '1', 'status'), 'wb') as status:
+                status.write("Name:\tfoo\nVmRSS:\t  1234 kB\n")
+            self.assertRaises(IOError, self.performance.proc_status,
+                              1, procfs)
+            os.makedirs(os.path.join(procfs, '1', 'fd', '0'))
+            self.assertEqual(self.performance.proc_status(1, procfs),
+                             {'rss_kb': 1234, 'fds': 1})
+        finally:
+            shutil.rmtree(procfs)
+
+
+class FakeImages(object):
+
+    default_image = 'default:latest'
+
+    @staticmethod
+    def list_imgs_with_full_name(fqin):
+        if fqin.startswith('present'):
+            return [fqin]
+        return []
+
+
+class FakeParent(object):
+
+    def __init__(self, resultsdir):
+        self.resultsdir = resultsdir
+        self.keyvals = {}
+
+    def write_test_keyval(self, keyvals):
+        self.keyvals.update(keyvals)
+
+
+class FakeSubSubtest(object):
+
+    def __init__(self, resultsdir=None):
+        self.parent_subtest = FakeParent(resultsdir)
+        self.warnings = []
+        self.infos = []
+
+    def logwarning(self, message, *args):
+        self.warnings.append(message % args)
+
+    def loginfo(self, message, *args):
+        self.infos.append(message % args)
+
+
+class TransferTest(PerformanceTestBase):
+
+    def test_present_images(self):
+        subtest = FakeSubSubtest()
+        fqins = self.performance.present_images(
+            subtest, FakeImages(), ['present/a', 'absent/b',
+                                    'default:latest', 'present/a'])
+        self.assertEqual(fqins, ['default:latest', 'present/a'])
+        self.assertEqual(len(subtest.warnings), 1)
+        self.assertTrue('absent/b' in subtest.warnings[0])
+
+    def test_report(self):
+        samples = self.performance.Samples()
+        for seconds in (1.0, 2.0, 4.0):
+            samples.add('disk', seconds)
+            samples.add('pipe', seconds / 2)
+        result = self.performance.transfer_result(samples, 2 * 1048576)
+        self.assertEqual(result['mb_per_sec'].keys(), ['disk', 'pipe'])
+        self.assertAlmostEqual(result['mb_per_sec']['disk'], 1.0)
+        self.assertAlmostEqual(result['mb_per_sec']['pipe'], 2.0)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            subtest = FakeSubSubtest(tmpdir)
+            self.performance.report_transfers(subtest,
+                                              {'foo/bar:1': result},
+                                              'results.json')
+            with open(os.path.join(tmpdir, 'results.json'), 'rb') as results:
+                data = json.load(results)
+        finally:
+            shutil.rmtree(tmpdir)
+        keyvals = subtest.parent_subtest.keyvals
+        self.assertEqual(keyvals['streaming_foo_bar_1_bytes'], 2 * 1048576)
+        self.assertAlmostEqual(keyvals['streaming_foo_bar_1_pipe_seconds'],
+                               1.0)
+        self.assertEqual(len(subtest.infos), 2)
+        self.assertEqual(data['foo/bar:1']['bytes'], 2 * 1048576)
+
+
+class ResourceSamplerTest(PerformanceTestBase):
+
+    def test_sample(self):
+        sampler = self.performance.ResourceSampler(os.getpid(), 0.01)
+        sampler.start()
+        samples = sampler.stop()
+        self.assertFalse(sampler.is_alive())
+        self.assertTrue(len(samples['rss_kb']) >= 2)
+        self.assertEqual(len(samples['rss_kb']), len(samples['fds']))
+        self.assertEqual(samples.exceeded({'fds_max': 0})[0].count(' '), 4)
+
+if __name__ == '__main__':
+    unittest.main()
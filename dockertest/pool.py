@@ -0,0 +1,178 @@
+"""
+Pool of pre-created containers, for tests needing any simple container
+
+Tests which only need *some* container (e.g. to inspect, exec into, or
+kill) ``acquire()`` one from a ``ContainerPool``, instead of paying the
+create & start latency themselves.  A background thread keeps
+``size`` spare containers ready for every (image, command, options)
+template requested so far, and removes ``release()``'d containers.
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import threading
+from collections import deque
+from containers import DockerContainers
+from dockercmd import DockerCmd
+from deferred import remove_containers
+from images import DockerImage
+from output import mustpass
+
+
+#: Command run by pooled containers, unless another is requested
+DEFAULT_COMMAND = ('/bin/bash', '-c', 'while :; do sleep 1; done')
+
+
+class ContainerPool(object):
+
+    """
+    Keeps ``size`` spare containers of every requested template ready
+
+    :param subtest: Subtest instance owning all pooled containers
+    :param size: Number of spare containers kept per template
+    :param start: When True, containers are also started, not just created
+    """
+
+    def __init__(self, subtest, size=2, start=True):
+        self.subtest = subtest
+        self.size = size
+        self.start = start
+        # Guards everything below, signals background thread
+        self._condition = threading.Condition()
+        self._spares = {}
+        self._wanted = set()
+        self._released = []
+        self._in_use = set()
+        self._closed = False
+        self._thread = threading.Thread(target=self._background,
+                                        name=self.__class__.__name__)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def template(self, image=None, command=None, subargs=None):
+        """
+        Return hashable template for container options
+
+        :param image: Image name, or None for default test image
+        :param command: List of command & arguments, or None for
+                        ``DEFAULT_COMMAND``
+        :param subargs: List of extra ``docker create`` options, or None
+        """
+        if image is None:
+            image = DockerImage.full_name_from_defaults(self.subtest.config)
+        if command is None:
+            command = DEFAULT_COMMAND
+        return (image, tuple(command), tuple(subargs or ()))
+
+    def unique_name(self):
+        """Return new container name, not used by any existing container"""
+        return DockerContainers(self.subtest).get_unique_name('pool',
+                                                              length=8)
+
+    def create(self, template):
+        """
+        Create (and start) a container from template, return it's name
+
+        :raise DockerExecError: If a docker command fails
+        """
+        image, command, subargs = template
+        name = self.unique_name()
+        subargs = ['--name', name] + list(subargs) + [image] + list(command)
+        mustpass(DockerCmd(self.subtest, 'create', subargs,
+                           verbose=False).execute())
+        if self.start:
+            mustpass(DockerCmd(self.subtest, 'start', [name],
+                               verbose=False).execute())
+        return name
+
+    def acquire(self, image=None, command=None, subargs=None):
+        """
+        Return name of a container for caller's exclusive use
+
+        A spare is handed out when available, otherwise one is created
+        immediately.  Either way, spares are replenished in the background.
+        Parameters are the same as for ``template()``.
+        """
+        template = self.template(image, command, subargs)
+        with self._condition:
+            spares = self._spares.setdefault(template, deque())
+            name = spares.popleft() if spares else None
+            self._wanted.add(template)
+            self._condition.notify()
+        if name is None:
+            name = self.create(template)
+        with self._condition:
+            self._in_use.add(name)
+        return name
+
+    def release(self, name):
+        """
+        Return acquired container, for removal in the background
+
+        :param name: Name returned by ``acquire()``
+        """
+        with self._condition:
+            self._in_use.discard(name)
+            self._released.append(name)
+            self._condition.notify()
+
+    def _replenish(self):
+        """Return a template missing spares, or None"""
+        for template in self._wanted:
+            if len(self._spares[template]) < self.size:
+                return template
+        return None
+
+    def _background(self):
+        """Remove released containers, keep spares replenished, until closed"""
+        while True:
+            with self._condition:
+                while not (self._closed or self._released or
+                           self._replenish()):
+                    self._condition.wait()
+                if self._closed:
+                    return
+                released, self._released = self._released, []
+                template = self._replenish()
+            # Docker commands run w/o holding lock
+            if released:
+                error = remove_containers(self.subtest, released)
+                if error is not None:
+                    self.subtest.logwarning("Failed to remove released "
+                                            "pool containers: %s", error)
+            if template is None:
+                continue
+            try:
+                name = self.create(template)
+            # Any problem is also raised when acquire() falls back to create()
+            except Exception, xcept:  # pylint: disable=W0703
+                self.subtest.logwarning("Not replenishing container pool "
+                                        "for %s: %s", template, xcept)
+                with self._condition:
+                    self._wanted.discard(template)
+                continue
+            with self._condition:
+                self._spares[template].append(name)
+
+    def close(self):
+        """
+        Stop background thread, remove every spare, acquired and released
+        container
+
+        :return: Error message, or None if all were removed
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        names = list(self._in_use) + self._released
+        for spares in self._spares.itervalues():
+            names += spares
+        self._in_use.clear()
+        self._released = []
+        self._spares.clear()
+        self._wanted.clear()
+        if not names:
+            return None
+        return remove_containers(self.subtest, names)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import sys
+import threading
+import time
+import types
+import unittest
+
+
+def mock(mod_path):
+    name_list = mod_path.split('.')
+    child_name = name_list.pop()
+    child_mod = sys.modules.get(mod_path, types.ModuleType(child_name))
+    if len(name_list) == 0:  # child_name is left-most basic module
+        if child_name not in sys.modules:
+            sys.modules[child_name] = child_mod
+        return sys.modules[child_name]
+    else:
+        # New or existing child becomes parent
+        recurse_path = ".".join(name_list)
+        parent_mod = mock(recurse_path)
+        if not hasattr(sys.modules[recurse_path], child_name):
+            setattr(parent_mod, child_name, child_mod)
+            # full-name also points at child module
+            sys.modules[mod_path] = child_mod
+        return sys.modules[mod_path]
+
+
+class FakeCmdResult(object):
+
+    def __init__(self, **dargs):
+        for key, val in dargs.items():
+            setattr(self, key, val)
+
+#: Commands run, from any thread
+RUN_CACHE = []
+
+
+def run(command, *args, **dargs):
+    RUN_CACHE.append(command)
+    return FakeCmdResult(command=command, stdout='', stderr='',
+                         exit_status=0, duration=0)
+
+# Mock module and mock function run in one command
+setattr(mock('autotest.client.utils'), 'run', run)
+setattr(mock('autotest.client.utils'), 'CmdResult', FakeCmdResult)
+setattr(mock('autotest.client.shared.error'), 'CmdError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestFail', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestNAError', Exception)
+setattr(mock('autotest.client.shared.error'), 'AutotestError', Exception)
+mock('autotest.client.shared.utils')
+
+
+class PoolTest(unittest.TestCase):
+
+    config = {'docker_path': 'docker', 'docker_options': '',
+              'docker_timeout': 60.0,
+              'docker_repo_name': 'busybox', 'docker_repo_tag': 'latest',
+              'docker_registry_host': '', 'docker_registry_user': ''}
+
+    def setUp(self):
+        import pool
+        import subtestbase
+        del RUN_CACHE[:]
+
+        class FakeSubtest(subtestbase.SubBase):
+            config = self.config
+
+        class NumberedPool(pool.ContainerPool):
+            count = 0
+            lock = threading.Lock()
+
+            def unique_name(self):
+                with self.lock:
+                    self.count += 1
+                    return 'pool%d' % self.count
+
+        self.pool = NumberedPool(FakeSubtest(), size=2)
+
+    def tearDown(self):
+        self.pool.close()
+        del self.pool
+
+    def wait_for(self, condition):
+        for _ in xrange(500):
+            if condition():
+                return
+            time.sleep(0.01)
+        self.fail("Timed out waiting for background thread")
+
+    def spares(self):
+        return sum(len(spares) for spares in self.pool._spares.values())
+
+    def test_acquire_replenish(self):
+        first = self.pool.acquire()
+        self.assertIn('docker create --name %s busybox:latest /bin/bash -c '
+                      'while :; do sleep 1; done' % first, RUN_CACHE)
+        self.assertIn('docker start %s' % first, RUN_CACHE)
+        self.wait_for(lambda: self.spares() == 2)
+        # Handed out from spares
+        spares = list(self.pool._spares.values()[0])
+        second = self.pool.acquire()
+        self.assertEqual(second, spares[0])
+        self.wait_for(lambda: self.spares() == 2)
+        self.assertIn('docker start pool4', RUN_CACHE)
+        self.assertEqual(self.pool._in_use, set([first, second]))
+
+    def test_templates(self):
+        name = self.pool.acquire(command=['/bin/true'], subargs=['--rm'])
+        self.assertIn('docker create --name %s --rm busybox:latest /bin/true'
+                      % name, RUN_CACHE)
+        self.pool.acquire(image='fedora')
+        self.wait_for(lambda: self.spares() == 4)
+
+    def test_release_close(self):
+        name = self.pool.acquire()
+        self.wait_for(lambda: self.spares() == 2)
+        self.pool.release(name)
+        removal = 'docker rm --force --volumes %s' % name
+        self.wait_for(lambda: removal in RUN_CACHE)
+        self.assertEqual(self.pool.close(), None)
+        self.assertEqual(RUN_CACHE[-1].split()[:4],
+                         ['docker', 'rm', '--force', '--volumes'])
+        self.assertEqual(sorted(RUN_CACHE[-1].split()[4:]),
+                         sorted(set(['pool1', 'pool2', 'pool3']) -
+                                set([name])))
+        self.assertFalse(self.pool._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
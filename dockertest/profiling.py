@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+"""
+Opt-in profiling of a whole subtest, and merging of profiles across a job
+
+The ``profile`` option selects ``cpu`` (``cProfile``), ``mem`` (growth
+in live objects, by type) or ``none``.  ``Subtest.execute()`` runs all
+stages, including any sub-subtests, inside the selected profiler, which
+writes its reports into the subtest's ``debug`` results directory.
+
+Run this module with job results directories (or ``.prof`` files) as
+arguments, to total every CPU profile found by library source file.
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import argparse
+import cProfile
+import gc
+import json
+import os
+import pstats
+import resource
+import sys
+
+
+#: Values accepted by the ``profile`` option
+PROFILE_MODES = ('none', 'cpu', 'mem')
+
+#: File name suffix of ``cProfile`` data files
+PROF_SUFFIX = '.prof'
+
+#: Number of functions or types written into text reports
+TOP_ENTRIES = 40
+
+
+def type_counts():
+    """Return dictionary of qualified type name to count of live objects"""
+    counts = {}
+    for obj in gc.get_objects():
+        obj_type = type(obj)
+        name = '%s.%s' % (obj_type.__module__, obj_type.__name__)
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+class Profiler(object):
+
+    """
+    Abstract profiler, of everything between ``start()`` and ``stop()``
+
+    :param name: Base name for report files
+    :param dirpath: Existing directory to write report files into
+    """
+
+    def __init__(self, name, dirpath):
+        self.name = name
+        self.dirpath = dirpath
+
+    def path(self, suffix):
+        """Return path to report file name ending in suffix"""
+        return os.path.join(self.dirpath, self.name + suffix)
+
+    def start(self):
+        """Begin profiling"""
+        raise NotImplementedError
+
+    def stop(self):
+        """End profiling, write and return list of report file paths"""
+        raise NotImplementedError
+
+
+class CPUProfiler(Profiler):
+
+    """
+    Deterministic ``cProfile`` profile of calling thread, with text summary
+    """
+
+    profile = None
+
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        prof_path = self.path(PROF_SUFFIX)
+        self.profile.dump_stats(prof_path)
+        txt_path = self.path('_cpu.txt')
+        with open(txt_path, 'wb') as report:
+            stats = pstats.Stats(self.profile, stream=report)
+            stats.sort_stats('cumulative').print_stats(TOP_ENTRIES)
+        return [prof_path, txt_path]
+
+
+class MemoryProfiler(Profiler):
+
+    """
+    Report growth of live objects by type, and of peak RSS
+
+    Python 2 has no ``tracemalloc``, so garbage-collector tracked objects
+    are counted instead.  This doesn't see the size of strings, but does
+    reveal which types (e.g. ``TextTable`` rows) accumulate.
+    """
+
+    before = None
+
+    def start(self):
+        gc.collect()
+        self.before = {'maxrss_kb': self.maxrss_kb(),
+                       'types': type_counts()}
+
+    @staticmethod
+    def maxrss_kb():
+        """Return peak resident set size of this process in KiB"""
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def stop(self):
+        gc.collect()
+        after = type_counts()
+        growth = []
+        for name, count in after.iteritems():
+            grew = count - self.before['types'].get(name, 0)
+            if grew > 0:
+                growth.append((grew, count, name))
+        growth.sort(reverse=True)
+        result = {'maxrss_kb_before': self.before['maxrss_kb'],
+                  'maxrss_kb_after': self.maxrss_kb(),
+                  'growth': [{'type': name, 'grew': grew, 'count': count}
+                             for grew, count, name in growth]}
+        json_path = self.path('_mem.json')
+        with open(json_path, 'wb') as report:
+            json.dump(result, report, indent=2)
+        txt_path = self.path('_mem.txt')
+        with open(txt_path, 'wb') as report:
+            report.write("Peak RSS %d KiB -> %d KiB\n\n"
+                         % (result['maxrss_kb_before'],
+                            result['maxrss_kb_after']))
+            report.write("%10s %10s  %s\n" % ('grew', 'count', 'type'))
+            for grew, count, name in growth[:TOP_ENTRIES]:
+                report.write("%10d %10d  %s\n" % (grew, count, name))
+        return [json_path, txt_path]
+
+
+def new_profiler(mode, name, dirpath):
+    """
+    Return new ``Profiler`` instance for mode, or None if mode is ``none``
+
+    :param mode: One of ``PROFILE_MODES``
+    :param name: Base name for report files
+    :param dirpath: Directory to write report files into, created if needed
+    :raise ValueError: On unknown mode
+    """
+    mode = str(mode).strip().lower()
+    if mode not in PROFILE_MODES:
+        raise ValueError("Unknown profile mode %r, expecting one of %s"
+                         % (mode, ', '.join(PROFILE_MODES)))
+    if mode == 'none':
+        return None
+    if not os.path.isdir(dirpath):
+        os.makedirs(dirpath)
+    if mode == 'cpu':
+        return CPUProfiler(name, dirpath)
+    return MemoryProfiler(name, dirpath)
+
+
+def find_profiles(paths):
+    """
+    Return sorted list of ``.prof`` files in/under paths
+
+    :param paths: List of ``.prof`` file and/or directory paths
+    """
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for dirpath, _, filenames in os.walk(path):
+            found += [os.path.join(dirpath, filename)
+                      for filename in filenames
+                      if filename.endswith(PROF_SUFFIX)]
+    return sorted(found)
+
+
+def file_totals(stats):
+    """
+    Return list of (internal seconds, calls, source file), slowest first
+
+    :param stats: ``pstats.Stats`` instance
+    """
+    totals = {}
+    # pstats keeps no public accessor for this
+    # pylint: disable=E1101
+    for (filename, _, _), (_, calls, tottime, _, _) in stats.stats.items():
+        if filename == '~':
+            filename = '<built-in>'
+        seconds, count = totals.get(filename, (0.0, 0))
+        totals[filename] = (seconds + tottime, count + calls)
+    return sorted(((seconds, count, filename)
+                   for filename, (seconds, count) in totals.iteritems()),
+                  reverse=True)
+
+
+def parse_args(argv):
+    """Return parsed profile merging command-line options"""
+    parser = argparse.ArgumentParser(
+        description='Merge subtest CPU profiles, reporting hot source files')
+    parser.add_argument('paths', nargs='+',
+                        help='job results directories or .prof files')
+    parser.add_argument('--top', type=int, default=TOP_ENTRIES,
+                        help='number of files and functions to report')
+    parser.add_argument('--output', help='write merged profile to file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Print merged totals by source file and function of all found profiles
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parse_args(argv)
+    profiles = find_profiles(args.paths)
+    if not profiles:
+        sys.stderr.write("No %s files found\n" % PROF_SUFFIX)
+        sys.exit(1)
+    stats = pstats.Stats(*profiles, stream=sys.stdout)
+    if args.output:
+        stats.dump_stats(args.output)
+    sys.stdout.write("Merged %d profiles, %0.2f seconds total\n\n"
+                     % (len(profiles), stats.total_tt))
+    sys.stdout.write("%10s %10s  %s\n" % ('seconds', 'calls', 'file'))
+    for seconds, calls, filename in file_totals(stats)[:args.top]:
+        sys.stdout.write("%10.3f %10d  %s\n" % (seconds, calls, filename))
+    stats.sort_stats('cumulative').print_stats(args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
+
+
+class Hoarded(object):
+
+    """Objects of an easily identified type to leak"""
+    pass
+
+
+def busy():
+    """Profiled function, identifiable in reports"""
+    return sorted(range(1000), reverse=True)
+
+
+class ProfilingTestBase(unittest.TestCase):
+
+    def setUp(self):
+        import profiling
+        self.profiling = profiling
+        self.tmpdir = tempfile.mkdtemp(self.__class__.__name__)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        del self.profiling
+
+
+class NewProfilerTest(ProfilingTestBase):
+
+    def test_none(self):
+        self.assertEqual(self.profiling.new_profiler('None', 'x',
+                                                     self.tmpdir), None)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, self.profiling.new_profiler, 'io', 'x',
+                          self.tmpdir)
+
+    def test_makes_dir(self):
+        debugdir = os.path.join(self.tmpdir, 'debug')
+        profiler = self.profiling.new_profiler('cpu', 'x', debugdir)
+        self.assertTrue(isinstance(profiler, self.profiling.CPUProfiler))
+        self.assertTrue(os.path.isdir(debugdir))
+
+
+class ProfilerTest(ProfilingTestBase):
+
+    def test_cpu(self):
+        profiler = self.profiling.new_profiler('cpu', 'cpu_test', self.tmpdir)
+        profiler.start()
+        sorted(range(1000), reverse=True)
+        paths = profiler.stop()
+        self.assertEqual([os.path.basename(path) for path in paths],
+                         ['cpu_test.prof', 'cpu_test_cpu.txt'])
+        with open(paths[1], 'rb') as report:
+            self.assertIn('sorted', report.read())
+
+    def test_mem(self):
+        profiler = self.profiling.new_profiler('mem', 'mem_test', self.tmpdir)
+        profiler.start()
+        hoard = [Hoarded() for _ in xrange(1000)]
+        paths = profiler.stop()
+        with open(paths[0], 'rb') as report:
+            result = json.load(report)
+        growth = dict((entry['type'], entry['grew'])
+                      for entry in result['growth'])
+        self.assertTrue(growth['%s.Hoarded' % __name__] >= len(hoard))
+        self.assertTrue(result['maxrss_kb_after'] >=
+                        result['maxrss_kb_before'])
+
+
+class MergeTest(ProfilingTestBase):
+
+    def setUp(self):
+        super(MergeTest, self).setUp()
+        for name in ('one', 'two'):
+            dirpath = os.path.join(self.tmpdir, name, 'debug')
+            profiler = self.profiling.new_profiler('cpu', name, dirpath)
+            profiler.start()
+            busy()
+            profiler.stop()
+
+    def test_find_profiles(self):
+        found = self.profiling.find_profiles([self.tmpdir])
+        self.assertEqual([os.path.basename(path) for path in found],
+                         ['one.prof', 'two.prof'])
+
+    def test_main(self):
+        merged = os.path.join(self.tmpdir, 'merged.prof')
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            self.profiling.main([self.tmpdir, '--output', merged])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertIn('Merged 2 profiles', output)
+        self.assertIn('profiling_unittests.py:', output)
+        self.assertIn('(busy)', output)
+        self.assertTrue(os.path.isfile(merged))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+"""
+Background removal of containers, images and volumes, across subtests
+
+When the ``background_reaper`` option is enabled, ``submit()`` queues
+removal requests as files in a spool directory under the job results
+directory, instead of removing things in the foreground.  A helper
+process, detached from the autotest step which started it, removes them
+with bounded parallelism: containers first, then volumes, then images.
+It exits after ``IDLE_EXIT`` seconds without requests, and is restarted
+by the next ``submit()``.  Anything needing a clean slate (e.g. the
+``garbage_check`` intratest) calls ``wait()`` for just the kinds it
+cares about.  The helper's activity is logged into ``LOG_NAME``.
+
+Only cleanup paths (``deferred.remove_containers()`` and
+``deferred.remove_images()``) submit requests.  ``clean_all()`` stays
+synchronous, callers such as ``pull_base.initialize()`` expect
+everything removed when it returns.
+
+The helper only uses the standard library, so it runs as::
+
+    reaper.py <spool directory> [<workers>]
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import fcntl
+import glob
+import itertools
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+
+#: Kinds of removal requests, in the order they're removed
+KINDS = ('container', 'volume', 'image')
+
+#: Docker sub-command & options removing each kind
+KIND_SUBCMDS = {'container': ['rm', '--force', '--volumes'],
+                'volume': ['volume', 'rm', '--force'],
+                'image': ['rmi', '--force']}
+
+#: Name of spool directory, in job results directory
+SPOOL_NAME = 'reaper'
+
+#: Name of file, in spool directory, locked by running helper
+LOCK_NAME = 'reaper.lock'
+
+#: Name of helper's log file, in spool directory
+LOG_NAME = 'reaper.log'
+
+#: Suffix of request files being processed
+ACTIVE_SUFFIX = '.active'
+
+#: Seconds between checks for new requests, or for requests to finish
+POLL = 0.25
+
+#: Seconds without requests before helper exits
+IDLE_EXIT = 60
+
+#: Distinguishes request files queued within the same time/process
+_SEQUENCE = itertools.count()
+
+
+def spool_dir(subtest):
+    """
+    Return spool directory path for subtest, or None if reaper is disabled
+
+    :param subtest: ``Subtest`` or ``SubSubtest`` instance
+    """
+    if not subtest.config.get('background_reaper', False):
+        return None
+    # SubSubtest instances run under their parent's job
+    owner = getattr(subtest, 'parent_subtest', None) or subtest
+    job = getattr(owner, 'job', None)
+    if job is None:
+        return None
+    return os.path.join(job.resultdir, SPOOL_NAME)
+
+
+def docker_command(config, kind, names):
+    """
+    Return docker command argument list to remove names of kind
+
+    :param config: Dict-like with ``docker_path`` & ``docker_options``
+    :param kind: One of ``KINDS``
+    :param names: List of names or IDs
+    """
+    return (shlex.split(config['docker_path']) +
+            shlex.split(config.get('docker_options') or '') +
+            KIND_SUBCMDS[kind] + list(names))
+
+
+def helper_running(spooldir):
+    """Return True if a helper holds the lock in spooldir"""
+    with open(os.path.join(spooldir, LOCK_NAME), 'ab') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            return True
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        return False
+
+
+def start_helper(spooldir, workers):
+    """Start detached helper process, draining requests in spooldir"""
+    script = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+    with open(os.devnull, 'rb') as devnull:
+        with open(os.path.join(spooldir, LOG_NAME), 'ab') as log:
+            # New session, so it outlives the autotest step
+            subprocess.Popen([sys.executable, script, spooldir,
+                              str(workers)], stdin=devnull, stdout=log,
+                             stderr=subprocess.STDOUT, close_fds=True,
+                             preexec_fn=os.setsid)
+
+
+def submit(subtest, kind, names):
+    """
+    Queue removal of names, return False if ``background_reaper`` is disabled
+
+    :param subtest: ``Subtest`` or ``SubSubtest`` instance requesting removal
+    :param kind: One of ``KINDS``
+    :param names: List of container names/IDs, volume names or image IDs
+    :raise ValueError: On unknown kind
+    """
+    if kind not in KINDS:
+        raise ValueError("Unknown reaper request kind %r, expecting one "
+                         "of %s" % (kind, ', '.join(KINDS)))
+    spooldir = spool_dir(subtest)
+    if spooldir is None:
+        return False
+    if not names:
+        return True
+    if not os.path.isdir(spooldir):
+        os.makedirs(spooldir)
+    request = {'kind': kind, 'names': list(names),
+               'test': subtest.config_section,
+               'command': docker_command(subtest.config, kind, names)}
+    basename = '%017.6f-%d-%d.%s.json' % (time.time(), os.getpid(),
+                                          _SEQUENCE.next(), kind)
+    # Helper must never see partially written request
+    temp_path = os.path.join(spooldir, '.' + basename)
+    with open(temp_path, 'wb') as request_file:
+        json.dump(request, request_file)
+    os.rename(temp_path, os.path.join(spooldir, basename))
+    # Request is queued before checking, see serve()
+    if not helper_running(spooldir):
+        start_helper(spooldir,
+                     max(1, int(subtest.config.get('reaper_workers', 4))))
+    subtest.logdebug("Queued %s removal in background: %s", kind,
+                     ', '.join(names))
+    return True
+
+
+def pending(spooldir, kinds=KINDS, active=True):
+    """
+    Return sorted list of queued (and active) request file paths
+
+    :param spooldir: Spool directory path
+    :param kinds: Iterable of ``KINDS`` to include
+    :param active: Also include requests being processed
+    """
+    paths = []
+    for kind in kinds:
+        paths += glob.glob(os.path.join(spooldir, '*.%s.json' % kind))
+        if active:
+            paths += glob.glob(os.path.join(spooldir, '*.%s.json%s'
+                                            % (kind, ACTIVE_SUFFIX)))
+    return sorted(paths)
+
+
+def wait(subtest, kinds=KINDS, timeout=None):
+    """
+    Wait for all queued requests of kinds to finish, return seconds waited
+
+    :param subtest: ``Subtest`` or ``SubSubtest`` instance
+    :param kinds: Iterable of ``KINDS`` to wait for
+    :param timeout: Maximum seconds to wait, or None for
+                    ``reaper_timeout`` option
+    :return: None if reaper is disabled, otherwise seconds waited
+    :raise DockerTestError: If requests remain after timeout
+    """
+    spooldir = spool_dir(subtest)
+    if spooldir is None:
+        return None
+    if timeout is None:
+        timeout = float(subtest.config.get('reaper_timeout', 300))
+    start = time.time()
+    while pending(spooldir, kinds):
+        if time.time() - start > timeout:
+            # Helper process must not need autotest modules
+            from xceptions import DockerTestError
+            raise DockerTestError("Background reaper still removing %s "
+                                  "after %s seconds, see %s"
+                                  % (', '.join(kinds), timeout,
+                                     os.path.join(spooldir, LOG_NAME)))
+        time.sleep(POLL)
+    return time.time() - start
+
+
+def log(message, *args):
+    """Write timestamped message to helper's log (stdout)"""
+    sys.stdout.write('%s %s\n' % (time.strftime('%Y-%m-%d %H:%M:%S'),
+                                  message % args))
+    sys.stdout.flush()
+
+
+def execute(request):
+    """Run request's docker command, return (request, exit_status, stderr)"""
+    process = subprocess.Popen(request['command'], stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, close_fds=True)
+    # Only stderr has errors, stdout lists every removed name
+    stderr = process.communicate()[1]
+    return request, process.returncode, stderr
+
+
+def drain(spooldir, pool):
+    """
+    Process all queued requests, one kind at a time
+
+    :param spooldir: Spool directory path
+    :param pool: ``ThreadPool`` instance running docker commands
+    :return: Number of requests processed
+    """
+    processed = 0
+    for kind in KINDS:
+        requests = []
+        for path in pending(spooldir, [kind], active=False):
+            active_path = path + ACTIVE_SUFFIX
+            os.rename(path, active_path)
+            with open(active_path, 'rb') as request_file:
+                request = json.load(request_file)
+            request['path'] = active_path
+            requests.append(request)
+        for request, exit_status, stderr in pool.map(execute, requests):
+            names = ' '.join(request['names'])
+            # Things already gone are fine
+            errors = [line for line in stderr.splitlines()
+                      if line.strip() and 'No such' not in line]
+            if exit_status and errors:
+                log("FAILED removing %s %s for %s: %s", kind, names,
+                    request['test'], '; '.join(errors))
+            else:
+                log("Removed %s %s for %s", kind, names, request['test'])
+            os.unlink(request['path'])
+        processed += len(requests)
+    return processed
+
+
+def serve(spooldir, workers, idle_exit=IDLE_EXIT):
+    """
+    Drain requests in spooldir, until none arrive for idle_exit seconds
+
+    :return: Exit status for helper process
+    """
+    lock = open(os.path.join(spooldir, LOCK_NAME), 'ab')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except IOError:
+        return 0  # Another helper is already running
+    log("Started with %d workers", workers)
+    # Requeue anything a previous helper didn't finish
+    for path in glob.glob(os.path.join(spooldir, '*' + ACTIVE_SUFFIX)):
+        os.rename(path, path[:-len(ACTIVE_SUFFIX)])
+    pool = ThreadPool(workers)
+    idle_since = time.time()
+    try:
+        while True:
+            if drain(spooldir, pool):
+                idle_since = time.time()
+            elif time.time() - idle_since < idle_exit:
+                time.sleep(POLL)
+            else:
+                # submit() queues before checking lock, so anything
+                # queued while it was held is found here.
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                if not pending(spooldir, active=False):
+                    break
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError:
+                    break  # Newly started helper took over
+    finally:
+        pool.close()
+        pool.join()
+        lock.close()
+    log("Exiting after %d idle seconds", idle_exit)
+    return 0
+
+
+def main(argv):
+    """Run helper on ``<spool directory> [<workers>]`` arguments"""
+    if len(argv) not in (1, 2):
+        sys.stderr.write(__doc__)
+        return 2
+    workers = int(argv[1]) if len(argv) > 1 else 4
+    return serve(argv[0], workers)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
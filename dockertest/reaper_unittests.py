@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import fcntl
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+import json
+
+
+def mock(mod_path):
+    name_list = mod_path.split('.')
+    child_name = name_list.pop()
+    child_mod = sys.modules.get(mod_path, types.ModuleType(child_name))
+    if len(name_list) == 0:  # child_name is left-most basic module
+        if child_name not in sys.modules:
+            sys.modules[child_name] = child_mod
+        return sys.modules[child_name]
+    else:
+        # New or existing child becomes parent
+        recurse_path = ".".join(name_list)
+        parent_mod = mock(recurse_path)
+        if not hasattr(sys.modules[recurse_path], child_name):
+            setattr(parent_mod, child_name, child_mod)
+            # full-name also points at child module
+            sys.modules[mod_path] = child_mod
+        return sys.modules[mod_path]
+
+# Mock module and exception class in one stroke
+setattr(mock('autotest.client.shared.error'), 'CmdError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestFail', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestError', Exception)
+setattr(mock('autotest.client.shared.error'), 'TestNAError', Exception)
+setattr(mock('autotest.client.shared.error'), 'AutotestError', Exception)
+
+
+class FakeSubtest(object):
+
+    config_section = 'docker_cli/fake'
+
+    def __init__(self, resultdir, config):
+        self.job = type('FakeJob', (object,), {'resultdir': resultdir})()
+        self.config = config
+
+    def logdebug(self, message, *args):
+        pass
+
+
+class ReaperTestBase(unittest.TestCase):
+
+    def setUp(self):
+        import fakedocker
+        import reaper
+        self.fakedocker = fakedocker
+        self.reaper = reaper
+        self.tmpdir = tempfile.mkdtemp(self.__class__.__name__)
+        self.state_path = os.path.join(self.tmpdir, 'state.json')
+        with open(self.state_path, 'wb') as statefile:
+            json.dump({'generate': {'containers': 4, 'images': 2,
+                                    'running': 0.5}}, statefile)
+        fakedocker_py = os.path.splitext(fakedocker.__file__)[0] + '.py'
+        self.config = {'background_reaper': True, 'reaper_workers': 2,
+                       'docker_path': '%s %s --state %s'
+                                      % (sys.executable, fakedocker_py,
+                                         self.state_path),
+                       'docker_options': ''}
+        self.subtest = FakeSubtest(self.tmpdir, self.config)
+        self.spooldir = os.path.join(self.tmpdir, reaper.SPOOL_NAME)
+        # Tests run the helper in-process, instead of detached
+        self.started = []
+        self.start_helper = reaper.start_helper
+        reaper.start_helper = lambda *args: self.started.append(args)
+
+    def tearDown(self):
+        self.reaper.start_helper = self.start_helper
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        del self.reaper
+        del self.fakedocker
+
+    def state(self):
+        return self.fakedocker.FakeState(self.state_path)
+
+
+class SubmitTest(ReaperTestBase):
+
+    def test_disabled(self):
+        self.config['background_reaper'] = False
+        self.assertFalse(self.reaper.submit(self.subtest, 'container',
+                                            ['foo']))
+        self.assertEqual(self.reaper.wait(self.subtest), None)
+        self.assertFalse(os.path.exists(self.spooldir))
+
+    def test_unknown_kind(self):
+        self.assertRaises(ValueError, self.reaper.submit, self.subtest,
+                          'network', ['foo'])
+
+    def test_queued(self):
+        self.assertTrue(self.reaper.submit(self.subtest, 'image', ['a']))
+        self.assertTrue(self.reaper.submit(self.subtest, 'container',
+                                           ['b', 'c']))
+        self.assertEqual(self.started, [(self.spooldir, 2)] * 2)
+        pending = self.reaper.pending(self.spooldir)
+        self.assertEqual(len(pending), 2)
+        self.assertEqual(self.reaper.pending(self.spooldir, ['volume']), [])
+        with open(self.reaper.pending(self.spooldir, ['container'])[0],
+                  'rb') as request_file:
+            request = json.load(request_file)
+        self.assertEqual(request['command'][-5:],
+                         ['rm', '--force', '--volumes', 'b', 'c'])
+        self.assertEqual(request['test'], 'docker_cli/fake')
+
+    def test_helper_running(self):
+        self.reaper.submit(self.subtest, 'container', ['a'])
+        self.assertFalse(self.reaper.helper_running(self.spooldir))
+        with open(os.path.join(self.spooldir,
+                               self.reaper.LOCK_NAME), 'ab') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.assertTrue(self.reaper.helper_running(self.spooldir))
+            # Second helper exits immediately
+            self.assertEqual(self.reaper.serve(self.spooldir, 1, 0), 0)
+            self.assertEqual(len(self.reaper.pending(self.spooldir)), 1)
+
+
+class ServeTest(ReaperTestBase):
+
+    def test_serve(self):
+        state = self.state()
+        containers = [cntr['Names'][0][1:] for cntr in state.containers]
+        images = [image['Id'] for image in state.images]
+        self.reaper.submit(self.subtest, 'image', images[:1])
+        # Already removed is not a failure
+        self.reaper.submit(self.subtest, 'container',
+                           containers[:3] + ['missing'])
+        self.reaper.submit(self.subtest, 'volume', ['unknown'])
+        # Interrupted previous helper's request is processed again
+        active = self.reaper.pending(self.spooldir, ['container'])[0]
+        os.rename(active, active + self.reaper.ACTIVE_SUFFIX)
+        # Helper's stdout is the log, as from start_helper()
+        stdout = sys.stdout
+        sys.stdout = open(os.path.join(self.spooldir,
+                                       self.reaper.LOG_NAME), 'ab')
+        try:
+            self.assertEqual(self.reaper.serve(self.spooldir, 2, 0), 0)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        self.assertTrue(self.reaper.wait(self.subtest, timeout=0) < 1)
+        state = self.state()
+        self.assertEqual([cntr['Names'][0][1:] for cntr in state.containers],
+                         containers[3:])
+        self.assertEqual([image['Id'] for image in state.images],
+                         images[1:])
+        with open(os.path.join(self.spooldir,
+                               self.reaper.LOG_NAME), 'rb') as log:
+            lines = log.read().splitlines()
+        # Containers before volumes before images
+        self.assertIn('Removed container', lines[1])
+        self.assertIn('FAILED removing volume unknown', lines[2])
+        self.assertIn('Removed image', lines[3])
+
+    def test_wait_timeout(self):
+        self.reaper.submit(self.subtest, 'container', ['a'])
+        self.assertTrue(self.reaper.wait(self.subtest, ['image'], 0) < 1)
+        self.assertRaises(Exception, self.reaper.wait, self.subtest,
+                          ['container'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import imp
+import os
+import shutil
+import tempfile
+import microbench
+
+results2junit = imp.load_source(  # pylint: disable=C0103
+    'results2junit', os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'results2junit'))
+
+#: Autotest status line format, of START, status, or END lines
+STATUS_LINE = '%s%s\t%s\t%s\ttimestamp=%d\tlocaltime=Nov 14 15:19:08\t%s\n'
+
+
+def status_text(size):
+    """Return autotest status file contents, of size test results"""
+    lines = [STATUS_LINE % ('', 'START', '----', '----', 1479154748, '')]
+    for num in xrange(size):
+        name = 'docker/subtests/docker_cli/test_%d.%d' % (num, num + 1)
+        status = ('GOOD', 'FAIL', 'TEST_NA')[num % 3]
+        stamp = 1479154748 + num * 10
+        lines.append(STATUS_LINE % ('\t', 'START', name, name, stamp, ''))
+        lines.append(STATUS_LINE % ('\t\t', status, name, name, stamp + 5,
+                                    'message for <%s> & "more"' % name))
+        lines.append(STATUS_LINE % ('\t', 'END %s' % status, name, name,
+                                    stamp + 5, ''))
+    lines.append(STATUS_LINE % ('', 'END GOOD', '----', '----',
+                                1479154748 + size * 10, ''))
+    return ''.join(lines)
+
+
+class ResultsToJunit(microbench.Benchmark):
+
+    def setup(self, size):
+        # AutotestResults() reads 'status' from the current directory
+        self.tmpdir = tempfile.mkdtemp(prefix=self.__class__.__name__)
+        with open(os.path.join(self.tmpdir, 'status'), 'wb') as status:
+            status.write(status_text(size))
+        os.chdir(self.tmpdir)
+
+    def run(self):
+        return results2junit.TestSuite('bench',
+                                       results2junit.AutotestResults()).as_xml
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    microbench.main()
@@ -16,6 +16,8 @@ import os.path
 import imp
 import sys
 import copy
+import threading
+from multiprocessing.pool import ThreadPool
 from ConfigParser import Error
 from autotest.client.shared.error import TestError, TestNAError
 from autotest.client.shared.version import get_version
@@ -23,10 +25,14 @@ from autotest.client import test
 import version
 import config
 import subtestbase
+import profiling
+import deferred
+import pool
 from xceptions import DockerTestFail
 from xceptions import DockerTestNAError
 from xceptions import DockerTestError
 from xceptions import DockerSubSubtestNAError
+from xceptions import DockerValueError
 from dockertest.environment import selinux_is_enforcing
 import dockertest.docker_daemon as docker_daemon
 
@@ -56,6 +62,9 @@ class Subtest(subtestbase.SubBase, test.test):
     #: Private cache of control.ini's [Control] section contents (do not use!)
     _control_ini = None
 
+    #: Private ``ContainerPool``, created by ``container_pool()`` (do not use!)
+    _container_pool = None
+
     def __init__(self, *args, **dargs):
 
         def _make_cfgsect():
@@ -117,13 +126,27 @@ class Subtest(subtestbase.SubBase, test.test):
                 constraints=(), *args, **dargs):
         """**Do not override**, needed to pull data from super class"""
         ppr = postprocess_profiled_run
-        super(Subtest, self).execute(iterations=self.iterations,
-                                     test_length=test_length,
-                                     profile_only=profile_only,
-                                     _get_time=_get_time,
-                                     postprocess_profiled_run=ppr,
-                                     constraints=constraints,
-                                     *args, **dargs)
+        try:
+            profiler = profiling.new_profiler(self.config.get('profile',
+                                                              'none'),
+                                              self.__class__.__name__,
+                                              self.debugdir)
+        except ValueError, xcept:
+            raise DockerValueError(str(xcept))
+        if profiler is not None:
+            profiler.start()
+        try:
+            super(Subtest, self).execute(iterations=self.iterations,
+                                         test_length=test_length,
+                                         profile_only=profile_only,
+                                         _get_time=_get_time,
+                                         postprocess_profiled_run=ppr,
+                                         constraints=constraints,
+                                         *args, **dargs)
+        finally:
+            if profiler is not None:
+                for path in profiler.stop():
+                    self.logdebug("Wrote profile report %s", path)
 
     # These methods can optionally be overridden by subclasses
 
@@ -158,6 +181,42 @@ class Subtest(subtestbase.SubBase, test.test):
         """
         self.log_step_msg('postprocess_iteration')
 
+    def cleanup(self):
+        super(Subtest, self).cleanup()
+        if self._container_pool is not None:
+            error = self._container_pool.close()
+            self._container_pool = None
+            if error is not None:
+                self.logwarning("Failed to remove pool containers: %s", error)
+        workers = max(1, int(self.config.get('cleanup_workers', 1)))
+        failures = deferred.drain(self, self.deferred_cleanups(), workers)
+        if failures:
+            raise DockerTestError("Deferred cleanup failures: %s" % failures)
+
+    def deferred_cleanups(self):
+        """
+        Return list of (name, ``deferred_cleanup``) drained by ``cleanup()``
+        """
+        return [(self.config_section, self.deferred_cleanup)]
+
+    def container_pool(self):
+        """
+        Return ``pool.ContainerPool`` shared with subsubtests, until
+        ``cleanup()`` removes all it's containers.
+        """
+        if self._container_pool is None:
+            self._container_pool = pool.ContainerPool(
+                self, int(self.config.get('container_pool_size', 2)),
+                self.config.get('container_pool_start', True))
+        return self._container_pool
+
+    def write_stage_times(self):
+        """
+        Write stage times as keyvals, and into job-wide stage times file
+        """
+        self.write_test_keyval(self.stage_keyvals())
+        self.append_stage_times(self.job.resultdir)
+
     def _control_ini_section(self, section):
         if self._control_ini is None:
             self._control_ini = {}  # empty set of caches
@@ -249,6 +308,12 @@ class SubSubtest(subtestbase.SubBase):
             os.chown(self.tmpdir, uid, gid)
             os.chown(self.parent_subtest.tmpdir, uid, gid)
 
+    def container_pool(self):
+        """
+        Return parent subtest's ``pool.ContainerPool``
+        """
+        return self.parent_subtest.container_pool()
+
     @property
     def sub_stuff(self):
         """
@@ -257,6 +322,15 @@ class SubSubtest(subtestbase.SubBase):
         # Instance may have re-initialized, always return the current value.
         return self.stuff
 
+    def write_stage_times(self):
+        """
+        Write stage times as parent's keyvals, and into stage times file
+        """
+        prefix = '%s_stage' % self.__class__.__name__
+        self.parent_subtest.write_test_keyval(self.stage_keyvals(prefix))
+        self.append_stage_times(self.parent_subtest.job.resultdir,
+                                self.parent_subtest.config_section)
+
     @classmethod
     def make_name(cls, parent_name):
         """
@@ -514,6 +588,16 @@ class SubSubtestCaller(Subtest):
             raise DockerTestFail('Sub-subtest failures: %s' %
                                  str(failed_tests))
 
+    def deferred_cleanups(self):
+        """
+        Return list of (name, ``deferred_cleanup``) of each started
+        subsubtest, in order, followed by this subtest's own.
+        """
+        mine = super(SubSubtestCaller, self).deferred_cleanups()
+        return [(name, self.start_subsubtests[name].deferred_cleanup)
+                for name in self.subsubtest_names
+                if name in self.start_subsubtests] + mine
+
     def call_subsubtest_method(self, method):
         """
         Call ``method``, recording execution info. on exception.
@@ -657,7 +741,9 @@ class SubSubtestCallerSimultaneous(SubSubtestCaller):
     option.  Child subsubtest configuration section is formed by appending the
     child's subclass name onto the parent's ``config_section`` value.  Parent
     configuration is passed to subsubtest, with the subsubtest's section
-    overriding values with the same option name.
+    overriding values with the same option name.  When the
+    ``concurrent_workers`` option is greater than one, each method is
+    called on that many subsubtests at the same time, from a thread pool.
 
     :param \*args: Passed through to super-class.
     :param \*\*dargs: Passed through to super-class.
@@ -671,10 +757,51 @@ class SubSubtestCallerSimultaneous(SubSubtestCaller):
     #: executed ``run_once()`` w/o raising exception
     post_subsubtests = None
 
+    #: Maximum number of subsubtests executing a method at the same time,
+    #: from the ``concurrent_workers`` option.  (read-only)
+    workers = 1
+
     def __init__(self, *args, **dargs):
         super(SubSubtestCallerSimultaneous, self).__init__(*args, **dargs)
         self.run_subsubtests = {}
         self.post_subsubtests = {}
+        self.workers = max(1, int(self.config.get('concurrent_workers', 1)))
+        # Keeps each error & traceback together, while others are running
+        self._log_lock = threading.Lock()
+
+    def call_stage(self, stage, subsubtests):
+        """
+        Call ``stage`` method of each subsubtest, on up to ``workers`` threads
+
+        :param stage: Name of subsubtest method to call (e.g. ``'run_once'``)
+        :param subsubtests: Dictionary of subsubtest names to instances
+        :return: Set of names whose method returned w/o raising exception
+        """
+        names = [name for name in self.subsubtest_names
+                 if name in subsubtests]
+
+        def call(name):  # private, no docstring pylint: disable=C0111
+            try:
+                getattr(subsubtests[name], stage)()
+                return True
+            # Catching general exception b/c it will be logged and
+            # structure must allow cleanup() method to run.
+            # pylint: disable=W0703
+            except Exception, detail:
+                with self._log_lock:
+                    self.logtraceback(name, sys.exc_info(), stage, detail)
+                return False
+
+        if self.workers > 1 and len(names) > 1:
+            pool = ThreadPool(min(self.workers, len(names)))
+            try:
+                passed = pool.map(call, names)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            passed = [call(name) for name in names]
+        return set(name for name, ok in zip(names, passed) if ok)
 
     def initialize(self):
         super(SubSubtestCallerSimultaneous, self).initialize()
@@ -683,75 +810,41 @@ class SubSubtestCallerSimultaneous(SubSubtestCaller):
             if subsubtest is not None:
                 # Guarantee it's cleanup() runs
                 self.start_subsubtests[name] = subsubtest
-                try:
-                    subsubtest.initialize()
-                    # Allow run_once() on this subsubtest
-                    self.run_subsubtests[name] = subsubtest
-                # Catching general exception b/c it will be logged and
-                # structure must allow cleanup() method to run.
-                # pylint: disable=W0703
-                except Exception, detail:
-                    # Log problem, don't add to run_subsubtests
-                    self.logtraceback(name, sys.exc_info(), "initialize",
-                                      detail)
         if not self.start_subsubtests:
             raise TestError("No sub-subtests configured to run "
                             "for subtest %s", self.config_section)
+        # Allow run_once() on subsubtests not raising exceptions
+        for name in self.call_stage('initialize', self.start_subsubtests):
+            self.run_subsubtests[name] = self.start_subsubtests[name]
 
     def run_once(self):
         # DO NOT CALL superclass run_once(); this variation works
         # completely differently!
         self.log_step_msg('run_once')
-        for name, subsubtest in self.run_subsubtests.items():
-            try:
-                subsubtest.run_once()
-                # Allow postprocess()
-                self.post_subsubtests[name] = subsubtest
-            # Catching general exception here, b/c cleanup
-            # step must be guaranteed to run.  Exception
-            # details will be logged instead.
-            # pylint: disable=W0703
-            except Exception, detail:
-                # Log problem, don't add to post_subsubtests
-                self.logtraceback(name, sys.exc_info(), "run_once", detail)
+        # Allow postprocess() on subsubtests not raising exceptions
+        for name in self.call_stage('run_once', self.run_subsubtests):
+            self.post_subsubtests[name] = self.run_subsubtests[name]
 
     def postprocess(self):
         # DO NOT CALL superclass postprocess(); this variation works
         # completely differently!
         self.log_step_msg('postprocess')
         start_subsubtests = set(self.start_subsubtests.keys())
-        final_subsubtests = set()
-        for name, subsubtest in self.post_subsubtests.items():
-            try:
-                subsubtest.postprocess()
-                # Will form "passed" set
-                final_subsubtests.add(name)
-            # Catching general exception b/c it will be logged and
-            # structure must allow cleanup() method to run.
-            # pylint: disable=W0703
-            except Exception, detail:
-                # Forms "failed" set by exclusion from final_subsubtests
-                self.logtraceback(name, sys.exc_info(), "postprocess",
-                                  detail)
+        # Forms "failed" set by exclusion from final_subsubtests
+        final_subsubtests = self.call_stage('postprocess',
+                                            self.post_subsubtests)
         if not final_subsubtests == start_subsubtests:
             raise DockerTestFail('Sub-subtest failures: %s'
                                  % str(start_subsubtests - final_subsubtests))
 
     def cleanup(self):
-        super(SubSubtestCallerSimultaneous, self).cleanup()
-        self.log_step_msg('cleanup')
-        cleanup_failures = set()  # just for logging purposes
-        for name, subsubtest in self.start_subsubtests.items():
-            try:
-                subsubtest.cleanup()
-            # Catching general exception to allow logging
-            # logging additional details before raising
-            # more general exception.
-            # pylint: disable=W0703
-            except Exception, detail:
-                cleanup_failures.add(name)
-                self.logtraceback(name, sys.exc_info(), "cleanup",
-                                  detail)
-        if cleanup_failures:
-            raise DockerTestError("Sub-subtest cleanup failures: %s"
-                                  % cleanup_failures)
+        # Subsubtest cleanup() must finish before superclass drains
+        # their deferred cleanups.  Set is just for logging purposes.
+        cleanup_failures = (set(self.start_subsubtests.keys()) -
+                            self.call_stage('cleanup', self.start_subsubtests))
+        try:
+            super(SubSubtestCallerSimultaneous, self).cleanup()
+        finally:
+            if cleanup_failures:
+                raise DockerTestError("Sub-subtest cleanup failures: %s"
+                                      % cleanup_failures)
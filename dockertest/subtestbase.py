@@ -7,10 +7,14 @@ modules.
 # Pylint runs from a different directory, it's fine to import this way
 # pylint: disable=W0403
 
+import functools
+import json
 import logging
 import os.path
 import sys
+import time
 import traceback
+from collections import OrderedDict
 from xceptions import DockerTestFail
 from xceptions import DockerTestNAError
 from config import CONFIGCUSTOMS, get_as_list
@@ -32,6 +36,76 @@ def known_failures_file():
     return os.path.join(CONFIGCUSTOMS, 'known_failures.txt')
 
 
+#: Name of file in job results directory collecting every ``stage_times``
+STAGE_TIMES_FILENAME = 'stage_times.jsonl'
+
+#: Kinds of things ``SubBase.defer_cleanup()`` accepts, in removal order
+DEFERRED_CLEANUP_KINDS = ('container', 'image', 'tmpdir')
+
+#: Default maximum characters of a ``Clipped`` log argument
+LOG_CLIP_CHARS = 4096
+
+
+class LogMessage(object):
+
+    """
+    Log message, rendered only if and when a logging handler formats it
+
+    :param prefix: String prepended to rendered message
+    :param msg: Message format-string (or any object)
+    :param args: Tuple of format-string arguments
+    :param newline: String replacing newlines in rendered message, or None
+    """
+
+    __slots__ = ('prefix', 'msg', 'args', 'newline')
+
+    def __init__(self, prefix, msg, args, newline=None):
+        self.prefix = prefix
+        self.msg = msg
+        self.args = args
+        self.newline = newline
+
+    def __str__(self):
+        msg = str(self.msg)
+        if self.args:
+            try:
+                msg = msg % self.args
+            except TypeError:
+                raise TypeError("Not all arguments converted during "
+                                "formatting: msg='%s', args=%s"
+                                % (msg, self.args))
+        if self.newline is not None:
+            msg = msg.replace('\n', self.newline)
+        return self.prefix + msg
+
+
+class Clipped(object):
+
+    """
+    Log argument rendering at most ``limit`` characters of ``str(payload)``
+
+    The beginning and end are kept (e.g. a ``CmdResult``'s command, and
+    its stderr), the middle is replaced by a count of omitted characters.
+
+    :param payload: Any object, e.g. ``CmdResult`` or its ``stdout``
+    :param limit: Maximum number of payload characters to render
+    """
+
+    __slots__ = ('payload', 'limit')
+
+    def __init__(self, payload, limit=LOG_CLIP_CHARS):
+        self.payload = payload
+        self.limit = limit
+
+    def __str__(self):
+        text = str(self.payload)
+        if len(text) <= self.limit:
+            return text
+        half = self.limit // 2
+        return ("%s\n... %d characters omitted ...\n%s"
+                % (text[:half], len(text) - half * 2, text[-half:]))
+
+
 def known_failures():
     """
     Returns a dict containing known test failures. Primary key is
@@ -45,7 +119,7 @@ def known_failures():
     try:
         known_failures_fh = open(known_failures_path, 'r')
     except IOError, excpt:
-        SubBase.logwarning("Skipping known_failure check: %s" % excpt)
+        SubBase.logwarning("Skipping known_failure check: %s", excpt)
         return known
 
     for row in known_failures_fh:
@@ -57,8 +131,8 @@ def known_failures():
                     known[subtest] = {}
                 known[subtest][nvra] = description
             except ValueError:
-                SubBase.logwarning("Bad row in %s: %s"
-                                   % (known_failures_path, row))
+                SubBase.logwarning("Bad row in %s: %s",
+                                   known_failures_path, row)
     return known
 
 
@@ -106,12 +180,113 @@ class SubBase(object):
     #: Path to file indicating which Red Hat release this is
     redhat_release_filepath = "/etc/redhat-release"
 
+    #: Names of stage methods automatically timed into ``stage_times``
+    timed_stages = ('initialize', 'run_once', 'postprocess', 'cleanup')
+
+    #: Ordered dictionary of stage name to dictionary of ``calls`` count,
+    #: ``wall``, ``cpu`` (this process) and ``children_cpu`` (reaped child
+    #: processes) seconds.  (read-only)
+    stage_times = None
+
+    #: Name of timed stage currently executing, or None  (read-only)
+    current_stage = None
+
+    #: Dictionary of ``DEFERRED_CLEANUP_KINDS`` to lists of names (or
+    #: paths) registered by ``defer_cleanup()``  (read-only)
+    deferred_cleanup = None
+
     def __init__(self, *args, **dargs):
         super(SubBase, self).__init__(*args, **dargs)
         self.step_log_msgs = self.step_log_msgs.copy()
         # instances can do whatever they like with this, so can sub-classes
         if self.stuff is None:
             self.stuff = {}
+        # Instance attributes shadow class methods, so super() calls
+        # from sub-classes aren't timed again.
+        self.stage_times = OrderedDict()
+        self.deferred_cleanup = dict((kind, [])
+                                     for kind in DEFERRED_CLEANUP_KINDS)
+        for stage in self.timed_stages:
+            setattr(self, stage, self._timed_stage(stage,
+                                                   getattr(self, stage)))
+
+    def _timed_stage(self, stage, method):
+        """Return wrapper of bound method, accumulating into stage_times"""
+        @functools.wraps(method)
+        def timed():  # pylint: disable=C0111
+            start_wall = time.time()
+            start_cpu = os.times()
+            outer_stage = self.current_stage
+            self.current_stage = stage
+            try:
+                return method()
+            finally:
+                self.current_stage = outer_stage
+                end_cpu = os.times()
+                times = self.stage_times.setdefault(
+                    stage, {'calls': 0, 'wall': 0.0, 'cpu': 0.0,
+                            'children_cpu': 0.0})
+                times['calls'] += 1
+                times['wall'] += time.time() - start_wall
+                times['cpu'] += sum(end_cpu[0:2]) - sum(start_cpu[0:2])
+                times['children_cpu'] += (sum(end_cpu[2:4]) -
+                                          sum(start_cpu[2:4]))
+                if stage == self.timed_stages[-1]:
+                    self.write_stage_times()
+        return timed
+
+    def stage_keyvals(self, prefix='stage'):
+        """
+        Return flattened ``stage_times`` dictionary, for test keyvals
+
+        :param prefix: String prepended to every key
+        """
+        keyvals = {}
+        for stage, times in self.stage_times.iteritems():
+            for key, value in times.iteritems():
+                if key != 'calls':
+                    key += '_seconds'
+                keyvals['%s_%s_%s' % (prefix, stage, key)] = value
+        return keyvals
+
+    def append_stage_times(self, resultdir, parent=None):
+        """
+        Append ``stage_times`` as a JSON line to file in resultdir
+
+        :param resultdir: Job results directory path
+        :param parent: Optional name (config_section) of parent subtest
+        """
+        record = {'name': self.config_section, 'parent': parent,
+                  'time': time.time(), 'stages': self.stage_times}
+        try:
+            with open(os.path.join(resultdir, STAGE_TIMES_FILENAME),
+                      'ab') as stage_times:
+                stage_times.write(json.dumps(record) + '\n')
+        except IOError, xcept:
+            self.logwarning("Unable to record stage times: %s", xcept)
+
+    def write_stage_times(self):
+        """
+        Called after the last timed stage, to record ``stage_times``
+        """
+        pass
+
+    def defer_cleanup(self, kind, *names):
+        """
+        Register things for bulk removal, at the end of the subtest
+
+        The (parent) subtest's ``cleanup()`` removes them concurrently,
+        containers first, then images, then temporary directories.
+
+        :param kind: One of ``DEFERRED_CLEANUP_KINDS``
+        :param names: Container names, image FQINs/IDs, or directory paths
+        :raise ValueError: On unknown kind
+        """
+        if kind not in self.deferred_cleanup:
+            raise ValueError("Unknown deferred cleanup kind %r, expecting "
+                             "one of %s" % (kind,
+                                            ', '.join(DEFERRED_CLEANUP_KINDS)))
+        self.deferred_cleanup[kind].extend(names)
 
     def initialize(self):
         """
@@ -123,13 +298,16 @@ class SubBase(object):
         if not_customized:
             self.logdebug("WARNING: Recommended options not customized:")
             for nco in get_as_list(not_customized):
-                self.logdebug("WARNING: %s" % nco)
-        msg = "%s configuration:\n" % self.__class__.__name__
+                self.logdebug("WARNING: %s", nco)
+        # Formatting every option is wasted effort if it won't be logged
+        if not self.log_enabled('debug'):
+            return
+        msg = ["%s configuration:" % self.__class__.__name__]
         for key, value in self.config.items():
             if key == '__example__' or key.startswith('envcheck'):
                 continue
-            msg += '\t\t%s = "%s"\n' % (key, value)
-        self.logdebug(msg)
+            msg.append('\t\t%s = "%s"' % (key, value))
+        self.logdebug('\n'.join(msg) + '\n')
 
     def run_once(self):
         """
@@ -329,16 +507,30 @@ class SubBase(object):
                         % (cls.redhat_release_filepath,
                            str(anotherone)))
 
+    @staticmethod
+    def log_enabled(lvl):
+        """
+        Return True if logging module function named ``lvl`` would log
+
+        :param lvl: logging method name (``'debug'``, ``'info'``, etc.)
+        """
+        return logging.getLogger().isEnabledFor(getattr(logging, lvl.upper()))
+
     @classmethod
-    def log_x(cls, lvl, msg, *args):
+    def log_x(cls, lvl, msg, *args, **dargs):
         """
         Send ``msg`` & ``args`` through to logging module function with
-        name ``lvl``
-        """
+        name ``lvl``.  Nothing is formatted unless/until a handler emits it.
 
-        meth = getattr(logging, lvl)
-        testname = cls.__name__
-        return meth("%s%s: %s" % ("\t" * cls.n_tabs, testname, msg), *args)
+        :param lvl: logging method name (``'debug'``, ``'info'``, etc.)
+        :param msg: Message format-string
+        :param newline: Optional string replacing newlines in message
+        """
+        if not cls.log_enabled(lvl):
+            return
+        prefix = "%s%s: " % ("\t" * cls.n_tabs, cls.__name__)
+        getattr(logging, lvl)(LogMessage(prefix, msg, args,
+                                         dargs.get('newline')))
 
     @classmethod
     def log_xn(cls, lvl, msg, *args):
@@ -351,17 +543,7 @@ class SubBase(object):
         # date, loglevel, this module offset
         newline = '\n' + ' ' * cls.n_spaces + '\t' * cls.n_tabs
         newline += " " * (len(cls.__name__) + 2)    # cls name + ': '
-        try:
-            msg = (str(msg) % args).replace('\n', newline)
-        except TypeError:
-            if args is tuple():
-                cls.logwarning("Following message contains format strings but "
-                               "has no arguments:")
-                msg = str(msg).replace('\n', newline)
-            else:
-                raise TypeError("Not all arguments converted during formatting"
-                                ": msg='%s', args=%s" % (msg, args))
-        return cls.log_x(lvl, msg)
+        cls.log_x(lvl, msg, *args, newline=newline)
 
     @classmethod
     def logdebug(cls, message, *args):
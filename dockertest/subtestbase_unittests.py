@@ -158,7 +158,8 @@ docker-1.12.4-*              docker_cli/othersubtest      fixed in 1.12.5
         # expectations.
         warnings = [[]]
         def log_warnings(msg):
-            warnings[0].append(msg)
+            # Messages are rendered lazily, by the logging handler
+            warnings[0].append(str(msg))
         setattr(mock('logging'), 'warn', log_warnings)
 
         # Run the test. Compare status, then messages.
@@ -266,6 +267,134 @@ class TestFailIfNotIn(TestCase):
     pass
 
 
+class TestLogging(TestCase):
+    """
+    Tests for lazy, level-aware logging helpers
+    """
+
+    def setUp(self):
+        import logging
+        import subtestbase
+        records = self.records = []
+
+        class Capture(logging.Handler):
+
+            def emit(self, record):
+                records.append(record)
+
+        self.logging = logging
+        self.subtestbase = subtestbase
+        self.handler = Capture()
+        self.logger = logging.getLogger()
+        self.level = self.logger.level
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+
+    def test_level_off(self):
+
+        class Unrenderable(object):
+
+            def __str__(self):
+                raise AssertionError("Rendered disabled debug message")
+
+        self.logger.setLevel(self.logging.INFO)
+        self.subtestbase.SubBase.logdebug("%s", Unrenderable())
+        self.assertEqual(self.records, [])
+
+    def test_multiline(self):
+        self.logger.setLevel(self.logging.DEBUG)
+        self.subtestbase.SubBase.loginfo("one\ntwo %d", 2)
+        lines = self.records[0].getMessage().splitlines()
+        self.assertEqual(lines[0], "\tSubBase: one")
+        # Continuation lines are indented past date & class name
+        self.assertEqual(lines[1], " " * self.subtestbase.SubBase.n_spaces +
+                         "\t" + " " * len("SubBase: ") + "two 2")
+
+    def test_clipped(self):
+        clipped = self.subtestbase.Clipped
+        self.assertEqual(str(clipped('short', 20)), 'short')
+        text = str(clipped('a' * 10 + 'b' * 100 + 'c' * 10, 20))
+        self.assertTrue(text.startswith('a' * 10 + '\n'))
+        self.assertTrue(text.endswith('\n' + 'c' * 10))
+        self.assertIn('100 characters omitted', text)
+
+
+class TestStageTimes(TestCase):
+    """
+    Tests for automatic stage timing
+    """
+
+    def setUp(self):
+        import subtestbase
+
+        class Staged(subtestbase.SubBase):
+            config_section = 'docker_cli/staged'
+            written = 0
+
+            def initialize(self):
+                # Don't need config for SubBase.initialize()
+                pass
+
+            def run_once(self):
+                super(Staged, self).run_once()
+                raise DockerTestFail("boom")
+
+            def write_stage_times(self):
+                self.written += 1
+
+        self.subtestbase = subtestbase
+        self.staged = Staged()
+        self.staged.step_log_msgs = {}
+
+    def test_stages_timed(self):
+        self.staged.initialize()
+        self.assertRaises(DockerTestFail, self.staged.run_once)
+        self.staged.postprocess()
+        self.assertEqual(self.staged.written, 0)
+        self.staged.cleanup()
+        self.assertEqual(self.staged.written, 1)
+        self.assertEqual(self.staged.stage_times.keys(),
+                         ['initialize', 'run_once', 'postprocess', 'cleanup'])
+        # super() call from run_once() is not timed separately
+        self.assertEqual(self.staged.stage_times['run_once']['calls'], 1)
+        self.assertTrue(self.staged.stage_times['run_once']['wall'] >= 0)
+        self.assertEqual(self.staged.run_once.func_name, 'run_once')
+
+    def test_stage_keyvals(self):
+        self.staged.initialize()
+        self.staged.initialize()
+        keyvals = self.staged.stage_keyvals('child_stage')
+        self.assertEqual(keyvals['child_stage_initialize_calls'], 2)
+        self.assertEqual(sorted(keyvals.keys()),
+                         ['child_stage_initialize_calls',
+                          'child_stage_initialize_children_cpu_seconds',
+                          'child_stage_initialize_cpu_seconds',
+                          'child_stage_initialize_wall_seconds'])
+
+    def test_append_stage_times(self):
+        import json
+        import shutil
+        import tempfile
+        resultdir = tempfile.mkdtemp()
+        try:
+            self.staged.initialize()
+            self.staged.append_stage_times(resultdir)
+            self.staged.append_stage_times(resultdir, 'docker_cli')
+            path = os.path.join(resultdir,
+                                self.subtestbase.STAGE_TIMES_FILENAME)
+            records = [json.loads(line) for line in open(path)]
+            self.assertEqual(len(records), 2)
+            self.assertEqual(records[0]['name'], 'docker_cli/staged')
+            self.assertEqual(records[0]['parent'], None)
+            self.assertEqual(records[1]['parent'], 'docker_cli')
+            self.assertIn('initialize', records[1]['stages'])
+        finally:
+            shutil.rmtree(resultdir)
+
+
 # Generate tests for each case:
 #  https://stackoverflow.com/questions/32899/how-to-generate-dynamic-parametrized-unit-tests-in-python
 def test_generator_pass(needle, haystack):
@@ -0,0 +1,119 @@
+"""
+Process-wide trace log of docker command invocations
+
+Every docker command run through ``dockercmd``, ``DockerContainers``
+or ``DockerImages`` is appended as a JSON line to ``TRACE_FILENAME`` in
+the job results directory, tagged with the owning (sub-)subtest and its
+currently executing stage.  The ``docker_trace`` posttest converts the
+job's records into Chrome ``trace_event`` format, using
+``chrome_trace()``, for viewing a whole run on a timeline.
+"""
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+#: Name of trace file in job results directory
+TRACE_FILENAME = 'docker_trace.jsonl'
+
+#: Serializes appends from threaded subtests
+_LOCK = threading.Lock()
+
+
+def owning_test(subtest):
+    """Return ``Subtest`` instance running subtest, possibly itself"""
+    # SubSubtest instances run under their parent's job
+    return getattr(subtest, 'parent_subtest', None) or subtest
+
+
+def trace_path(subtest):
+    """
+    Return path to trace file for subtest, or None if tracing is disabled
+
+    :param subtest: ``Subtest`` or ``SubSubtest`` instance owning command
+    """
+    if not subtest.config.get('trace_commands', False):
+        return None
+    job = getattr(owning_test(subtest), 'job', None)
+    if job is None:
+        return None
+    return os.path.join(job.resultdir, TRACE_FILENAME)
+
+
+def record(subtest, subcmd, command, start, cmdresult=None, **extra):
+    """
+    Append record of command, ending now, into subtest's trace file
+
+    :param subtest: ``Subtest`` or ``SubSubtest`` instance owning command
+    :param subcmd: Docker sub-command string (first word is recorded)
+    :param command: Complete command-line string
+    :param start: ``time.time()`` value when command started
+    :param cmdresult: CmdResult instance, or None if command raised
+    :param extra: Additional items to include in the record
+    """
+    end = time.time()
+    path = trace_path(subtest)
+    if path is None:
+        return
+    entry = {'subcmd': (subcmd.split() or [''])[0],
+             'args_hash': hashlib.sha1(command).hexdigest()[:12],
+             'start': start,
+             'end': end,
+             'exit_status': None,
+             'stdout_bytes': None,
+             'stderr_bytes': None,
+             'test': owning_test(subtest).config_section,
+             'subtest': subtest.config_section,
+             'stage': getattr(subtest, 'current_stage', None),
+             'pid': os.getpid(),
+             'tid': threading.current_thread().ident}
+    if cmdresult is not None:
+        entry['exit_status'] = cmdresult.exit_status
+        entry['stdout_bytes'] = len(cmdresult.stdout or '')
+        entry['stderr_bytes'] = len(cmdresult.stderr or '')
+    entry.update(extra)
+    line = json.dumps(entry) + '\n'
+    try:
+        with _LOCK:
+            with open(path, 'ab') as trace_file:
+                trace_file.write(line)
+    except IOError, xcept:
+        subtest.logdebug("Unable to record command trace: %s", xcept)
+
+
+def chrome_trace(records):
+    """
+    Return Chrome ``trace_event`` format dictionary from trace records
+
+    Each process (i.e. autotest test) becomes a timeline track named
+    after its subtest, with one row per thread.
+
+    :param records: Iterable of trace record dictionaries
+    """
+    events = []
+    named = set()
+    for entry in records:
+        if entry['pid'] not in named:
+            named.add(entry['pid'])
+            events.append({'name': 'process_name', 'ph': 'M',
+                           'pid': entry['pid'], 'tid': entry['tid'],
+                           'args': {'name': entry['test']}})
+        args = dict((key, entry[key]) for key in ('args_hash', 'exit_status',
+                                                  'stdout_bytes',
+                                                  'stderr_bytes', 'subtest',
+                                                  'stage'))
+        events.append({'name': entry['subcmd'],
+                       'cat': entry['stage'] or 'none',
+                       'ph': 'X',
+                       'ts': int(entry['start'] * 1000000),
+                       'dur': int((entry['end'] - entry['start']) * 1000000),
+                       'pid': entry['pid'],
+                       'tid': entry['tid'],
+                       'args': args})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
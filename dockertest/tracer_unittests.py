@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+# Pylint runs from a different directory, it's fine to import this way
+# pylint: disable=W0403
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class FakeCmdResult(object):
+
+    exit_status = 1
+    stdout = 'output'
+    stderr = ''
+
+
+class FakeSubtest(object):
+
+    config_section = 'docker_cli/fake'
+    current_stage = 'run_once'
+
+    def __init__(self, resultdir, trace_commands=True):
+        self.job = type('FakeJob', (object,), {'resultdir': resultdir})()
+        self.config = {'trace_commands': trace_commands}
+        self.logged = []
+
+    def logdebug(self, message, *args):
+        self.logged.append(message % args)
+
+
+class FakeSubSubtest(object):
+
+    config_section = 'docker_cli/fake/sub'
+    current_stage = 'cleanup'
+
+    def __init__(self, parent_subtest):
+        self.parent_subtest = parent_subtest
+        self.config = {}
+
+
+class TracerTestBase(unittest.TestCase):
+
+    def setUp(self):
+        import tracer
+        self.tracer = tracer
+        self.tmpdir = tempfile.mkdtemp(self.__class__.__name__)
+        self.path = os.path.join(self.tmpdir, tracer.TRACE_FILENAME)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        del self.tracer
+
+    def records(self):
+        with open(self.path, 'rb') as trace_file:
+            return [json.loads(line) for line in trace_file]
+
+
+class RecordTest(TracerTestBase):
+
+    def test_record(self):
+        subtest = FakeSubtest(self.tmpdir)
+        self.tracer.record(subtest, 'run --rm busybox', 'docker run', 1.0,
+                           FakeCmdResult())
+        self.tracer.record(subtest, 'ps', 'docker ps', 2.0, None,
+                           background=True)
+        first, second = self.records()
+        self.assertEqual(first['subcmd'], 'run')
+        self.assertEqual(first['exit_status'], 1)
+        self.assertEqual(first['stdout_bytes'], 6)
+        self.assertEqual(first['stderr_bytes'], 0)
+        self.assertEqual(first['test'], 'docker_cli/fake')
+        self.assertEqual(first['stage'], 'run_once')
+        self.assertEqual(first['pid'], os.getpid())
+        self.assertTrue(first['end'] >= first['start'])
+        self.assertEqual(len(first['args_hash']), 12)
+        self.assertEqual(second['exit_status'], None)
+        self.assertTrue(second['background'])
+
+    def test_subsubtest(self):
+        subtest = FakeSubtest(self.tmpdir)
+        subsubtest = FakeSubSubtest(subtest)
+        subsubtest.config['trace_commands'] = True
+        self.tracer.record(subsubtest, 'rm', 'docker rm', 1.0)
+        record = self.records()[0]
+        self.assertEqual(record['test'], 'docker_cli/fake')
+        self.assertEqual(record['subtest'], 'docker_cli/fake/sub')
+        self.assertEqual(record['stage'], 'cleanup')
+
+    def test_disabled(self):
+        self.tracer.record(FakeSubtest(self.tmpdir, False), 'ps', 'docker ps',
+                           1.0)
+        subsubtest = FakeSubSubtest(object())
+        subsubtest.config['trace_commands'] = True
+        self.tracer.record(subsubtest, 'ps', 'docker ps', 1.0)
+        self.assertFalse(os.path.exists(self.path))
+
+
+class ChromeTraceTest(TracerTestBase):
+
+    def test_chrome_trace(self):
+        subtest = FakeSubtest(self.tmpdir)
+        for start in (1.0, 2.0):
+            self.tracer.record(subtest, 'images', 'docker images', start,
+                               FakeCmdResult())
+        trace = self.tracer.chrome_trace(self.records())
+        events = trace['traceEvents']
+        self.assertEqual([event['ph'] for event in events], ['M', 'X', 'X'])
+        self.assertEqual(events[0]['args']['name'], 'docker_cli/fake')
+        self.assertEqual(events[1]['name'], 'images')
+        self.assertEqual(events[1]['cat'], 'run_once')
+        self.assertEqual(events[1]['ts'], 1000000)
+        self.assertTrue(events[2]['dur'] > 0)
+        json.dumps(trace)
+
+
+if __name__ == '__main__':
+    unittest.main()
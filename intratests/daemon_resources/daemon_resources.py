@@ -0,0 +1,140 @@
+r"""
+Summary
+---------
+
+Record docker daemon resource usage after every subtest, and flag
+steady growth that suggests a memory, file-descriptor or thread leak.
+
+Operational Summary
+----------------------
+
+#. Sample RSS, VmHWM, open fds and thread count of the docker daemon
+   and the totals for every other ``processes`` name, plus the daemon's
+   goroutine count.
+#. Append the sample to ``daemon_resources.jsonl`` in the job results
+   directory.
+#. Over the last ``window`` samples taken from the same daemon process,
+   fit a line to every metric in ``slope_limits``.
+#. Warn, or fail if ``fail_on_growth`` is set, for every metric whose
+   slope exceeds it's limit, with an r-squared of at least
+   ``min_r_squared``.
+
+Operational Detail
+----------------------
+
+Each line of ``daemon_resources.jsonl`` is a JSON object.  Metric keys
+are ``<process>_<metric>``, where ``<process>`` is ``dockerd`` or one of
+the ``processes`` names, and ``<metric>`` is one of ``rss_kb``,
+``hwm_kb``, ``fds``, ``threads`` or ``count`` (number of processes).
+The ``dockerd_goroutines`` key comes from the daemon's ``/info`` API.
+Slopes are in metric units per sample, i.e. per subtest.
+
+Prerequisites
+---------------
+
+*  The docker daemon runs on the local host, under systemd
+"""
+
+import json
+import os
+import time
+from autotest.client import utils
+from dockertest import subtest
+from dockertest import docker_daemon
+from dockertest.config import get_as_list
+from dockertest.performance import linear_fit, proc_status
+from dockertest.xceptions import DockerTestFail
+
+
+class daemon_resources(subtest.Subtest):
+
+    # This runs between EVERY subtest, okay, to be more quiet.
+    step_log_msgs = {}
+
+    #: Name of time series file in the job results directory
+    series_filename = 'daemon_resources.jsonl'
+
+    def initialize(self):
+        super(daemon_resources, self).initialize()
+        self.step_log_msgs = {}
+        self.stuff['series_path'] = os.path.join(self.job.resultdir,
+                                                 self.series_filename)
+        limits = {}
+        for item in get_as_list(self.config['slope_limits']):
+            key, limit = item.rsplit(':', 1)
+            limits[key.strip()] = float(limit)
+        self.stuff['slope_limits'] = limits
+
+    def run_once(self):
+        super(daemon_resources, self).run_once()
+        sample = {'time': time.time(), 'step': self.tagged_testname}
+        sample['dockerd_pid'] = daemon_pid = docker_daemon.pid()
+        self.add_metrics(sample, 'dockerd', [daemon_pid])
+        try:
+            info = docker_daemon.SocketClient().get_json('/info')
+            sample['dockerd_goroutines'] = info['NGoroutines']
+        except (IOError, ValueError, KeyError), xcept:
+            self.logdebug("Unable to retrieve goroutine count: %s", xcept)
+        for name in get_as_list(self.config['processes']):
+            pids = utils.run("pgrep -x %s" % name,
+                             ignore_status=True).stdout.split()
+            self.add_metrics(sample, name, pids)
+        with open(self.stuff['series_path'], 'ab') as series:
+            series.write(json.dumps(sample, sort_keys=True) + '\n')
+        self.stuff['sample'] = sample
+
+    @staticmethod
+    def add_metrics(sample, name, pids):
+        """
+        Add sum of ``proc_status()`` for all pids into sample dictionary
+
+        :param sample: Dictionary to add '<name>_<metric>' keys into
+        :param name: Process name prefix for keys
+        :param pids: List of process IDs to total together
+        """
+        sample['%s_count' % name] = 0
+        for pid in pids:
+            try:
+                status = proc_status(pid)
+            except IOError:
+                continue  # Process exited since it was found
+            sample['%s_count' % name] += 1
+            for key, value in status.iteritems():
+                key = '%s_%s' % (name, key)
+                sample[key] = sample.get(key, 0) + value
+
+    def window(self):
+        """Return up to ``window`` latest samples, from current daemon pid"""
+        with open(self.stuff['series_path'], 'rb') as series:
+            samples = [json.loads(line) for line in series if line.strip()]
+        daemon_pid = self.stuff['sample']['dockerd_pid']
+        recent = []
+        for sample in reversed(samples[-self.config['window']:]):
+            if sample.get('dockerd_pid') != daemon_pid:
+                break  # Daemon was restarted, earlier samples don't apply
+            recent.insert(0, sample)
+        return recent
+
+    def postprocess(self):
+        super(daemon_resources, self).postprocess()
+        recent = self.window()
+        if len(recent) < self.config['window']:
+            self.logdebug("Only %d of %d samples available, not checking "
+                          "for growth", len(recent), self.config['window'])
+            return
+        growing = []
+        for key, limit in sorted(self.stuff['slope_limits'].items()):
+            values = [sample[key] for sample in recent if key in sample]
+            if len(values) < len(recent):
+                continue  # Metric not available in every sample
+            slope, r_squared = linear_fit(values)
+            if slope > limit and r_squared >= self.config['min_r_squared']:
+                growing.append("%s grew %0.2f per subtest (r-squared %0.2f) "
+                               "over last %d subtests"
+                               % (key, slope, r_squared, len(values)))
+        if growing:
+            msg = ("Possible docker daemon resource leak: %s"
+                   % "; ".join(growing))
+            if self.config['fail_on_growth']:
+                raise DockerTestFail(msg)
+            self.logwarning(msg)
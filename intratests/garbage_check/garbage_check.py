@@ -8,6 +8,7 @@ images from the local registry.
 Operational Summary
 ----------------------
 
+#. Wait for any background reaper container & image removals to finish
 #. Check for unexpected running containers
 #. Kill unexpected running containers
 #. Remove unexpected containers
@@ -17,6 +18,7 @@ Prerequisites
 ---------------
 
 Customized configuration listing expected containers and images.
+Images in the ``build_cache_index`` are also expected.
 """
 
 from dockertest.subtest import SubSubtestCaller
@@ -25,6 +27,8 @@ from dockertest.containers import DockerContainers
 from dockertest.images import DockerImage
 from dockertest.images import DockerImages
 from dockertest.config import get_as_list
+from dockertest import buildcache
+from dockertest import reaper
 
 
 class DockerImageIncomplete(DockerImage):
@@ -138,6 +142,11 @@ class Base(SubSubtest):
     def initialize(self):
         super(Base, self).initialize()
         self.step_log_msgs = {}
+        # Queued removals would be mistaken for garbage, volumes aren't checked
+        waited = reaper.wait(self, ('container', 'image'))
+        if waited:
+            self.logdebug("Waited %0.1f seconds for background reaper",
+                          waited)
         self.sub_stuff['dc'] = DockerContainers(self)
         self.sub_stuff['di'] = di = DockerImages(self)
         di.DICLS = DockerImageIncomplete
@@ -149,6 +158,9 @@ class Base(SubSubtest):
         preserve_images = [default_image]
         for fqin_or_id in get_as_list(self.config['preserve_fqins']):
             preserve_images.append(self.fuzzy_img(fqin_or_id))
+        # Cached builds are kept across tests & jobs on purpose
+        for fqin in buildcache.cached_fqins(self.config):
+            preserve_images.append(self.fuzzy_img(fqin))
         self.sub_stuff['preserve_images'] = preserve_images
 
         preserve_cnames = set(get_as_list(self.config['preserve_cnames']))
@@ -0,0 +1,78 @@
+r"""
+Summary
+-------
+
+Convert the job's docker command trace into a Chrome ``trace_event``
+file, and report which docker sub-commands the job spent its time in.
+
+Operational Summary
+-------------------
+
+#. Read every record from ``docker_trace.jsonl`` in the job results
+   directory, as appended for each docker command when the
+   ``trace_commands`` option is enabled.
+#. Write them as ``docker_trace.json`` into the results directory,
+   for loading into ``chrome://tracing`` or Perfetto.
+#. Log and record keyvals for the ``top_subcmds`` docker sub-commands
+   having the most total time.
+
+Prerequisites
+-------------
+
+The ``trace_commands`` option enabled while running the other subtests.
+"""
+
+import json
+import os.path
+from dockertest import subtest
+from dockertest.tracer import TRACE_FILENAME, chrome_trace
+
+
+class docker_trace(subtest.Subtest):
+
+    def initialize(self):
+        super(docker_trace, self).initialize()
+        self.stuff['records'] = []
+        path = os.path.join(self.job.resultdir, TRACE_FILENAME)
+        if not os.path.isfile(path):
+            self.logwarning("No docker commands traced in %s", path)
+            return
+        with open(path, 'rb') as trace_file:
+            for line in trace_file:
+                try:
+                    self.stuff['records'].append(json.loads(line))
+                except ValueError:
+                    self.logwarning("Ignoring malformed line: %s", line)
+
+    def run_once(self):
+        super(docker_trace, self).run_once()
+        subcmds = {}
+        for entry in self.stuff['records']:
+            totals = subcmds.setdefault(entry['subcmd'], {'count': 0,
+                                                          'seconds': 0.0,
+                                                          'failures': 0})
+            totals['count'] += 1
+            totals['seconds'] += entry['end'] - entry['start']
+            if entry['exit_status'] != 0:
+                totals['failures'] += 1
+        self.stuff['subcmds'] = subcmds
+
+    def postprocess(self):
+        super(docker_trace, self).postprocess()
+        subcmds = self.stuff['subcmds']
+        ranked = sorted(subcmds.iteritems(),
+                        key=lambda item: item[1]['seconds'], reverse=True)
+        keyvals = {'commands': len(self.stuff['records']),
+                   'total_seconds': sum(totals['seconds']
+                                        for totals in subcmds.itervalues())}
+        self.loginfo("Traced %d docker commands, %0.1f seconds total",
+                     keyvals['commands'], keyvals['total_seconds'])
+        for name, totals in ranked[:self.config['top_subcmds']]:
+            self.loginfo("%10.2f %s (%d calls, %d failed)", totals['seconds'],
+                         name, totals['count'], totals['failures'])
+            keyvals['%s_seconds' % name] = totals['seconds']
+            keyvals['%s_count' % name] = totals['count']
+        self.write_test_keyval(keyvals)
+        with open(os.path.join(self.resultsdir, 'docker_trace.json'),
+                  'wb') as trace:
+            json.dump(chrome_trace(self.stuff['records']), trace)
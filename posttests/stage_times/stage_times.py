@@ -0,0 +1,83 @@
+r"""
+Summary
+-------
+
+Report where the job's time went: the slowest individual stages, and
+the total time spent in each stage across all subtests.
+
+Operational Summary
+-------------------
+
+#. Read every record from ``stage_times.jsonl`` in the job results
+   directory, as appended by each (sub-)subtest after its ``cleanup()``.
+#. Total the wall and CPU seconds of each stage, over top-level
+   subtests only (sub-subtest time is already part of the parent's).
+#. Log the ``slowest`` individual (sub-)subtest stages, by wall time.
+#. Record per-stage totals and fractions as keyvals, and everything
+   in a ``stage_times_report.json`` results file.
+"""
+
+import json
+import os.path
+from collections import OrderedDict
+from dockertest import subtest
+from dockertest.subtestbase import STAGE_TIMES_FILENAME
+
+
+class stage_times(subtest.Subtest):
+
+    def initialize(self):
+        super(stage_times, self).initialize()
+        self.stuff['records'] = []
+        path = os.path.join(self.job.resultdir, STAGE_TIMES_FILENAME)
+        if not os.path.isfile(path):
+            self.logwarning("No stage times recorded in %s", path)
+            return
+        with open(path, 'rb') as stage_times_file:
+            for line in stage_times_file:
+                try:
+                    self.stuff['records'].append(json.loads(line))
+                except ValueError:
+                    self.logwarning("Ignoring malformed line: %s", line)
+
+    def run_once(self):
+        super(stage_times, self).run_once()
+        totals = OrderedDict((stage, {'wall': 0.0, 'cpu': 0.0,
+                                      'children_cpu': 0.0})
+                             for stage in self.timed_stages)
+        slowest = []
+        for record in self.stuff['records']:
+            for stage, times in record['stages'].iteritems():
+                slowest.append({'name': record['name'], 'stage': stage,
+                                'wall': times['wall'], 'cpu': times['cpu'],
+                                'children_cpu': times['children_cpu']})
+                if record['parent'] is None and stage in totals:
+                    for key in totals[stage]:
+                        totals[stage][key] += times[key]
+        slowest.sort(key=lambda entry: entry['wall'], reverse=True)
+        self.stuff['totals'] = totals
+        self.stuff['slowest'] = slowest[:self.config['slowest']]
+
+    def postprocess(self):
+        super(stage_times, self).postprocess()
+        totals = self.stuff['totals']
+        total_wall = sum(times['wall'] for times in totals.itervalues())
+        keyvals = {'total_wall_seconds': total_wall}
+        for stage, times in totals.iteritems():
+            fraction = times['wall'] / total_wall if total_wall else 0.0
+            self.loginfo("%s: %0.1f seconds (%0.1f%%)", stage, times['wall'],
+                         fraction * 100)
+            keyvals['%s_wall_seconds' % stage] = times['wall']
+            keyvals['%s_cpu_seconds' % stage] = times['cpu']
+            keyvals['%s_fraction' % stage] = fraction
+        self.loginfo("Slowest stages:")
+        for entry in self.stuff['slowest']:
+            self.loginfo("%10.2f %s %s (cpu %0.2f, children cpu %0.2f)",
+                         entry['wall'], entry['name'], entry['stage'],
+                         entry['cpu'], entry['children_cpu'])
+        self.write_test_keyval(keyvals)
+        with open(os.path.join(self.resultsdir, 'stage_times_report.json'),
+                  'wb') as report:
+            json.dump({'totals': totals, 'slowest': self.stuff['slowest'],
+                       'records': len(self.stuff['records'])}, report,
+                      indent=2)
@@ -9,7 +9,8 @@ Operational Summary
 
 #. Parse the default test image into FQIN format
 #. Pull the default, and any configured ``extra_fqins_csv`` images
-#. Build any ``build_dockerfile`` w/ ``build_name`` images.
+#. Build any ``build_dockerfile`` w/ ``build_name`` images, re-using
+   a cached image when ``build_dockerfile`` is an unchanged local directory.
 #. Log a listing of all current images to debug and a sysinfo file
 #. Optionally, update ``config_defaults/defaults.ini`` (if it exists)
    to preserve all pulled images.  Configured by ``update_defaults_ini``
@@ -24,6 +25,7 @@ the file ``config_defaults/defaults.ini`` must exist.
 """
 
 import os.path
+from dockertest import buildcache
 from dockertest.subtest import SubSubtestCaller
 from dockertest.subtest import SubSubtest
 from dockertest.images import DockerImages
@@ -114,6 +116,7 @@ class builder(SubSubtest):
         stuff = self.parent_subtest.stuff
         # Someday we might support building more than one
         for name, dockerfile in stuff['build'].items():
-            this_subopts = subopts + ['-t', name, dockerfile]
-            mustpass(DockerCmd(self, 'build', this_subopts).execute())
+            # Without --no-cache or --pull, local directories are only
+            # re-built when they change
+            buildcache.build(self, dockerfile, subopts + ['-t', name])
             stuff['fqins'] += stuff['build'].keys()
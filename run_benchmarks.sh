@@ -0,0 +1,44 @@
+#!/bin/bash
+
+# Run all dockertest library micro-benchmarks, merging results into
+# $BENCHMARK_RESULTS (default: benchmarks_results.json) and comparing
+# them against $BENCHMARK_BASELINE (default: benchmarks_baseline.json
+# next to this script).  Absolute ops/sec only compare on the same host,
+# so the baseline is never checked in: when it doesn't exist yet, this
+# run's results become the baseline, recorded on this host.  Any further
+# options are passed on to each benchmark (see dockertest/microbench.py).
+#
+# Usage: run_benchmarks.sh [--update-baseline] [benchmark options...]
+
+MYDIR=$(dirname $0)
+export PYTHONPATH=$MYDIR:$PYTHONPATH
+
+BASELINE=${BENCHMARK_BASELINE:-$MYDIR/benchmarks_baseline.json}
+RESULTS=${BENCHMARK_RESULTS:-benchmarks_results.json}
+
+if [ "$1" == "--update-baseline" ]
+then
+    shift
+    COMPARE=""
+elif [ ! -f "$BASELINE" ]
+then
+    echo "No $BASELINE yet, recording one from this host"
+    COMPARE=""
+else
+    COMPARE="--baseline $BASELINE"
+fi
+
+rm -f $RESULTS
+RC=0
+for benchmark in $(find $MYDIR/dockertest -name '*_benchmarks.py' | sort)
+do
+    echo \$ python $benchmark
+    python $benchmark --output $RESULTS $COMPARE "$@" || RC=1
+done
+
+if [ -z "$COMPARE" ] && [ "$RC" -eq "0" ]
+then
+    cp $RESULTS $BASELINE
+    echo "Updated $BASELINE"
+fi
+exit $RC
@@ -5,7 +5,9 @@ Summary
 Simple tests that check the the ``docker cp`` command.  The ``simple``
 subtest verifies content creation and exact match after cp.  The
 ``every_last`` subtest verifies copying many hundreds of files from a
-stopped container to the host.  The ``volume_mount`` subtest verifies
+stopped container to the host, one ``docker cp`` per file and/or
+extracted from one archive stream per top-level directory, timing each
+method.  The ``volume_mount`` subtest verifies
 https://github.com/docker/docker/issues/27773
 
 Operational Summary
@@ -21,12 +23,19 @@ Prerequisites
    structure.
 """
 
-from StringIO import StringIO
-import pickle
 import hashlib
 import inspect
+import os
 import os.path
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
 from autotest.client import utils
+from dockertest import tracer
+from dockertest.config import get_as_list
 from dockertest.subtest import SubSubtest
 from dockertest.subtest import SubSubtestCaller
 from dockertest.output import mustpass, OutputGood
@@ -113,14 +122,19 @@ class simple(CpBase):
 # Turned into code string by every_last.container_files()
 # Must re-import needed modules and be top-level because
 # inspect.getsource() preserves indentation)
-def all_files(exclude_paths, exclude_symlinks=False):
+def last_files(exclude_paths, exclude_symlinks=False, max_files=None):
     from os import walk
     from os.path import islink
     from os.path import join
-    from pickle import dump
     from sys import stdout
-    data = []
-    for dp, dn, fl in walk("/"):
+    # python3: stdout is str-only, we need a binary-capable file object
+    outfile = stdout
+    if hasattr(stdout, "buffer"):
+        outfile = stdout.buffer
+    exclude_paths = [exclude_path.encode() for exclude_path in exclude_paths]
+    count = 0
+    # bytes paths, so undecodable names pass through unmodified
+    for dp, _, fl in walk("/".encode()):
         skip = False
         for exclude_path in exclude_paths:
             if dp.startswith(exclude_path):
@@ -131,44 +145,68 @@ def all_files(exclude_paths, exclude_symlinks=False):
                 fl = [fi
                       for fi in fl
                       if not islink(join(dp, fi))]
-            data.append((dp, dn, fl))
-    # python3: stdout is str-only, we need a binary-capable file object
-    outfile = stdout
-    if hasattr(stdout, "buffer"):
-        outfile = stdout.buffer
-    dump(data, outfile, 2)
+            if fl:
+                # NUL-terminated, one record per directory, as found
+                outfile.write(join(dp, fl[-1]) + "\0".encode())
+                outfile.flush()
+                count += 1
+                if max_files is not None and count >= max_files:
+                    break
 
 
 class every_last(CpBase):
 
-    def container_files(self, fqin):
+    def container_files(self, fqin, max_files=None):
         """
-        Returns a list of tuples as from os.walk() inside fqin
+        Returns list of the last file in each directory inside fqin
+
+        :param fqin: Fully qualified image name to run
+        :param max_files: Stop after this many files, None for all
         """
         python_path = self.config['python_path']
-        code = ('%s\nall_files([%s], %s)'
-                % (inspect.getsource(all_files),
+        code = ('%s\nlast_files([%s], %s, %s)'
+                % (inspect.getsource(last_files),
                    self.config['exclude_paths'],
-                   self.config['exclude_symlinks']))
+                   self.config['exclude_symlinks'],
+                   max_files))
         subargs = ["--net=none",
                    "--name=%s" % self.sub_stuff['container_name'],
                    "--attach=stdout",
                    fqin,
                    "%s -c '%s'" % (python_path, code)]
-        nfdc = DockerCmd(self, "run", subargs)
+        nfdc = AsyncDockerCmd(self, "run", subargs)
         nfdc.quiet = True
         self.logdebug("Executing %s", nfdc.command)
-        mustpass(nfdc.execute())
-        return pickle.load(StringIO(nfdc.stdout))
+        nfdc.execute()
+        lastfiles = []
+        partial = ''
+        offset = 0
+        while max_files is None or len(lastfiles) < max_files:
+            done = nfdc.done  # Check before reading, to not miss output
+            stdout = nfdc.stdout
+            # Only look at output received since last time around
+            records = (partial + stdout[offset:]).split('\0')
+            offset = len(stdout)
+            partial = records.pop()  # Incomplete (or empty) record
+            lastfiles += records
+            if done:
+                break
+            time.sleep(0.1)
+        mustpass(nfdc.wait())
+        return lastfiles[:max_files]
 
     def initialize(self):
         super(every_last, self).initialize()
-        # list of tuples as generated by os.walk('/') inside container
-        oswalk = self.container_files(self.sub_stuff['fqin'])
-        # Grab the last filename entry from each directory
-        self.sub_stuff['lastfiles'] = [os.path.join(dp, fl[-1])
-                                       for (dp, _, fl) in oswalk
-                                       if len(fl) > 0]
+        # Last file from each directory inside container, as generated
+        self.sub_stuff['lastfiles'] = self.container_files(
+            self.sub_stuff['fqin'], self.config['max_files'])
+        copy_modes = get_as_list(self.config['copy_modes'])
+        for copy_mode in copy_modes:
+            self.failif(copy_mode not in ('per_file', 'batched'),
+                        "Unknown copy_modes value: '%s'" % copy_mode)
+        self.sub_stuff['copy_modes'] = copy_modes
+        # copy_mode -> dict of files, bytes, seconds, etc.
+        self.sub_stuff['timings'] = {}
 
     def run_once(self):
         super(every_last, self).run_once()
@@ -178,32 +216,215 @@ class every_last(CpBase):
                     "Max files number expected : %d,"
                     "exceeds container total has : %d"
                     % (self.config['max_files'], total))
-        self.loginfo("Testing copy of %d files from container" % total)
-        self.sub_stuff['results'] = {}  # cont_path -> cmdresult
+        srcfiles = self.sub_stuff['lastfiles'][:self.config['max_files']]
+        for copy_mode in self.sub_stuff['copy_modes']:
+            host_path = os.path.join(self.tmpdir, copy_mode)
+            os.mkdir(host_path)
+            self.loginfo("Testing %s copy of %d files (of %d) from container",
+                         copy_mode, len(srcfiles), total)
+            start = time.time()
+            timing = getattr(self, 'copy_%s' % copy_mode)(srcfiles, host_path)
+            timing['seconds'] = time.time() - start
+            self.sub_stuff['timings'][copy_mode] = timing
+        # Per-file results are kept for backwards compatibility
+        if 'per_file' in self.sub_stuff['timings']:
+            self.sub_stuff['nfiles'] = (
+                self.sub_stuff['timings']['per_file']['files'])
+
+    def copy_per_file(self, srcfiles, host_path):
+        """
+        Copy each of srcfiles into host_path with one ``docker cp`` per file
+
+        :returns: dict of files, bytes, and max_latency (seconds) copied
+        """
         nfdc = DockerCmd(self, 'cp')
         nfdc.quiet = True
         nfiles = 0
-        for index, srcfile in enumerate(self.sub_stuff['lastfiles']):
-            if index % 100 == 0:
-                self.loginfo("Copied %d of %d", nfiles, total)
+        nbytes = 0
+        max_latency = 0.0
+        for srcfile in srcfiles:
+            if nfiles % 100 == 0:
+                self.loginfo("Copied %d of %d", nfiles, len(srcfiles))
             cont_path = "%s:%s" % (self.sub_stuff['container_name'], srcfile)
-            host_path = self.tmpdir
             host_fullpath = os.path.join(host_path, os.path.basename(srcfile))
             nfdc.subargs = [cont_path, host_path]
-            mustpass(nfdc.execute())
+            max_latency = max(max_latency, mustpass(nfdc.execute()).duration)
             self.failif(not os.path.isfile(host_fullpath),
                         "Not a file: '%s'" % host_fullpath)
+            nbytes += os.path.getsize(host_fullpath)
             nfiles += 1
-            self.sub_stuff['nfiles'] = nfiles
-            if nfiles >= self.config['max_files']:
-                self.loginfo("Configuration max %d, Copied %d of %d"
-                             % (self.config['max_files'], nfiles, total))
-                break
+        return {'files': nfiles, 'bytes': nbytes, 'max_latency': max_latency}
+
+    @staticmethod
+    def archive_root(srcfiles):
+        """
+        Return deepest container path containing all srcfiles
+
+        :raise ValueError: If that's ``/``, i.e. the entire filesystem
+        """
+        if len(srcfiles) == 1:
+            return srcfiles[0]
+        dirnames = [os.path.dirname(srcfile) for srcfile in srcfiles]
+        common = os.path.commonprefix(dirnames)
+        # commonprefix() is character-wise, back up to a whole component
+        if not all(dirname == common or dirname.startswith(common + '/')
+                   for dirname in dirnames):
+            common = os.path.dirname(common)
+        if common in ('', '/'):
+            raise ValueError("Refusing to archive entire container "
+                             "filesystem for %s" % srcfiles)
+        return common
+
+    @classmethod
+    def batches(cls, srcfiles):
+        """
+        Return dict of archive root to srcfiles, one per top-level directory
+        """
+        groups = {}
+        for srcfile in srcfiles:
+            components = srcfile.strip('/').split('/')
+            # Files directly under / are archived by themselves
+            if len(components) > 1:
+                key = '/' + components[0]
+            else:
+                key = srcfile
+            groups.setdefault(key, []).append(srcfile)
+        return dict((cls.archive_root(files), files)
+                    for files in groups.values())
+
+    @staticmethod
+    def member_path(archive_root, srcfile):
+        """
+        Return normalized archive member name expected for srcfile
+        """
+        # docker cp names members relative to archive_root's parent
+        return os.path.relpath(srcfile, os.path.dirname(archive_root))
+
+    def copy_batched(self, srcfiles, host_path):
+        """
+        Extract srcfiles into host_path from one ``docker cp`` stream per batch
+
+        :returns: dict of files, bytes, streams, and first_latency (seconds)
+        """
+        timing = {'files': 0, 'bytes': 0, 'streams': 0,
+                  'first_latency': None}
+        start = time.time()
+        for archive_root, files in sorted(self.batches(srcfiles).items()):
+            self.copy_archive(archive_root, files, host_path, start, timing)
+            timing['streams'] += 1
+        return timing
+
+    def copy_archive(self, archive_root, srcfiles, host_path, start, timing):
+        """
+        Extract srcfiles into host_path from a ``docker cp`` of archive_root
+
+        :param start: ``time.time()`` batched copying started
+        :param timing: dict of files, bytes, & first_latency to update
+        """
+        wanted = dict((self.member_path(archive_root, srcfile), srcfile)
+                      for srcfile in srcfiles)
+        cont_path = "%s:%s" % (self.sub_stuff['container_name'], archive_root)
+        dkrcmd = DockerCmd(self, 'cp', [cont_path, '-'])
+        # Read directly from the pipe, a CmdResult would hold all stdout
+        stderr = tempfile.TemporaryFile()
+        cp_start = time.time()
+        proc = subprocess.Popen(dkrcmd.command, shell=True, close_fds=True,
+                                stdout=subprocess.PIPE, stderr=stderr)
+        timer = threading.Timer(dkrcmd.timeout, proc.kill)
+        timer.start()
+        try:
+            early = self.extract_wanted(proc.stdout, wanted, host_path,
+                                        start, timing)
+        except tarfile.TarError:
+            # Usually because docker cp failed, it's stderr tells why
+            while proc.stdout.read(65536):
+                pass
+            mustpass(self.finish_cp(proc, dkrcmd, stderr, cp_start, timer))
+            raise
+        except:
+            self.finish_cp(proc, dkrcmd, stderr, cp_start, timer, kill=True)
+            raise
+        cmdresult = self.finish_cp(proc, dkrcmd, stderr, cp_start, timer,
+                                   kill=early)
+        # Killed after finishing early on purpose, otherwise must succeed
+        if not early:
+            mustpass(cmdresult)
+        self.failif(wanted, "Files missing from archive stream: %s"
+                    % sorted(wanted.values()))
+
+    def extract_wanted(self, fileobj, wanted, host_path, start, timing):
+        """
+        Extract wanted members of tar stream fileobj into host_path
+
+        :param wanted: dict of member name to srcfile, extracted ones are
+                       removed
+        :param start: ``time.time()`` batched copying started
+        :param timing: dict of files, bytes, & first_latency to update
+        :raise TarError: If fileobj isn't a (complete) tar stream
+        :returns: True if all were extracted before the end of the stream
+        """
+        archive = tarfile.open(fileobj=fileobj, mode='r|')
+        for member in archive:
+            name = os.path.normpath(member.name).lstrip('/')
+            srcfile = wanted.pop(name, None)
+            if srcfile is None:
+                continue  # Stream past everything not selected
+            self.failif(not member.isfile(),
+                        "Not a file: '%s' (%s)" % (srcfile, name))
+            host_fullpath = os.path.join(host_path,
+                                         os.path.basename(srcfile))
+            with open(host_fullpath, 'wb') as host_file:
+                shutil.copyfileobj(archive.extractfile(member), host_file)
+            if timing['first_latency'] is None:
+                timing['first_latency'] = time.time() - start
+            copied = os.path.getsize(host_fullpath)
+            self.failif_ne(copied, member.size,
+                           "Size of '%s' from archive index" % srcfile)
+            timing['bytes'] += copied
+            timing['files'] += 1
+            if not wanted:
+                return True  # Don't wait for the rest of the stream
+        while fileobj.read(65536):
+            pass  # Archive trailer, to the end of output
+        return False
+
+    def finish_cp(self, proc, dkrcmd, stderr, start, timer, kill=False):
+        """
+        Wait for ``docker cp`` proc to exit, return it's CmdResult
+
+        :param stderr: File proc's stderr was written to, closed here
+        :param start: ``time.time()`` proc started
+        :param timer: ``threading.Timer`` killing proc on timeout
+        :param kill: Kill proc first, instead of waiting for it
+        """
+        timer.cancel()
+        if kill and proc.poll() is None:
+            proc.kill()
+        exit_status = proc.wait()
+        proc.stdout.close()
+        stderr.seek(0)
+        cmdresult = utils.CmdResult(dkrcmd.command, '', stderr.read(),
+                                    exit_status, time.time() - start)
+        stderr.close()
+        tracer.record(self, 'cp', dkrcmd.command, start, cmdresult)
+        return cmdresult
 
     def postprocess(self):
         super(every_last, self).postprocess()
-        self.verify_files_number(self.sub_stuff['nfiles'],
-                                 self.config['max_files'])
+        keyvals = {}
+        for copy_mode, timing in self.sub_stuff['timings'].items():
+            self.verify_files_number(timing['files'],
+                                     self.config['max_files'])
+            seconds = max(timing['seconds'], 0.000001)
+            timing['files_per_sec'] = timing['files'] / seconds
+            timing['mbytes_per_sec'] = timing['bytes'] / seconds / 1048576.0
+            self.loginfo("%s: %d files, %d bytes in %0.2f seconds "
+                         "(%0.1f files/sec, %0.2f MB/sec)", copy_mode,
+                         timing['files'], timing['bytes'], timing['seconds'],
+                         timing['files_per_sec'], timing['mbytes_per_sec'])
+            for key, value in timing.items():
+                keyvals['every_last_%s_%s' % (copy_mode, key)] = value
+        self.parent_subtest.write_test_keyval(keyvals)
 
     def verify_files_number(self, copied_number, expected_number):
         self.failif(copied_number < expected_number,
@@ -14,13 +14,12 @@ Operational Summary
 
 import json
 import os
-from autotest.client import utils
 from dockertest.containers import DockerContainers
 from dockertest.dockercmd import DockerCmd
 from dockertest.output import mustpass
-from dockertest.images import DockerImage
 from dockertest.subtest import SubSubtest
 from dockertest.subtest import SubSubtestCaller
+from dockertest.subtestbase import Clipped
 from dockertest.xceptions import DockerTestError
 
 
@@ -106,15 +105,15 @@ class inspect_base(SubSubtest):
 
     @staticmethod
     def create_simple_container(subtest):
-        fin = DockerImage.full_name_from_defaults(subtest.config)
-        name = utils.generate_random_string(12)
-        subargs = ["--name=%s" % (name),
-                   fin,
-                   "/bin/bash",
-                   "-c",
-                   "'/bin/true'"]
-        nfdc = DockerCmd(subtest, 'run', subargs)
-        mustpass(nfdc.execute())
+        # Pre-created & started in the background, while other tests ran
+        pool = subtest.container_pool()
+        name = pool.acquire(command=["/bin/bash", "-c", "'/bin/true'"])
+        if not pool.start:
+            mustpass(DockerCmd(subtest, 'start', [name]).execute())
+        # As with 'docker run', /bin/true must have exited before inspecting
+        mustpass(DockerCmd(subtest, 'wait', [name]).execute())
+        # The pool removes these, once released by cleanup()
+        subtest.sub_stuff.setdefault('pooled', []).append(name)
         if not subtest.sub_stuff or not subtest.sub_stuff['containers']:
             subtest.sub_stuff['containers'] = [name]
         else:
@@ -123,9 +122,13 @@ class inspect_base(SubSubtest):
 
     def cleanup(self):
         super(inspect_base, self).cleanup()
+        pooled = self.sub_stuff.get('pooled', [])
+        for name in pooled:
+            self.container_pool().release(name)
         if self.config['remove_after_test']:
             dc = DockerContainers(self)
-            dc.clean_all(self.sub_stuff.get('containers', []))
+            dc.clean_all([name for name in self.sub_stuff.get('containers', [])
+                          if name not in pooled])
 
 
 class inspect_container_simple(inspect_base):
@@ -140,7 +143,7 @@ class inspect_container_simple(inspect_base):
         nfdc = DockerCmd(self, "inspect", subargs)
         self.sub_stuff['cmdresult'] = mustpass(nfdc.execute())
         # Log details when command is successful
-        self.logdebug(nfdc.cmdresult)
+        self.logdebug("%s", Clipped(nfdc.cmdresult))
 
     def postprocess(self):
         super(inspect_container_simple, self).postprocess()
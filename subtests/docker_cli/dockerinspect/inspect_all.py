@@ -13,6 +13,7 @@ import re
 from dockerinspect import inspect_base
 from dockertest.output import mustpass
 from dockertest.dockercmd import DockerCmd
+from dockertest.subtestbase import Clipped
 
 
 class inspect_all(inspect_base):
@@ -30,7 +31,7 @@ class inspect_all(inspect_base):
         nfdc = DockerCmd(self, "inspect", subargs)
         self.sub_stuff['cmdresult'] = mustpass(nfdc.execute())
         # Log details when command is successful
-        self.logdebug(nfdc.cmdresult)
+        self.logdebug("%s", Clipped(nfdc.cmdresult))
 
     def postprocess(self):
         super(inspect_all, self).postprocess()
@@ -12,6 +12,7 @@ from dockerinspect import inspect_base
 from dockertest.output import mustpass
 from dockertest.dockercmd import DockerCmd
 from dockertest.images import DockerImage
+from dockertest.subtestbase import Clipped
 from dockertest.xceptions import DockerTestError
 
 
@@ -28,7 +29,7 @@ class inspect_keys(inspect_base):
         nfdc = DockerCmd(self, "inspect", subargs)
         cmdresult = mustpass(nfdc.execute())
         # Log details when command is successful
-        self.logdebug(nfdc.cmdresult)
+        self.logdebug("%s", Clipped(nfdc.cmdresult))
         return self.parse_cli_output(cmdresult.stdout)
 
     def run_once(self):
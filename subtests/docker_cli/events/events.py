@@ -24,6 +24,7 @@ Prerequisites
 """
 
 import re
+import bisect
 from string import Template
 import time
 from dockertest.subtest import Subtest
@@ -46,27 +47,31 @@ regexes = {
 }
 
 
-def is_dupe_event(needle, haystack):
-    for event in haystack:
-        # Fastest comparison order
-        if (needle['datetime'] == event['datetime'] and
-                needle['source'] == event['source'] and
-                needle['operation'] == event['operation']):
-            return True
-    return False
+# eg <timestamp> container start <sha> (details)
+event_110_re = re.compile(r'^(?P<timestamp>{timestamp})'
+                          r'\s+(?P<object>\w+)'
+                          r'\s+(?P<operation>{operation})'
+                          r'\s+(?P<identifier>{cid}|{fqin})'
+                          r'\s+\((?P<rest>.*)\)'.format(**regexes))
+
+# eg <timestamp> <sha> (from <source>) start
+event_109_re = re.compile(r'^(?P<timestamp>{timestamp})'
+                          r'\s+(?P<identifier>{cid}|{fqin}):'
+                          r'(\s+\(from (?P<source>{source})\))?'
+                          r'\s+(?P<operation>{operation})'.format(**regexes))
+
+# TODO: (maybe): split out components of the parenthesized list.
+# If so, keep in mind that you can't just split on commas (because
+# of "Red Hat, Inc.") and that the fields are output in unpredictable
+# order: even two consecutive event lines will have different ordering.
+source_re = re.compile(r'(^|\s)image=(?P<image>\S+)(,|$)')
 
 
 def parse_event_docker_110(line):
     """
     Try to parse input as a docker 1.10 event
     """
-    # eg <timestamp> container start <sha> (details)
-    event_re = re.compile(r'^(?P<timestamp>{timestamp})'
-                          r'\s+(?P<object>\w+)'
-                          r'\s+(?P<operation>{operation})'
-                          r'\s+(?P<identifier>{cid}|{fqin})'
-                          r'\s+\((?P<rest>.*)\)'.format(**regexes))
-    mobj = event_re.match(line)
+    mobj = event_110_re.match(line)
     if mobj is None:
         return None
 
@@ -78,11 +83,6 @@ def parse_event_docker_110(line):
         'operation':  mobj.group('operation'),
         'source':     None,
     }
-    # TODO: (maybe): split out components of the parenthesized list.
-    # If so, keep in mind that you can't just split on commas (because
-    # of "Red Hat, Inc.") and that the fields are output in unpredictable
-    # order: even two consecutive event lines will have different ordering.
-    source_re = re.compile(r'(^|\s)image=(?P<image>\S+)(,|$)')
     mobj2 = source_re.search(mobj.group('rest'))
     if mobj2 is not None:
         details['source'] = mobj2.group('image')
@@ -93,12 +93,7 @@ def parse_event_docker_109(line):
     """
     Try to parse input as a docker < 1.10 event
     """
-    # eg <timestamp> <sha> (from <source>) start
-    event_re = re.compile(r'^(?P<timestamp>{timestamp})'
-                          r'\s+(?P<identifier>{cid}|{fqin}):'
-                          r'(\s+\(from (?P<source>{source})\))?'
-                          r'\s+(?P<operation>{operation})'.format(**regexes))
-    mobj = event_re.match(line)
+    mobj = event_109_re.match(line)
     if mobj is not None:
         return {
             'datetime':   DockerTime(mobj.group('timestamp')),
@@ -122,6 +117,24 @@ def parse_event(line):
     return details
 
 
+def check_slop(sloppy, slop, n_lines):
+    """
+    Raise DockerValueError if more than ``slop`` lines were unparseable
+
+    :param sloppy: List of unparseable lines
+    :param slop: number of unparseable lines to tolerate, None/- to disable
+    :param n_lines: Total number of lines parsed
+    """
+    if slop is not None and slop >= 0:
+        n_slop = len(sloppy)
+        if n_slop > slop:
+            raise DockerValueError("Excess slop (>%d) encountered after "
+                                   "parsing (%d) events (success on %d). "
+                                   " Garbage: %s"
+                                   % (slop, n_lines, n_lines - n_slop,
+                                      sloppy))
+
+
 def parse_events(lines, slop=None):
     """
     Return list of tuples for valid lines returned by parse_events()
@@ -140,17 +153,144 @@ def parse_events(lines, slop=None):
             result.append((cid_details['identifier'], cid_details))
         else:
             sloppy.append(line)
-        if slop is not None and slop >= 0:
-            n_slop = len(sloppy)
-            if n_slop > slop:
-                raise DockerValueError("Excess slop (>%d) encountered after "
-                                       "parsing (%d) events (success on %d). "
-                                       " Garbage: %s"
-                                       % (slop, n_lines, n_lines - n_slop,
-                                          sloppy))
+        check_slop(sloppy, slop, n_lines)
     return result
 
 
+class EventStore(object):
+
+    """
+    Incrementally parsed, de-duplicated, time-ordered events by CID/FQIN
+
+    :param previous: Optional, possibly overlapping prior ``by_id`` mapping
+                     (updated in-place).
+    """
+
+    #: Mapping of CID or FQIN to de-duplicated, time-ordered details list
+    by_id = None
+
+    #: List of unparseable lines, in order received
+    sloppy = None
+
+    #: Total number of complete lines fed through ``feed()``
+    n_lines = 0
+
+    def __init__(self, previous=None):
+        if previous is None:
+            previous = {}
+        self.by_id = previous
+        self.sloppy = []
+        # Per-id set of dedupe keys, and datetimes parallel to by_id lists
+        self._keys = {}
+        self._times = {}
+        # Incomplete trailing line, and amount of stream already consumed
+        self._partial = ''
+        self._offset = 0
+        for _id, details_list in previous.items():
+            details_list.sort(key=lambda details: details['datetime'])
+            self._keys[_id] = set(self.dedupe_key(details)
+                                  for details in details_list)
+            self._times[_id] = [details['datetime']
+                                for details in details_list]
+
+    def __contains__(self, _id):
+        return _id in self.by_id
+
+    def __getitem__(self, _id):
+        return self.by_id[_id]
+
+    @staticmethod
+    def dedupe_key(details):
+        """
+        Return hashable key identifying duplicate event ``details``
+        """
+        return (details['datetime'], details['source'], details['operation'])
+
+    def add(self, _id, details):
+        """
+        Insert ``details`` into time-order for ``_id`` unless a duplicate
+
+        :returns: True if details were added, False if it was a duplicate
+        """
+        keys = self._keys.get(_id)
+        if keys is None:
+            keys = self._keys[_id] = set()
+            self._times[_id] = []
+            self.by_id[_id] = []
+        key = self.dedupe_key(details)
+        if key in keys:
+            return False
+        keys.add(key)
+        times = self._times[_id]
+        # don't assume it belongs at end
+        index = bisect.bisect_right(times, details['datetime'])
+        times.insert(index, details['datetime'])
+        self.by_id[_id].insert(index, details)
+        return True
+
+    def extend(self, events_list):
+        """
+        Add each tuple(CID/FQIN, {DETAILS}) from ``events_list``
+        """
+        for _id, details in events_list:
+            self.add(_id, details)
+
+    def feed(self, text):
+        """
+        Parse all complete lines in ``text``, buffering any incomplete one
+
+        :returns: Number of new (non-duplicate) events added
+        """
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()  # '' when text ends with a newline
+        return self._parse_lines(lines)
+
+    def flush(self):
+        """
+        Parse any buffered incomplete line, as if the stream ended
+
+        :returns: Number of new (non-duplicate) events added
+        """
+        partial = self._partial
+        self._partial = ''
+        if partial.strip():
+            return self._parse_lines([partial])
+        return 0
+
+    def poll(self, async_cmd):
+        """
+        Parse only output added to ``async_cmd`` since the last poll
+
+        :param async_cmd: An executed AsyncDockerCmd instance
+        :returns: Number of new (non-duplicate) events added
+        """
+        stdout = async_cmd.stdout
+        if stdout is None:
+            return 0
+        new_text = stdout[self._offset:]
+        self._offset = len(stdout)
+        return self.feed(new_text)
+
+    def check_slop(self, slop):
+        """
+        Raise DockerValueError if more than ``slop`` lines were unparseable
+        """
+        check_slop(self.sloppy, slop, self.n_lines)
+
+    def _parse_lines(self, lines):
+        added = 0
+        for line in lines:
+            if not line.strip():
+                continue  # Not an event, but also not garbage
+            self.n_lines += 1
+            details = parse_event(line)
+            if details is None:
+                self.sloppy.append(line)
+            elif self.add(details['identifier'], details):
+                added += 1
+        return added
+
+
 def events_by_id(events_list, previous=None):
     """
     Return a dictionary, mapping of CID or FQIN to de-duplicated details list
@@ -159,20 +299,9 @@ def events_by_id(events_list, previous=None):
     :param previous: Possibly overlapping prior result from events_by_id()
     :returns: dict-like mapping CID/FQIN to de-duplicated event-details list
     """
-    if previous is None:
-        dct = {}
-    else:
-        dct = previous  # in-place update
-    for _id, details in events_list:
-        previous_events = dct.get(_id)
-        if previous_events is None:
-            previous_events = dct[_id] = []  # in-place update (below)
-        if not is_dupe_event(details, previous_events):
-            # don't assume it belongs at end
-            previous_events.append(details)
-            # using key is faster then custom compare function
-            previous_events.sort(key=lambda details: details['datetime'])
-    return dct  # possibly same as previous
+    store = EventStore(previous)
+    store.extend(events_list)
+    return store.by_id  # possibly same as previous
 
 
 class events(Subtest):
@@ -197,6 +326,8 @@ class events(Subtest):
         events_cmd = AsyncDockerCmd(self, 'events', ['--since=0'])
         self.stuff['events_cmd'] = events_cmd
         self.stuff['events_cmdresult'] = None
+        # Parsed incrementally while waiting, only new output each poll
+        self.stuff['event_store'] = EventStore()
         # These will be removed as expected events for cid are identified
         leftovers = self.config['expect_events'].strip().split(',')
         self.stuff['leftovers'] = leftovers
@@ -215,7 +346,7 @@ class events(Subtest):
             _json = dc.json_by_long_id(cid)
             if _json and _json[0]["State"]["Running"]:
                 self.loginfo("Waiting for test container to exit...")
-                time.sleep(3)
+                self.poll_events(3)
             else:
                 break
         if self.config['rm_after_run']:
@@ -229,23 +360,39 @@ class events(Subtest):
         # No way to know how long async events take to pass through :S
         self.loginfo("Sleeping %s seconds for events to catch up",
                      self.config['wait_stop'])
-        time.sleep(self.config['wait_stop'])
+        self.poll_events(self.config['wait_stop'])
         # Kill off docker events after 1 second
         events_cmd = self.stuff['events_cmd']
         self.stuff['events_cmdresult'] = events_cmd.wait(timeout=1)
+        # Pick up anything arriving after the last poll
+        self.stuff['event_store'].poll(events_cmd)
+        self.stuff['event_store'].flush()
+
+    def poll_events(self, duration, step=1.0):
+        """
+        Sleep ``duration`` seconds, parsing new events every ``step`` seconds
+        """
+        end_time = time.time() + duration
+        store = self.stuff['event_store']
+        events_cmd = self.stuff['events_cmd']
+        while True:
+            store.poll(events_cmd)
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(step, remaining))
 
     def postprocess(self):
         super(events, self).postprocess()
         stdout = self.stuff['events_cmdresult'].stdout.strip()
         # one-line (about) minimum
         self.failif(len(stdout) < 80, "Output too short: '%s'" % stdout)
-        all_events = parse_events(stdout)
-        cid_events = events_by_id(all_events)
+        store = self.stuff['event_store']
         cid = self.stuff['nfdc_cid']
-        self.failif(cid not in cid_events,
-                    'Test container cid %s does not appear in events %s'
-                    % (cid, cid_events))
-        test_events = cid_events[cid]
+        self.failif(cid not in store,
+                    'Test container cid %s does not appear in %d events'
+                    ' for %d ids' % (cid, store.n_lines, len(store.by_id)))
+        test_events = store[cid]
         for event in test_events:
             if event['operation'] in self.stuff['leftovers']:
                 self.stuff['leftovers'].remove(event['operation'])
@@ -256,8 +403,7 @@ class events(Subtest):
                     % (self.stuff['leftovers'], self.stuff['nfdc_cid']))
         self.loginfo("All expected events were located")
         # Fail test if too much unparseable garbage
-        all_events = parse_events(stdout,
-                                  self.config['unparseable_allowance'])
+        store.check_slop(self.config['unparseable_allowance'])
 
     def cleanup(self):
         super(events, self).cleanup()
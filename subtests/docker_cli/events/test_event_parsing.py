@@ -147,5 +147,57 @@ class TestEventParsing(TestCase):
         self.maxDiff = None
         self.assertEqual(actual, expect)
 
+    def test_store_dedupe_order(self):
+        """
+        EventStore drops duplicates and keeps per-id time order
+        """
+        t = ["2016-04-06T09:53:33.265109190-04:00",
+             "2016-04-06T09:53:38.048694595-04:00",
+             "2016-04-06T09:53:41.016729639-04:00"]
+        cid = ("39b75e2aef85774dc545acc9998f0c44"
+               "d0af5f1baf32617e8bc5ed5f998cc558")
+        source = "registry.access.redhat.com/rhel7/rhel:latest"
+        # Out of order, with a duplicate
+        event_log = ("{t[2]} {cid}: (from {source}) die\n"
+                     "{t[0]} {cid}: (from {source}) create\n"
+                     "{t[1]} {cid}: (from {source}) start\n"
+                     "{t[0]} {cid}: (from {source}) create\n"
+                     .format(**locals()))
+        store = events.EventStore()
+        self.assertEqual(store.feed(event_log), 3)
+        self.assertTrue(cid in store)
+        self.assertEqual([e['operation'] for e in store[cid]],
+                         ['create', 'start', 'die'])
+        self.assertEqual(store.n_lines, 4)
+        self.assertEqual(store.sloppy, [])
+        # Same result through the compatibility interface
+        by_id = events.events_by_id(events.parse_events(event_log))
+        self.assertEqual(by_id, store.by_id)
+
+    def test_store_incremental(self):
+        """
+        EventStore only parses complete, newly received lines
+        """
+        fqin = 'docker.io/stackbrew/centos:7'
+        line = "2016-04-05T15:46:35.284845995-04:00 %s: pull\n" % fqin
+        line2 = "2016-04-05T15:46:36.284845995-04:00 %s: tag\n" % fqin
+
+        class FakeAsync(object):
+            stdout = ''
+
+        fake = FakeAsync()
+        store = events.EventStore()
+        fake.stdout = line + line2[:20]
+        self.assertEqual(store.poll(fake), 1)
+        self.assertEqual(store.poll(fake), 0)
+        fake.stdout += line2[20:] + "garbage"
+        self.assertEqual(store.poll(fake), 1)
+        self.assertEqual(store.sloppy, [])
+        self.assertEqual(store.flush(), 0)
+        self.assertEqual(store.sloppy, ["garbage"])
+        self.assertEqual(len(store[fqin]), 2)
+        store.check_slop(1)
+        self.assertRaises(events.DockerValueError, store.check_slop, 0)
+
 if __name__ == '__main__':
     main()
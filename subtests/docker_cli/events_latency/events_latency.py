@@ -0,0 +1,329 @@
+r"""
+Summary
+---------
+
+Measure how quickly container events are delivered by ``docker events``
+
+Operational Summary
+----------------------
+
+#. Keep a ``docker events --format '{{json .}}'`` stream open throughout.
+#. Create, start, wait for and remove containers, recording the time
+   each command was issued.
+#. Match every ``create``, ``start``, ``die`` and ``destroy`` event to its
+   container, and record the seconds from issuing the command causing it
+   until it arrives, as well as from the event's own timestamp until it
+   arrives (``delivery``).
+#. Report percentiles, and any events never delivered, as keyvals and
+   in a ``<subsubtest>.json`` results file.
+
+Operational Detail
+----------------------
+
+Paced
+~~~~~~~
+
+Perform ``paced_cycles`` container life-cycles, started at a steady
+``paced_rate`` per second.  Fail if any event is dropped, or
+a ``thresholds`` limit is exceeded.
+
+Burst
+~~~~~~~
+
+For each ``burst_concurrency`` level, perform ``burst_cycles`` container
+life-cycles as fast as that many threads can.  Report the achieved event
+rate of each level, and the lowest rate at which events either lagged by
+more than ``max_delivery_lag`` seconds (p99) or were dropped.  Lagging is
+reported, not failed.
+
+Prerequisites
+---------------
+
+*  Docker supports ``docker events --format '{{json .}}'``
+*  The docker daemon runs on the local host, sharing it's clock.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dockertest.config import get_as_list
+from dockertest.containers import DockerContainers
+from dockertest.dockercmd import AsyncDockerCmd, DockerCmd
+from dockertest.images import DockerImage
+from dockertest.output import TimedLines
+from dockertest.performance import Samples, parse_thresholds
+from dockertest.subtest import SubSubtest, SubSubtestCaller
+from dockertest.xceptions import DockerTestNAError
+
+
+class events_latency(SubSubtestCaller):
+
+    """ Subtest caller """
+
+
+class EventArrivals(object):
+
+    """
+    Arrival and emission times of container events, by name and action
+
+    :param timed_lines: TimedLines instance receiving ``docker events``
+                        ``--format '{{json .}}'`` output
+    """
+
+    def __init__(self, timed_lines):
+        self.timed_lines = timed_lines
+        #: Number of lines already parsed
+        self.idx = 0
+        #: Number of lines which could not be parsed
+        self.unparseable = 0
+        #: Mapping of (container name, action) to (arrival, emission) times
+        self.times = {}
+
+    def parse(self, lines):
+        """Record first arrival of each event in (arrival time, line) list"""
+        for arrived, line in lines:
+            try:
+                event = json.loads(line)
+                name = event['Actor']['Attributes']['name']
+                key = (name, event['Action'])
+                emitted = event['timeNano'] / 1000000000.0
+            except (ValueError, KeyError, TypeError):
+                self.unparseable += 1
+                continue
+            self.times.setdefault(key, (arrived, emitted))
+        self.idx += len(lines)
+
+    def wait_for(self, keys, timeout):
+        """
+        Return set of (name, action) keys not arrived within timeout seconds
+
+        :param keys: Iterable of (name, action) tuples
+        :param timeout: Maximum seconds to wait for all keys
+        """
+        missing = set(keys)
+        deadline = time.time() + timeout
+        while True:
+            missing -= set(self.times)
+            remaining = deadline - time.time()
+            if not missing or remaining <= 0:
+                return missing
+            self.parse(self.timed_lines.wait_past(self.idx, remaining))
+
+
+class events_latency_base(SubSubtest):
+
+    """ Performs timestamped container actions, matching them to events """
+
+    #: Container event actions in life-cycle order
+    ACTIONS = ('create', 'start', 'die', 'destroy')
+
+    def initialize(self):
+        super(events_latency_base, self).initialize()
+        self.sub_stuff['dc'] = DockerContainers(self)
+        self.sub_stuff['fqin'] = DockerImage.full_name_from_defaults(
+            self.config)
+        self.sub_stuff['containers'] = []
+        # Mapping of (container name, action) to time command was issued
+        self.sub_stuff['issued'] = {}
+        # Names of containers with a failed life-cycle command
+        self.sub_stuff['failed'] = []
+        self.sub_stuff['results'] = OrderedDict()
+        self.sub_stuff['thresholds'] = parse_thresholds(
+            get_as_list(self.config['thresholds'] or ''))
+        timed_lines = TimedLines()
+        events_cmd = AsyncDockerCmd(self, 'events',
+                                    ['--format', "'{{json .}}'",
+                                     '--filter', 'type=container'])
+        events_cmd.stdout_tee = timed_lines
+        events_cmd.execute()
+        self.sub_stuff['events_cmd'] = events_cmd
+        self.sub_stuff['arrivals'] = EventArrivals(timed_lines)
+        # Stream has no output until the first event, make sure it's live
+        name = self.new_name()
+        self.lifecycle(name)
+        if self.sub_stuff['arrivals'].wait_for(self.keys([name]),
+                                               self.config['event_timeout']):
+            raise DockerTestNAError("No JSON formatted events received "
+                                    "from %s" % events_cmd.command)
+
+    def new_name(self):
+        """Return new unique container name, registered for cleanup"""
+        name = self.sub_stuff['dc'].get_unique_name()
+        self.sub_stuff['containers'].append(name)
+        return name
+
+    def keys(self, names):
+        """Return list of expected (name, action) event keys for names"""
+        return [(name, action) for name in names for action in self.ACTIONS]
+
+    def docker(self, subcmd, subargs):
+        """Return True if docker subcmd with subargs exits zero"""
+        dkrcmd = DockerCmd(self, subcmd, subargs)
+        dkrcmd.quiet = True
+        dkrcmd.verbose = False
+        return dkrcmd.execute().exit_status == 0
+
+    def lifecycle(self, name):
+        """Create, start, wait for and remove container, timing each step"""
+        issued = self.sub_stuff['issued']
+        issued[(name, 'create')] = time.time()
+        steps = [('create', ['--name', name, self.sub_stuff['fqin'],
+                             '/bin/true']),
+                 ('start', [name]),
+                 ('wait', [name]),
+                 ('rm', [name])]
+        for subcmd, subargs in steps:
+            if subcmd == 'start':
+                issued[(name, 'start')] = issued[(name, 'die')] = time.time()
+            elif subcmd == 'rm':
+                issued[(name, 'destroy')] = time.time()
+            if not self.docker(subcmd, subargs):
+                self.sub_stuff['failed'].append(name)
+                return False
+        return True
+
+    def measure(self, names):
+        """
+        Return Samples, and count of dropped events, for names' life-cycles
+
+        :param names: List of container names with completed life-cycles
+        """
+        arrivals = self.sub_stuff['arrivals']
+        issued = self.sub_stuff['issued']
+        keys = self.keys(names)
+        dropped = arrivals.wait_for(keys, self.config['event_timeout'])
+        samples = Samples()
+        for key in keys:
+            if key in dropped:
+                continue
+            arrived, emitted = arrivals.times[key]
+            samples.add(key[1], arrived - issued[key])
+            samples.add('delivery', arrived - emitted)
+        return samples, len(dropped)
+
+    def write_results(self):
+        """Write results as keyvals and JSON file, named after this class"""
+        name = self.__class__.__name__
+        keyvals = {'%s_unparseable' % name:
+                   self.sub_stuff['arrivals'].unparseable,
+                   '%s_failed' % name: len(self.sub_stuff['failed'])}
+        for label, result in self.sub_stuff['results'].iteritems():
+            prefix = '%s_%s' % (name, label)
+            for phase, stats in result['summary'].iteritems():
+                for stat, value in stats.iteritems():
+                    keyvals['%s_%s_%s' % (prefix, phase, stat)] = value
+            for key in ('dropped', 'events_per_sec'):
+                if key in result:
+                    keyvals['%s_%s' % (prefix, key)] = result[key]
+        self.parent_subtest.write_test_keyval(keyvals)
+        results = os.path.join(self.parent_subtest.resultsdir,
+                               '%s.json' % name)
+        with open(results, 'wb') as results_file:
+            json.dump(self.sub_stuff['results'], results_file, indent=2)
+
+    def postprocess(self):
+        super(events_latency_base, self).postprocess()
+        self.write_results()
+        self.failif(self.sub_stuff['failed'],
+                    "Container life-cycles failed: %s"
+                    % self.sub_stuff['failed'])
+
+    def cleanup(self):
+        super(events_latency_base, self).cleanup()
+        if self.sub_stuff.get('events_cmd') is not None:
+            self.sub_stuff['events_cmd'].wait(timeout=1)
+        if self.config['remove_after_test']:
+            self.sub_stuff['dc'].clean_all(self.sub_stuff['containers'])
+
+
+class paced(events_latency_base):
+
+    """ Life-cycles started at a steady rate """
+
+    def run_once(self):
+        super(paced, self).run_once()
+        interval = 1.0 / self.config['paced_rate']
+        self.loginfo("Performing %d container life-cycles, %s per second",
+                     self.config['paced_cycles'], self.config['paced_rate'])
+        names = []
+        start = time.time()
+        for number in xrange(self.config['paced_cycles']):
+            delay = start + number * interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            name = self.new_name()
+            if self.lifecycle(name):
+                names.append(name)
+        samples, dropped = self.measure(names)
+        label = 'rate_%s' % self.config['paced_rate']
+        self.sub_stuff['results'][label] = samples.as_dict(dropped=dropped)
+        self.sub_stuff['samples'] = samples
+
+    def postprocess(self):
+        super(paced, self).postprocess()
+        for result in self.sub_stuff['results'].values():
+            self.failif(result['dropped'], "%d events were never delivered"
+                        % result['dropped'])
+        exceeded = self.sub_stuff['samples'].exceeded(
+            self.sub_stuff['thresholds'])
+        self.failif(exceeded, "; ".join(exceeded))
+
+
+class burst(events_latency_base):
+
+    """ Life-cycles as fast as possible, at increasing concurrency """
+
+    def run_level(self, concurrency):
+        """Return results dictionary from burst with concurrency threads"""
+        cycles = self.config['burst_cycles']
+        names = [self.new_name() for _ in xrange(cycles)]
+        completed = []
+
+        def worker(my_names):
+            for name in my_names:
+                if self.lifecycle(name):
+                    completed.append(name)
+
+        threads = [threading.Thread(target=worker,
+                                    args=(names[number::concurrency],))
+                   for number in xrange(concurrency)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+        samples, dropped = self.measure(completed)
+        return samples.as_dict(
+            events_per_sec=len(completed) * len(self.ACTIONS) / elapsed,
+            dropped=dropped)
+
+    def run_once(self):
+        super(burst, self).run_once()
+        results = self.sub_stuff['results']
+        for concurrency in get_as_list(str(self.config['burst_concurrency'])):
+            self.loginfo("Bursting %d container life-cycles from %s threads",
+                         self.config['burst_cycles'], concurrency)
+            result = self.run_level(int(concurrency))
+            self.loginfo("%0.2f events/sec, %d dropped",
+                         result['events_per_sec'], result['dropped'])
+            results['concurrency_%s' % concurrency] = result
+
+    def postprocess(self):
+        onset = None
+        for result in self.sub_stuff['results'].values():
+            lag = result['summary'].get('delivery', {}).get('p99')
+            if (result['dropped'] or lag is None or
+                    lag > self.config['max_delivery_lag']):
+                onset = result['events_per_sec']
+                break
+        if onset is None:
+            self.loginfo("Events kept up at all burst rates")
+        else:
+            self.logwarning("Events lagged or dropped at %0.2f events/sec",
+                            onset)
+            self.parent_subtest.write_test_keyval(
+                {'burst_lag_onset_events_per_sec': onset})
+        super(burst, self).postprocess()
@@ -18,7 +18,6 @@ from autotest.client import utils
 from dockertest.subtest import SubSubtest
 from dockertest.images import DockerImages
 from dockertest.images import DockerImage
-from dockertest.containers import DockerContainers
 from dockertest.output import OutputGood
 from dockertest.dockercmd import AsyncDockerCmd, DockerCmd
 from dockertest import subtest
@@ -112,11 +111,9 @@ class history_base(SubSubtest):
 
     def cleanup(self):
         super(history_base, self).cleanup()
-        if self.config['remove_after_test']:
-            dc = DockerContainers(self)
-            dc.clean_all(self.sub_stuff.get("containers"))
-            di = DockerImages(self)
-            di.clean_all(self.sub_stuff.get("images"))
+        # Removed in bulk by parent, unless remove_after_test is false
+        self.defer_cleanup('container', *self.sub_stuff.get("containers", []))
+        self.defer_cleanup('image', *self.sub_stuff.get("images", []))
 
     def create_image(self, old_name, new_name, cmd):
         prep_changes = DockerCmd(self, "run",
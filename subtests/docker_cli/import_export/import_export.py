@@ -11,14 +11,38 @@ Operational Summary
 #. Export image to stdout
 #. Import image from stdin.
 #. Check image.
+
+Operational Detail
+----------------------
+
+Streaming
+~~~~~~~~~~~
+
+Not run by default, add ``streaming`` to ``subsubtests`` to enable it.
+
+#. Create (but don't start) a container from the default image, and
+   every locally present ``stream_images`` image.
+#. For each container, ``stream_repeats`` times:
+
+   #. Time ``docker export -o`` into a file, then ``docker import``
+      from it.
+   #. Time ``docker export`` piped directly into ``docker import``.
+
+#. Report durations and MB/s (of the median duration) as keyvals and
+   in ``import_export_streaming.json``.  No network access is required.
 """
 
+import os
+from collections import OrderedDict
+from dockertest.config import get_as_list
+from dockertest.performance import Samples, present_images
+from dockertest.performance import report_transfers, transfer_result
 from dockertest.subtest import SubSubtest
 from dockertest.containers import DockerContainers
 from dockertest.images import DockerImages
 from dockertest.images import DockerImage
 from dockertest.output import OutputGood
-from dockertest.dockercmd import DockerCmd
+from dockertest.dockercmd import DockerCmd, PipedDockerCmd
 from dockertest.output import mustpass
 from dockertest import xceptions
 from dockertest import subtest
@@ -105,3 +129,61 @@ class simple(import_export_base):
         self.failif_ne(cmdresult.exit_status, 0,
                        "Problem with export import cmd detail :%s" %
                        cmdresult)
+
+
+class streaming(import_export_base):
+
+    """ Compare export/import throughput through a pipe and through a file """
+
+    def initialize(self):
+        super(streaming, self).initialize()
+        di = DockerImages(self)
+        self.sub_stuff['fqins'] = present_images(
+            self, di, get_as_list(self.config['stream_images']))
+        self.sub_stuff['results'] = OrderedDict()
+
+    def new_image_name(self):
+        """Return a new unique image name, registered for cleanup"""
+        name = DockerImages(self).get_unique_name('streaming')
+        self.sub_stuff['images'].append(name)
+        return name
+
+    def timed(self, samples, phase, subcmd, subargs, piped=False):
+        """Execute docker subcmd with subargs, recording duration in phase"""
+        if piped:  # Either end of the pipe failing fails the command
+            dkrcmd_class = PipedDockerCmd
+        else:
+            dkrcmd_class = DockerCmd
+        timeout = self.config['docker_import_export_timeout']
+        dkrcmd = dkrcmd_class(self, subcmd, subargs, timeout=timeout)
+        samples.add(phase, mustpass(dkrcmd.execute()).duration)
+
+    def run_once(self):
+        super(streaming, self).run_once()
+        archive = os.path.join(self.tmpdir, 'container.tar')
+        for fqin in self.sub_stuff['fqins']:
+            self.loginfo("Measuring export/import of %s container", fqin)
+            name = self.sub_stuff['cont'].get_unique_name()
+            self.sub_stuff['containers'].append(name)
+            mustpass(DockerCmd(self, 'create',
+                               ['--name', name, fqin, '/bin/true']).execute())
+            samples = Samples()
+            for _ in xrange(self.config['stream_repeats']):
+                self.timed(samples, 'export_disk', 'export',
+                           ['-o', archive, name])
+                self.timed(samples, 'import_disk', 'import',
+                           ['-', self.new_image_name(), '<', archive])
+                import_command = DockerCmd(self, 'import',
+                                           ['-', self.new_image_name()])
+                self.timed(samples, 'export_import_pipe', 'export',
+                           [name, '|', import_command.command],
+                           piped=True)
+            size = os.path.getsize(archive)
+            os.unlink(archive)
+            self.sub_stuff['results'][fqin] = transfer_result(samples,
+                                                              size)
+
+    def postprocess(self):
+        super(streaming, self).postprocess()
+        report_transfers(self, self.sub_stuff['results'],
+                         'import_export_streaming.json')
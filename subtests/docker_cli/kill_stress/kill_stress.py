@@ -10,22 +10,109 @@ Operational Summary
 1. start container with test command
 2. execute ``docker kill`` (or kill $PID) for each signal in
    ``signals_sequence`` one after another without delay (using bash for loop)
-3. analyze results
+3. wait for the handler output of every signal to arrive, recording
+   the latency from issuing each signal to its output
+4. analyze results
 """
+import collections
 import os
 import time
 
 from autotest.client import utils
 from dockertest import xceptions, subtest
 from dockertest.dockercmd import DockerCmd
+from dockertest.output import TimedLines
 from kill_utils import kill_base, SIGNAL_MAP, Output
 
 
+#: Map signal names back to (string) numbers
+SIGNAL_NUMBERS = dict((name, str(number))
+                      for number, name in SIGNAL_MAP.items())
+
+
 class kill_stress(subtest.SubSubtestCaller):
 
     """ Subtest caller """
 
 
+class SignalVerifier(object):
+
+    """
+    Counts down expected signal-handler output lines as they arrive
+
+    :param check: Format string of handler output line for each signal
+    :param signals: Iterable of signals expected to be handled (once each)
+    :param container_lines: TimedLines instance receiving container output
+    """
+
+    #: Prefix of kill loop output lines, echoed just before each kill
+    ISSUED_PREFIX = "KILL "
+
+    def __init__(self, check, signals, container_lines):
+        self.container_lines = container_lines
+        # Only output arriving after this point is considered
+        self.idx = len(container_lines.lines)
+        # Expected handler output line -> signal number it represents
+        self.line_signals = dict((check % sig, str(sig)) for sig in signals)
+        self.missing = collections.Counter(self.line_signals.keys())
+        # signal -> time first issued / seconds from then until handled
+        self.issued = {}
+        self.latencies = {}
+
+    def record_issued(self, kill_lines):
+        """
+        Record first issue time of each signal from kill loop output
+
+        :param kill_lines: List of tuple(arrival time, line)
+        """
+        for when, line in kill_lines:
+            if not line.startswith(self.ISSUED_PREFIX):
+                continue  # e.g. container name from docker kill
+            signal = line[len(self.ISSUED_PREFIX):].strip()
+            signal = SIGNAL_NUMBERS.get(signal, signal)
+            self.issued.setdefault(signal, when)
+
+    def consume(self, lines):
+        """
+        Count down expected lines, and record latency of each one found
+
+        :param lines: List of tuple(arrival time, line) not yet consumed
+        """
+        for when, line in lines:
+            self.idx += 1
+            if self.missing[line] < 1:
+                continue  # Not expected, or already seen
+            self.missing[line] -= 1
+            if self.missing[line] < 1:
+                del self.missing[line]
+            signal = self.line_signals[line]
+            if signal in self.issued and signal not in self.latencies:
+                self.latencies[signal] = when - self.issued[signal]
+
+    def wait(self, timeout):
+        """
+        Consume new output until nothing is missing, or timeout expires
+
+        :returns: True if all expected lines were found
+        """
+        endtime = time.time() + timeout
+        while True:
+            remaining = max(endtime - time.time(), 0)
+            # Sleeps until new output arrives, no polling
+            self.consume(self.container_lines.wait_past(self.idx, remaining))
+            if not self.missing or time.time() >= endtime:
+                break
+        return not self.missing
+
+    def first_missing(self):
+        """
+        Return one expected line not (yet) found, or None
+        """
+        if self.missing:
+            return sorted(self.missing.keys())[0]
+        return None
+
+
 class stress(kill_base):
 
     """
@@ -88,8 +175,10 @@ class stress(kill_base):
             cmd = "kill -$SIGNAL %s" % pid
         else:
             cmd = DockerCmd(self, 'kill', subargs).command
-        cmd = ("for SIGNAL in %s; do %s || exit 255; done"
-               % (" ".join(signals_sequence), cmd))
+        # Echo (a shell builtin) marks when each kill is issued
+        cmd = ('for SIGNAL in %s; do echo "%s$SIGNAL"; %s || exit 255; done'
+               % (" ".join(signals_sequence), SignalVerifier.ISSUED_PREFIX,
+                  cmd))
         self.sub_stuff['kill_cmds'] = [cmd]
         # kill -9
         if sigproxy:
@@ -102,6 +191,11 @@ class stress(kill_base):
         self.logdebug("kill_command: %s", cmd)
         self.logdebug("signals_sequence: %s", " ".join(sequence))
 
+    def initialize(self):
+        # Container output must be recorded from the very start
+        self.stdout_tee = TimedLines()
+        super(stress, self).initialize()
+
     def run_once(self):
         # Execute the kill command
         kill_base.run_once(self)
@@ -110,22 +204,16 @@ class stress(kill_base):
         signals_set = self.sub_stuff['signals_set']
         timeout = self.config['stress_cmd_timeout']
         _check = self.config['check_stdout']
+        verifier = SignalVerifier(_check, signals_set, self.stdout_tee)
+        kill_lines = TimedLines()
         self.sub_stuff['kill_results'] = [utils.run(kill_cmds[0],
-                                                    verbose=True)]
-        endtime = time.time() + timeout
-        line = None
-        out = None
-        while endtime > time.time():
-            try:
-                out = container_cmd.stdout.splitlines()
-                for line in [_check % sig for sig in signals_set]:
-                    out.remove(line)
-                break
-            except ValueError:
-                pass
-        else:
+                                                    verbose=True,
+                                                    stdout_tee=kill_lines)]
+        verifier.record_issued(kill_lines.lines)
+        if not verifier.wait(timeout):
             self.fail_missing(_check, signals_set, Output(container_cmd, 0),
-                              line)
+                              verifier.first_missing())
+        self.report_latencies(verifier.latencies)
         # Kill -9
         if kill_cmds[1] is not False:   # Custom kill command
             self.sub_stuff['kill_results'].append(kill_cmds[1].execute())
@@ -141,6 +229,27 @@ class stress(kill_base):
                                            "was executed.")
         self.sub_stuff['container_results'] = container_cmd.wait()
 
+    def report_latencies(self, latencies):
+        """
+        Log and record seconds from kill issued to handler output per signal
+        """
+        if not latencies:
+            return
+        name = self.__class__.__name__
+        keyvals = {}
+        for signal in sorted(latencies, key=int):
+            self.logdebug("Signal %s handled %0.4f seconds after first kill",
+                          signal, latencies[signal])
+            keyvals['%s_signal_%s_latency' % (name, signal)] = (
+                latencies[signal])
+        values = latencies.values()
+        keyvals['%s_latency_max' % name] = max(values)
+        keyvals['%s_latency_mean' % name] = sum(values) / len(values)
+        self.loginfo("Signal handling latency: max %0.4f, mean %0.4f seconds",
+                     keyvals['%s_latency_max' % name],
+                     keyvals['%s_latency_mean' % name])
+        self.parent_subtest.write_test_keyval(keyvals)
+
 
 class stress_ttyoff(stress):
 
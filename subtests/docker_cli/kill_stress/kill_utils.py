@@ -61,6 +61,9 @@ class kill_base(subtest.SubSubtest):
     # By default use tty. In the end generate the same class without tty
     tty = True
 
+    #: Optional file-like object receiving container output as it arrives
+    stdout_tee = None
+
     def _init_container_normal(self, name):
         """
         Starts container
@@ -81,6 +84,7 @@ class kill_base(subtest.SubSubtest):
         subargs.append("-c")
         subargs.append(self.config['exec_cmd'])
         container = AsyncDockerCmd(self, 'run', subargs)
+        container.stdout_tee = self.stdout_tee
         self.sub_stuff['container_cmd'] = container
         container.execute()
 
@@ -114,6 +118,7 @@ class kill_base(subtest.SubSubtest):
             subargs = []
         subargs.append(name)
         c_attach = AsyncDockerCmd(self, 'attach', subargs)
+        c_attach.stdout_tee = self.stdout_tee
         self.sub_stuff['container_cmd'] = c_attach  # overwrites finished cmd
         c_attach.execute()
 
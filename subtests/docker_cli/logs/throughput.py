@@ -0,0 +1,215 @@
+"""
+#. Determine which of the configured ``log_drivers`` are available
+#. For each driver, run a container emitting ``log_mb`` of fixed-size lines
+#. Stream the entire ``docker logs`` output, measuring retrieval rate
+#. Time ``docker logs --tail`` retrieving the last ``tail_lines`` lines
+#. Run a container emitting timestamps, measuring the delivery lag of
+   each line through ``docker logs --follow``
+#. Report results as keyvals and in ``logs_throughput.json``
+"""
+
+import json
+import os
+import select
+import subprocess
+import time
+from collections import OrderedDict
+from dockertest import tracer
+from dockertest.config import get_as_list
+from dockertest.dockercmd import DockerCmd
+from dockertest.images import DockerImage
+from dockertest.output import mustpass
+from dockertest.performance import Samples
+from logs import Base
+
+
+class throughput(Base):
+
+    #: Size of each read from the ``docker logs`` output stream
+    READ_SIZE = 65536
+
+    def initialize(self):
+        super(throughput, self).initialize()
+        self.sub_stuff['fqin'] = DockerImage.full_name_from_defaults(
+            self.config)
+        self.sub_stuff['drivers'] = self.available_drivers()
+        self.failif(not self.sub_stuff['drivers'],
+                    "None of log_drivers '%s' are available"
+                    % self.config['log_drivers'])
+        self.sub_stuff['results'] = OrderedDict()
+
+    def available_drivers(self):
+        """Return configured log drivers, reported available by the daemon"""
+        drivers = get_as_list(self.config['log_drivers'])
+        subargs = ['--format', '"{{json .Plugins.Log}}"']
+        cmdresult = DockerCmd(self, 'info', subargs).execute()
+        try:
+            plugins = json.loads(cmdresult.stdout)
+        except ValueError:
+            self.logwarning("Unable to list daemon's log drivers, "
+                            "assuming all of %s are available", drivers)
+            return drivers
+        for driver in set(drivers) - set(plugins):
+            self.logwarning("Skipping unavailable log driver %s", driver)
+        return [driver for driver in drivers if driver in plugins]
+
+    def run_cntnr(self, driver, command):
+        """
+        Return name of started container running command, logging to driver
+
+        :param driver: Name of log driver for container
+        :param command: Complete, quoted command string for container
+        """
+        name = self.sub_stuff['dc'].get_unique_name()
+        self.sub_stuff['cntnr_names'].append(name)
+        subargs = ['--name', name, '--log-driver', driver,
+                   self.sub_stuff['fqin'], command]
+        mustpass(DockerCmd(self, 'create', subargs).execute())
+        mustpass(DockerCmd(self, 'start', [name]).execute())
+        return name
+
+    def stream(self, subargs, consume, timeout):
+        """
+        Pass every chunk of ``docker logs`` stdout to consume, as it arrives
+
+        :param subargs: List of arguments to ``docker logs``
+        :param consume: Callable passed each chunk, returning nothing
+        :param timeout: Seconds before the command is killed
+        """
+        # Never holds more than READ_SIZE of stdout, unlike a CmdResult
+        command = DockerCmd(self, 'logs', subargs).command
+        start = time.time()
+        deadline = start + timeout
+        proc = subprocess.Popen(command, shell=True, close_fds=True,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        readers = [proc.stdout, proc.stderr]
+        stdout_bytes = 0
+        stderr = ''
+        try:
+            while readers and time.time() < deadline:
+                readable = select.select(readers, [], [],
+                                         max(0, deadline - time.time()))[0]
+                for reader in readable:
+                    chunk = os.read(reader.fileno(), self.READ_SIZE)
+                    if not chunk:
+                        readers.remove(reader)
+                    elif reader is proc.stdout:
+                        stdout_bytes += len(chunk)
+                        consume(chunk)
+                    else:
+                        stderr += chunk
+        finally:
+            if readers:  # Timed out, or consume() raised
+                proc.kill()
+            exit_status = proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+            tracer.record(self, 'logs', command, start,
+                          exit_status=exit_status, stdout_bytes=stdout_bytes,
+                          stderr_bytes=len(stderr))
+        self.failif(readers, "%s timed out after %s seconds"
+                    % (command, timeout))
+        self.failif(exit_status != 0, "%s failed with exit status %s: %s"
+                    % (command, exit_status, stderr))
+
+    def measure_retrieval(self, driver, samples, result):
+        """Generate large volume of logs, time full and tail retrieval"""
+        line_bytes = self.config['line_bytes']
+        lines = self.config['log_mb'] * 1024 * 1024 / line_bytes
+        command = ("sh -c 'yes %s | head -n %d'"
+                   % ('x' * (line_bytes - 1), lines))
+        start = time.time()
+        name = self.run_cntnr(driver, command)
+        wait = DockerCmd(self, 'wait', [name],
+                         timeout=self.config['logs_timeout'])
+        mustpass(wait.execute())
+        result['generate_seconds'] = time.time() - start
+        counted = {'bytes': 0, 'lines': 0}
+
+        def count(chunk):
+            counted['bytes'] += len(chunk)
+            counted['lines'] += chunk.count('\n')
+
+        start = time.time()
+        self.stream([name], count, self.config['logs_timeout'])
+        elapsed = time.time() - start
+        result['retrieve_seconds'] = elapsed
+        result['retrieve_mb_per_sec'] = counted['bytes'] / elapsed / 1048576
+        result['lines_expected'] = lines
+        result['lines_lost'] = lines - counted['lines']
+        tail_lines = self.config['tail_lines']
+        for _ in xrange(self.config['tail_repeats']):
+            dkrcmd = DockerCmd(self, 'logs', ['--tail', str(tail_lines), name])
+            dkrcmd.quiet = True
+            cmdresult = mustpass(dkrcmd.execute())
+            self.failif_ne(cmdresult.stdout.count('\n'), tail_lines,
+                           "Number of lines from %s" % dkrcmd.command)
+            samples.add('tail', cmdresult.duration)
+
+    def measure_follow(self, driver, samples):
+        """Record delivery lag of timestamped lines through --follow"""
+        command = ("sh -c 'for i in $(seq %d); do date +%%s.%%N; sleep %s; "
+                   "done'" % (self.config['follow_lines'],
+                              self.config['follow_interval']))
+        name = self.run_cntnr(driver, command)
+        buffered = {'partial': '', 'first': None}
+
+        def lag(chunk):
+            arrived = time.time()
+            lines = (buffered['partial'] + chunk).split('\n')
+            buffered['partial'] = lines.pop()
+            for line in lines:
+                try:
+                    stamp = float(line)
+                except ValueError:
+                    continue
+                if buffered['first'] is None:
+                    buffered['first'] = arrived
+                # Lines logged before following began are only replayed
+                if stamp >= buffered['first']:
+                    samples.add('follow_lag', arrived - stamp)
+
+        self.stream(['--follow', name], lag, self.config['logs_timeout'])
+
+    def run_once(self):
+        super(throughput, self).run_once()
+        for driver in self.sub_stuff['drivers']:
+            self.loginfo("Measuring %s log driver with %s MB of logs",
+                         driver, self.config['log_mb'])
+            samples = Samples()
+            result = OrderedDict()
+            self.measure_retrieval(driver, samples, result)
+            self.measure_follow(driver, samples)
+            result.update(samples.as_dict())
+            self.sub_stuff['results'][driver] = result
+
+    def postprocess(self):
+        super(throughput, self).postprocess()
+        keyvals = {}
+        for driver, result in self.sub_stuff['results'].iteritems():
+            prefix = 'throughput_%s' % driver.replace('-', '_')
+            self.loginfo("%s: %0.2f MB/s retrieval, %d lines lost", driver,
+                         result['retrieve_mb_per_sec'], result['lines_lost'])
+            for key in ('generate_seconds', 'retrieve_seconds',
+                        'retrieve_mb_per_sec', 'lines_lost'):
+                keyvals['%s_%s' % (prefix, key)] = result[key]
+            for phase, stats in result['summary'].iteritems():
+                for stat, value in stats.iteritems():
+                    keyvals['%s_%s_%s' % (prefix, phase, stat)] = value
+        self.parent_subtest.write_test_keyval(keyvals)
+        with open(os.path.join(self.parent_subtest.resultsdir,
+                               'logs_throughput.json'), 'wb') as results:
+            json.dump({'image': self.sub_stuff['fqin'],
+                       'log_mb': self.config['log_mb'],
+                       'line_bytes': self.config['line_bytes'],
+                       'drivers': self.sub_stuff['results']},
+                      results, indent=2)
+        for driver, result in self.sub_stuff['results'].iteritems():
+            self.failif(result['lines_lost'] > self.config['max_lines_lost'],
+                        "%s log driver lost %d of %d lines"
+                        % (driver, result['lines_lost'],
+                           result['lines_expected']))
+            self.failif('follow_lag' not in result['samples'],
+                        "No lines delivered live by %s logs --follow"
+                        % driver)
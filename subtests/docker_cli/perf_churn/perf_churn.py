@@ -0,0 +1,195 @@
+r"""
+Summary
+---------
+
+Measure how container churn throughput scales with concurrent clients
+
+Operational Summary
+----------------------
+
+#. For each ``concurrency`` level, start that many worker threads.
+#. Every worker loops ``docker create``, ``start``, ``wait`` and ``rm``
+   of a container from the default image, until ``duration`` expires.
+#. Meanwhile, sample the docker daemon's RSS and open fd count.
+#. Report the sustained cycles per second, error rate, cycle latency
+   percentiles and daemon resource usage of each level as test keyvals,
+   and into a ``perf_churn.json`` results file.
+#. Fail if the error rate of any level exceeds ``max_error_rate``.
+
+Prerequisites
+---------------
+
+*  The docker daemon runs on the local host, under systemd
+*  Enough resources to run the largest ``concurrency`` level
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from autotest.client.shared import error
+from dockertest import subtest
+from dockertest import docker_daemon
+from dockertest.config import get_as_list
+from dockertest.containers import DockerContainers
+from dockertest.dockercmd import DockerCmd
+from dockertest.images import DockerImage
+from dockertest.performance import Samples, ResourceSampler
+
+
+class ChurnWorker(threading.Thread):
+
+    """
+    Loops create/start/wait/rm cycles of uniquely named containers
+
+    :param subtest: Subtest instance to run docker commands on behalf of
+    :param prefix: Unique container name prefix for this worker
+    :param deadline: ``time.time()`` value after which no cycle begins
+    """
+
+    #: Docker subcommands making up one cycle, all but create take the name
+    SUBCOMMANDS = ('create', 'start', 'wait', 'rm')
+
+    def __init__(self, subtest, prefix, deadline):
+        super(ChurnWorker, self).__init__(name=prefix)
+        self.daemon = True
+        self.subtest = subtest
+        self.prefix = prefix
+        self.deadline = deadline
+        #: Seconds taken by each successful cycle
+        self.latencies = []
+        #: Number of cycles which failed
+        self.errors = 0
+        #: Names of containers which may not have been removed
+        self.leftovers = []
+        #: Unexpected exception raised by run(), if any.  Failed or
+        #: timed-out docker commands are counted in ``errors`` instead.
+        self.exception = None
+
+    def docker(self, subcmd, subargs):
+        """Return True if docker subcmd with subargs exits zero in time"""
+        dkrcmd = DockerCmd(self.subtest, subcmd, subargs,
+                           timeout=self.subtest.config['cmd_timeout'])
+        dkrcmd.quiet = True
+        dkrcmd.verbose = False
+        try:
+            return dkrcmd.execute().exit_status == 0
+        except error.CmdError, xcept:
+            # e.g. cmd_timeout expired, only this cycle failed
+            self.subtest.logdebug("%s: %s", self.name, xcept)
+            return False
+
+    def cycle(self, name):
+        """Return True if all cycle commands on container name succeeded"""
+        create_args = ['--name', name, self.subtest.stuff['fqin'],
+                       self.subtest.config['run_cmd']]
+        if not self.docker('create', create_args):
+            return False
+        for subcmd in self.SUBCOMMANDS[1:]:
+            if not self.docker(subcmd, [name]):
+                return False
+        return True
+
+    def run(self):
+        count = 0
+        try:
+            while time.time() < self.deadline:
+                name = '%s_%d' % (self.prefix, count)
+                count += 1
+                self.leftovers.append(name)
+                start = time.time()
+                if self.cycle(name):
+                    self.latencies.append(time.time() - start)
+                    self.leftovers.pop()
+                else:
+                    self.errors += 1
+        except Exception, xcept:  # pylint: disable=W0703
+            self.exception = xcept
+
+
+class perf_churn(subtest.Subtest):
+
+    def initialize(self):
+        super(perf_churn, self).initialize()
+        self.stuff['dc'] = DockerContainers(self)
+        self.stuff['fqin'] = DockerImage.full_name_from_defaults(self.config)
+        self.stuff['levels'] = [int(level) for level in
+                                get_as_list(str(self.config['concurrency']))]
+        self.stuff['daemon_pid'] = docker_daemon.pid()
+        self.stuff['leftovers'] = []
+        self.stuff['results'] = OrderedDict()
+
+    def run_once(self):
+        super(perf_churn, self).run_once()
+        for level in self.stuff['levels']:
+            self.stuff['results'][level] = self.run_level(level)
+
+    def run_level(self, level):
+        """Return results dictionary from running ``level`` workers"""
+        duration = self.config['duration']
+        self.loginfo("Churning containers with %d workers for %s seconds",
+                     level, duration)
+        prefix = self.stuff['dc'].get_unique_name()
+        sampler = ResourceSampler(self.stuff['daemon_pid'],
+                                  self.config['sample_interval'])
+        sampler.start()
+        start = time.time()
+        workers = [ChurnWorker(self, '%s_%d' % (prefix, number),
+                               start + duration)
+                   for number in xrange(level)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.time() - start
+        daemon = sampler.stop()
+        latencies = Samples()
+        errors = 0
+        for worker in workers:
+            self.stuff['leftovers'] += worker.leftovers
+            if worker.exception is not None:
+                raise worker.exception
+            errors += worker.errors
+            for latency in worker.latencies:
+                latencies.add('cycle', latency)
+        cycles = len(latencies['cycle']) if 'cycle' in latencies else 0
+        result = OrderedDict()
+        result['elapsed'] = elapsed
+        result['cycles'] = cycles
+        result['errors'] = errors
+        result['ops_per_sec'] = cycles / elapsed
+        result['error_rate'] = errors / float(max(cycles + errors, 1))
+        result['latency'] = latencies.summary()
+        result['daemon'] = daemon.summary()
+        self.loginfo("%d workers: %0.2f cycles/sec, %d errors", level,
+                     result['ops_per_sec'], errors)
+        return result
+
+    def postprocess(self):
+        super(perf_churn, self).postprocess()
+        keyvals = {}
+        for level, result in self.stuff['results'].iteritems():
+            prefix = 'concurrency_%d' % level
+            for key in ('ops_per_sec', 'error_rate', 'cycles', 'errors'):
+                keyvals['%s_%s' % (prefix, key)] = result[key]
+            for name, section in (('latency', 'cycle'), ('daemon', 'rss_kb'),
+                                  ('daemon', 'fds')):
+                for stat, value in result[name].get(section, {}).iteritems():
+                    keyvals['%s_%s_%s' % (prefix, section, stat)] = value
+        self.write_test_keyval(keyvals)
+        with open(os.path.join(self.resultsdir, 'perf_churn.json'),
+                  'wb') as results:
+            json.dump({'image': self.stuff['fqin'],
+                       'duration': self.config['duration'],
+                       'levels': self.stuff['results']}, results, indent=2)
+        for level, result in self.stuff['results'].iteritems():
+            self.failif(result['error_rate'] > self.config['max_error_rate'],
+                        "Error rate %0.4f with %d workers exceeds %s"
+                        % (result['error_rate'], level,
+                           self.config['max_error_rate']))
+
+    def cleanup(self):
+        super(perf_churn, self).cleanup()
+        if self.config['remove_after_test']:
+            self.stuff['dc'].clean_all(self.stuff['leftovers'])
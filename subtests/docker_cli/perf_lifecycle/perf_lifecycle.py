@@ -0,0 +1,226 @@
+r"""
+Summary
+---------
+
+Measure container life-cycle latency, and fail when it regresses
+
+Operational Summary
+----------------------
+
+#. Perform ``warmup`` un-measured, then ``cycles`` measured life-cycles
+   of a container from the default image.
+#. Record the seconds spent in each phase of every life-cycle.
+#. Report count, min, mean, p50, p90, p99 and max of every phase as
+   test keyvals, and into a ``<subsubtest>.json`` results file.
+#. Fail if any statistic exceeds its configured ``thresholds`` limit.
+
+Operational Detail
+----------------------
+
+Life-cycle
+~~~~~~~~~~~~~
+
+#. ``create``: Duration of ``docker create``
+#. ``start``: From issuing ``docker start --attach`` until the container's
+   ``start`` event arrives from ``docker events``, so it includes event
+   delivery lag.
+#. ``first_output``: From issuing ``docker start --attach`` until the
+   first line of container output arrives.  Both are measured from the
+   same moment, since the ``start`` event often arrives after the
+   output, which would make any difference between them negative.
+#. ``stop``: Duration of ``docker stop``
+#. ``rm``: Duration of ``docker rm``
+
+Run rm
+~~~~~~~~
+
+#. ``first_output``: From issuing ``docker run --rm`` until the first line
+   of container output arrives.
+#. ``run``: Total duration of ``docker run --rm``
+
+Prerequisites
+---------------
+
+*  The ``run_cmd`` commands print a line of output promptly
+"""
+
+import os
+import time
+from dockertest import subtest
+from dockertest.config import get_as_list
+from dockertest.containers import DockerContainers
+from dockertest.dockercmd import AsyncDockerCmd, DockerCmd
+from dockertest.images import DockerImage
+from dockertest.output import TimedLines, mustpass
+from dockertest.performance import Samples, parse_thresholds
+
+
+class perf_lifecycle(subtest.SubSubtestCaller):
+
+    """ Subtest caller """
+
+
+class perf_lifecycle_base(subtest.SubSubtest):
+
+    """
+    Runs life-cycles, reports and checks resulting samples.  Sub-classes
+    define ``lifecycle(samples)``, performing a single life-cycle and
+    recording phase durations into a ``Samples`` instance.
+    """
+
+    def initialize(self):
+        super(perf_lifecycle_base, self).initialize()
+        self.sub_stuff['dc'] = DockerContainers(self)
+        self.sub_stuff['fqin'] = DockerImage.full_name_from_defaults(
+            self.config)
+        self.sub_stuff['containers'] = []
+        self.sub_stuff['samples'] = Samples()
+        # Catch configuration errors before spending time measuring
+        self.sub_stuff['thresholds'] = parse_thresholds(
+            get_as_list(self.config['thresholds'] or ''))
+
+    def run_once(self):
+        super(perf_lifecycle_base, self).run_once()
+        warmup = self.config['warmup']
+        cycles = self.config['cycles']
+        self.loginfo("Performing %d warmup and %d measured life-cycles",
+                     warmup, cycles)
+        for _ in xrange(warmup):
+            self.lifecycle(Samples())
+        for _ in xrange(cycles):
+            self.lifecycle(self.sub_stuff['samples'])
+
+    def postprocess(self):
+        super(perf_lifecycle_base, self).postprocess()
+        samples = self.sub_stuff['samples']
+        for phase, stats in samples.summary().iteritems():
+            self.loginfo("%s: p50 %0.4f p90 %0.4f p99 %0.4f max %0.4f "
+                         "seconds", phase, stats['p50'], stats['p90'],
+                         stats['p99'], stats['max'])
+        self.parent_subtest.write_test_keyval(
+            samples.keyvals(self.__class__.__name__))
+        results = os.path.join(self.parent_subtest.resultsdir,
+                               '%s.json' % self.__class__.__name__)
+        samples.write_json(results,
+                           image=self.sub_stuff['fqin'],
+                           run_cmd=self.config['run_cmd'],
+                           warmup=self.config['warmup'],
+                           thresholds=self.sub_stuff['thresholds'])
+        exceeded = samples.exceeded(self.sub_stuff['thresholds'])
+        self.failif(exceeded, "; ".join(exceeded))
+
+    def cleanup(self):
+        super(perf_lifecycle_base, self).cleanup()
+        if self.config['remove_after_test']:
+            self.sub_stuff['dc'].clean_all(self.sub_stuff['containers'])
+
+    def new_name(self):
+        """Return new unique container name, registered for cleanup"""
+        name = self.sub_stuff['dc'].get_unique_name()
+        self.sub_stuff['containers'].append(name)
+        return name
+
+    def first_line_time(self, timed_lines, dkrcmd):
+        """
+        Return arrival time of first output line, fail after output_timeout
+
+        :param timed_lines: TimedLines instance receiving dkrcmd's stdout
+        :param dkrcmd: (Async)DockerCmd instance producing the output
+        """
+        deadline = time.time() + self.config['output_timeout']
+        while True:
+            lines = timed_lines.wait_past(0, deadline - time.time())
+            if lines:
+                return lines[0][0]
+            self.failif(time.time() >= deadline,
+                        "No output from %s within %s seconds"
+                        % (dkrcmd.command, self.config['output_timeout']))
+
+
+class lifecycle(perf_lifecycle_base):
+
+    """ create, start, first output, stop and rm a container """
+
+    def initialize(self):
+        super(lifecycle, self).initialize()
+        # Start times come from the host's clock, same as issue times
+        timed_lines = TimedLines()
+        events_cmd = AsyncDockerCmd(self, 'events',
+                                    ['--format',
+                                     "'{{.Actor.Attributes.name}}'",
+                                     '--filter', 'type=container',
+                                     '--filter', 'event=start'])
+        events_cmd.stdout_tee = timed_lines
+        events_cmd.execute()
+        self.sub_stuff['events_cmd'] = events_cmd
+        self.sub_stuff['start_events'] = timed_lines
+        # Stream has no output until the first event, make sure it's live
+        self.lifecycle(Samples())
+
+    def cleanup(self):
+        super(lifecycle, self).cleanup()
+        if self.sub_stuff.get('events_cmd') is not None:
+            self.sub_stuff['events_cmd'].wait(timeout=1)
+
+    def start_time(self, name):
+        """
+        Return arrival time of container's start event, fail after
+        output_timeout
+        """
+        timed_lines = self.sub_stuff['start_events']
+        deadline = time.time() + self.config['output_timeout']
+        while True:
+            lines = list(timed_lines.lines)
+            for arrived, line in lines:
+                if line.strip() == name:
+                    return arrived
+            remaining = deadline - time.time()
+            self.failif(remaining <= 0,
+                        "No start event for %s within %s seconds"
+                        % (name, self.config['output_timeout']))
+            timed_lines.wait_past(len(lines), remaining)
+
+    def lifecycle(self, samples):
+        name = self.new_name()
+        subargs = ['--name', name, self.sub_stuff['fqin'],
+                   self.config['run_cmd']]
+        cmdresult = mustpass(DockerCmd(self, 'create', subargs).execute())
+        samples.add('create', cmdresult.duration)
+        timed_lines = TimedLines()
+        attached = AsyncDockerCmd(self, 'start', ['--attach', name])
+        attached.stdout_tee = timed_lines
+        issued = time.time()
+        attached.execute()
+        first_line = self.first_line_time(timed_lines, attached)
+        started = self.start_time(name)
+        # Both from issued, start events may arrive after the first output
+        samples.add('start', started - issued)
+        samples.add('first_output', first_line - issued)
+        cmdresult = mustpass(DockerCmd(self, 'stop',
+                                       ['--time=%d' % self.config['stop_time'],
+                                        name]).execute())
+        samples.add('stop', cmdresult.duration)
+        attached.wait(self.config['output_timeout'])
+        cmdresult = mustpass(DockerCmd(self, 'rm', [name]).execute())
+        samples.add('rm', cmdresult.duration)
+        self.sub_stuff['containers'].remove(name)
+
+
+class run_rm(perf_lifecycle_base):
+
+    """ run --rm a container to completion """
+
+    def lifecycle(self, samples):
+        name = self.new_name()
+        timed_lines = TimedLines()
+        dkrcmd = DockerCmd(self, 'run', ['--rm', '--name', name,
+                                         self.sub_stuff['fqin'],
+                                         self.config['run_cmd']])
+        dkrcmd.stdout_tee = timed_lines
+        issued = time.time()
+        mustpass(dkrcmd.execute())
+        self.failif(not timed_lines.lines,
+                    "No output from %s" % dkrcmd.command)
+        samples.add('first_output', timed_lines.lines[0][0] - issued)
+        samples.add('run', dkrcmd.duration)
+        self.sub_stuff['containers'].remove(name)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Self-contained TCP throughput and connection-setup workload.  Only
+requires python 2.6+ or 3.x, clients print JSON results.
+
+Usage: net_workload.py server <port>
+       net_workload.py client <host> <port> <total_mb> <connects>
+"""
+
+import json
+import socket
+import sys
+import time
+
+#: Size of each send/receive request
+CHUNK_SIZE = 65536
+
+
+def server(port):
+    """Serve forever, replying to each connection with bytes received"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('', port))
+    listener.listen(128)
+    sys.stdout.write('READY\n')
+    sys.stdout.flush()
+    while True:
+        connection = listener.accept()[0]
+        received = 0
+        data = connection.recv(CHUNK_SIZE)
+        while data:
+            received += len(data)
+            data = connection.recv(CHUNK_SIZE)
+        connection.sendall(('%d\n' % received).encode('ascii'))
+        connection.close()
+
+
+def exchange(host, port, payload, count):
+    """Send count payloads in one connection, return bytes server received"""
+    connection = socket.create_connection((host, port))
+    try:
+        for _ in range(count):
+            connection.sendall(payload)
+        connection.shutdown(socket.SHUT_WR)
+        reply = b''
+        data = connection.recv(CHUNK_SIZE)
+        while data:
+            reply += data
+            data = connection.recv(CHUNK_SIZE)
+    finally:
+        connection.close()
+    return int(reply.decode('ascii'))
+
+
+def client(host, port, total_mb, connects):
+    """Return dictionary of connection-setup times and throughput"""
+    connect_seconds = []
+    for _ in range(connects):
+        start = time.time()
+        exchange(host, port, b'', 0)
+        connect_seconds.append(time.time() - start)
+    count = total_mb * 1024 * 1024 // CHUNK_SIZE
+    start = time.time()
+    received = exchange(host, port, b'x' * CHUNK_SIZE, count)
+    elapsed = time.time() - start
+    if received != count * CHUNK_SIZE:
+        raise ValueError("Server received %d of %d bytes"
+                         % (received, count * CHUNK_SIZE))
+    return {'connect_seconds': connect_seconds,
+            'bytes': received,
+            'mb_per_sec': received / 1048576.0 / elapsed}
+
+
+if __name__ == '__main__':
+    if sys.argv[1] == 'server':
+        server(int(sys.argv[2]))
+    else:
+        RESULT = client(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]),
+                        int(sys.argv[5]))
+        sys.stdout.write(json.dumps(RESULT) + '\n')
@@ -0,0 +1,158 @@
+r"""
+Summary
+---------
+
+Measure container-to-container TCP throughput and connection-setup
+latency, for each networking mode.
+
+Operational Summary
+----------------------
+
+#. For each of the ``net_modes``, start a server container running
+   ``net_workload.py``:
+
+   #. ``bridge``: Server and client on the default bridge, client
+      connects to the server container's IP address.
+   #. ``host``: Server and client both use ``--net=host``, client
+      connects to the loopback address.
+   #. ``container``: Client uses ``--net=container:<server>``,
+      connecting to the shared loopback address.
+
+#. ``repeats`` times, run a client container which times ``connects``
+   empty connections, then pushes ``transfer_mb`` through one connection.
+#. Report connection-setup percentiles and MB/s of every mode as keyvals
+   and in a ``perf_network.json`` results file.
+
+Prerequisites
+---------------
+
+*  The test image contains a python 2.6+ or 3.x interpreter, named
+   by one of ``python_names``.
+*  Nothing on the host is listening on ``port`` (for ``host`` mode).
+*  No external network access is needed.
+"""
+
+import json
+import os
+import shutil
+from collections import OrderedDict
+from dockertest import subtest
+from dockertest.config import get_as_list
+from dockertest.containers import DockerContainers
+from dockertest.dockercmd import AsyncDockerCmd, DockerCmd
+from dockertest.images import DockerImage
+from dockertest.output import mustpass, wait_for_output
+from dockertest.performance import Samples
+
+
+class perf_network(subtest.Subtest):
+
+    #: Workload script, copied into a directory mounted by containers
+    script = 'net_workload.py'
+
+    def initialize(self):
+        super(perf_network, self).initialize()
+        self.stuff['dc'] = DockerContainers(self)
+        self.stuff['fqin'] = DockerImage.full_name_from_defaults(self.config)
+        self.stuff['workload_dir'] = os.path.join(self.tmpdir, 'workload')
+        if not os.path.isdir(self.stuff['workload_dir']):
+            os.makedirs(self.stuff['workload_dir'])
+        shutil.copy(os.path.join(self.bindir, self.script),
+                    self.stuff['workload_dir'])
+        self.stuff['containers'] = []
+        self.stuff['results'] = OrderedDict()
+
+    def workload_subargs(self, net_args, script_args):
+        """Return ``docker run`` subargs running workload with script_args"""
+        finds = ' '.join(get_as_list(self.config['python_names']))
+        command = ("sh -c 'for p in %s; do command -v $p > /dev/null && "
+                   "exec $p /workload/%s %s; done; exit 127'"
+                   % (finds, self.script, script_args))
+        return net_args + ['--volume',
+                           '%s:/workload:Z' % self.stuff['workload_dir'],
+                           self.stuff['fqin'], command]
+
+    def start_server(self, net_args):
+        """Return name of started server container, once it's listening"""
+        name = self.stuff['dc'].get_unique_name()
+        self.stuff['containers'].append(name)
+        subargs = ['--name', name]
+        subargs += self.workload_subargs(net_args,
+                                         'server %d' % self.config['port'])
+        server = AsyncDockerCmd(self, 'run', subargs)
+        server.execute()
+        self.failif(not wait_for_output(lambda: server.stdout, 'READY',
+                                        timeout=self.config['docker_timeout']),
+                    "Server never became ready: %s" % server)
+        return name
+
+    def server_address(self, mode, name):
+        """Return address the client uses to reach server name in mode"""
+        if mode != 'bridge':
+            return '127.0.0.1'
+        dkrcmd = DockerCmd(self, 'inspect',
+                           ['--format', '{{.NetworkSettings.IPAddress}}',
+                            name])
+        return mustpass(dkrcmd.execute()).stdout.strip()
+
+    def run_client(self, net_args, address):
+        """Return results dictionary from running client container once"""
+        script_args = "client %s %d %d %d" % (address, self.config['port'],
+                                              self.config['transfer_mb'],
+                                              self.config['connects'])
+        subargs = ['--rm'] + self.workload_subargs(net_args, script_args)
+        dkrcmd = DockerCmd(self, 'run', subargs,
+                           timeout=self.config['transfer_timeout'])
+        return json.loads(mustpass(dkrcmd.execute()).stdout)
+
+    def measure(self, mode):
+        """Return results dictionary from measuring networking mode"""
+        if mode == 'host':
+            server_args = client_args = ['--net=host']
+        else:
+            server_args = client_args = []
+        name = self.start_server(server_args)
+        if mode == 'container':
+            client_args = ['--net=container:%s' % name]
+        address = self.server_address(mode, name)
+        samples = Samples()
+        rates = []
+        try:
+            for _ in xrange(self.config['repeats']):
+                result = self.run_client(client_args, address)
+                for seconds in result['connect_seconds']:
+                    samples.add('connect', seconds)
+                rates.append(result['mb_per_sec'])
+        finally:
+            DockerCmd(self, 'rm', ['--force', name]).execute()
+        return samples.as_dict(mb_per_sec=sorted(rates)[len(rates) // 2],
+                               mb_per_sec_samples=rates)
+
+    def run_once(self):
+        super(perf_network, self).run_once()
+        for mode in get_as_list(self.config['net_modes']):
+            self.loginfo("Measuring %s networking", mode)
+            self.stuff['results'][mode] = self.measure(mode)
+
+    def postprocess(self):
+        super(perf_network, self).postprocess()
+        keyvals = {}
+        for mode, result in self.stuff['results'].iteritems():
+            stats = result['summary']['connect']
+            self.loginfo("%s: %0.2f MB/s, connect p50 %0.6f p99 %0.6f "
+                         "seconds", mode, result['mb_per_sec'], stats['p50'],
+                         stats['p99'])
+            keyvals['%s_mb_per_sec' % mode] = result['mb_per_sec']
+            for stat, value in stats.iteritems():
+                keyvals['%s_connect_%s' % (mode, stat)] = value
+        self.write_test_keyval(keyvals)
+        with open(os.path.join(self.resultsdir, 'perf_network.json'),
+                  'wb') as results:
+            json.dump({'image': self.stuff['fqin'],
+                       'transfer_mb': self.config['transfer_mb'],
+                       'modes': self.stuff['results']}, results, indent=2)
+
+    def cleanup(self):
+        super(perf_network, self).cleanup()
+        if self.config['remove_after_test']:
+            self.stuff['dc'].clean_all(self.stuff['containers'])
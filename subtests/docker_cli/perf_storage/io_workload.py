@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Self-contained filesystem I/O workload, run both inside and outside of
+containers.  Only requires python 2.6+ or 3.x, prints JSON results.
+
+Usage: io_workload.py <directory> <size_mb> <ops>
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import random
+import sys
+import time
+
+#: Size of each sequential I/O request
+BLOCK_SIZE = 1024 * 1024
+
+#: Size of each random I/O request
+PAGE_SIZE = 4096
+
+#: Linux value of POSIX_FADV_DONTNEED, for python without os.posix_fadvise
+POSIX_FADV_DONTNEED = 4
+
+
+def seq_write(path, size_mb, ops):
+    """Write size_mb MB sequentially, then fsync, return MB/sec"""
+    block = os.urandom(BLOCK_SIZE)
+    start = time.time()
+    fdesc = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        for _ in range(size_mb):
+            os.write(fdesc, block)
+        os.fsync(fdesc)
+    finally:
+        os.close(fdesc)
+    return size_mb / (time.time() - start)
+
+
+def drop_cache(fdesc):
+    """Write out, then evict all of fdesc's file pages from the page cache"""
+    os.fsync(fdesc)
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fdesc, 0, 0, os.POSIX_FADV_DONTNEED)
+        return
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    # Only libc without posix_fadvise64 (e.g. musl) has a 64bit off_t
+    fadvise = getattr(libc, 'posix_fadvise64', None) or libc.posix_fadvise
+    fadvise.argtypes = [ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong,
+                        ctypes.c_int]
+    # Returns the error number, rather than setting errno
+    result = fadvise(fdesc, 0, 0, POSIX_FADV_DONTNEED)
+    if result:
+        raise OSError(result, os.strerror(result))
+
+
+def seq_read(path, size_mb, ops):
+    """Read seq_write()'s file sequentially from disk, return MB/sec"""
+    fdesc = os.open(path, os.O_RDONLY)
+    try:
+        # Otherwise this only measures reading seq_write()'s cached pages
+        drop_cache(fdesc)
+        start = time.time()
+        while os.read(fdesc, BLOCK_SIZE):
+            pass
+        elapsed = time.time() - start
+    finally:
+        os.close(fdesc)
+    return size_mb / elapsed
+
+
+def rand_4k(path, size_mb, ops):
+    """Alternate ops random 4k reads and writes, then fsync, return ops/sec"""
+    pages = size_mb * BLOCK_SIZE // PAGE_SIZE
+    page = os.urandom(PAGE_SIZE)
+    rnd = random.Random(0)
+    start = time.time()
+    fdesc = os.open(path, os.O_RDWR)
+    try:
+        for number in range(ops):
+            os.lseek(fdesc, rnd.randrange(pages) * PAGE_SIZE, os.SEEK_SET)
+            if number % 2:
+                os.write(fdesc, page)
+            else:
+                os.read(fdesc, PAGE_SIZE)
+        os.fsync(fdesc)
+    finally:
+        os.close(fdesc)
+    return ops / (time.time() - start)
+
+
+def fsync_heavy(path, size_mb, ops):
+    """Append ops 4k pages, each followed by fsync, return ops/sec"""
+    page = os.urandom(PAGE_SIZE)
+    start = time.time()
+    fdesc = os.open(path + '.fsync', os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+                    0o644)
+    try:
+        for _ in range(ops):
+            os.write(fdesc, page)
+            os.fsync(fdesc)
+    finally:
+        os.close(fdesc)
+        os.unlink(path + '.fsync')
+    return ops / (time.time() - start)
+
+
+def metadata_heavy(path, size_mb, ops):
+    """Create, stat and unlink ops empty files, return ops/sec"""
+    dirpath = path + '.d'
+    os.mkdir(dirpath)
+    names = [os.path.join(dirpath, str(number)) for number in range(ops)]
+    start = time.time()
+    for name in names:
+        os.close(os.open(name, os.O_WRONLY | os.O_CREAT, 0o644))
+    for name in names:
+        os.stat(name)
+    for name in names:
+        os.unlink(name)
+    elapsed = time.time() - start
+    os.rmdir(dirpath)
+    return ops / elapsed
+
+
+#: Workloads in execution order (seq_read and rand_4k need seq_write's file)
+WORKLOADS = (('seq_write', seq_write, 'mb_per_sec'),
+             ('seq_read', seq_read, 'mb_per_sec'),
+             ('rand_4k', rand_4k, 'ops_per_sec'),
+             ('fsync_heavy', fsync_heavy, 'ops_per_sec'),
+             ('metadata_heavy', metadata_heavy, 'ops_per_sec'))
+
+
+def main(directory, size_mb, ops):
+    """Run every workload in directory, return results dictionary"""
+    path = os.path.join(directory, 'io_workload.%d' % os.getpid())
+    results = {}
+    try:
+        for name, workload, unit in WORKLOADS:
+            results[name] = {unit: workload(path, size_mb, ops)}
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+    return results
+
+
+if __name__ == '__main__':
+    sys.stdout.write(json.dumps(main(sys.argv[1], int(sys.argv[2]),
+                                     int(sys.argv[3]))) + '\n')
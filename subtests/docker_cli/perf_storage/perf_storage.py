@@ -0,0 +1,153 @@
+r"""
+Summary
+---------
+
+Compare filesystem I/O performance inside and outside of containers
+
+Operational Summary
+----------------------
+
+#. Record the storage driver reported by ``docker info``.
+#. Run the ``io_workload.py`` sequential write/read, random 4k,
+   fsync-heavy and metadata-heavy workloads ``repeats`` times each in:
+
+   #. ``rootfs``: The container's root filesystem
+   #. ``volume``: A host directory bind-mounted into the container
+   #. ``host``: The same host directory, outside of any container
+
+   The sequential read first evicts the written file from the page
+   cache, so it measures the storage rather than memory.
+
+#. Report the median result of every workload and location, and each
+   container location's ratio to ``host``, as keyvals and in a
+   ``perf_storage.json`` results file.
+
+Prerequisites
+---------------
+
+*  The test image contains a python 2.6+ or 3.x interpreter, named
+   by one of ``python_names``.
+*  Enough space for ``size_mb`` in the container rootfs and host tmpdir.
+"""
+
+import json
+import os
+import shutil
+import sys
+from collections import OrderedDict
+from autotest.client import utils
+from dockertest import subtest
+from dockertest.config import get_as_list
+from dockertest.dockercmd import DockerCmd
+from dockertest.images import DockerImage
+from dockertest.output import DockerInfo, mustpass
+from dockertest.performance import summarize
+
+
+class perf_storage(subtest.Subtest):
+
+    #: Workload script, copied into a directory mounted by containers
+    script = 'io_workload.py'
+
+    #: Location name to directory inside container, ``None`` for host
+    locations = OrderedDict((('rootfs', '/var/tmp'),
+                             ('volume', '/volume'),
+                             ('host', None)))
+
+    def initialize(self):
+        super(perf_storage, self).initialize()
+        self.stuff['fqin'] = DockerImage.full_name_from_defaults(self.config)
+        self.stuff['storage_driver'] = DockerInfo().get('Storage Driver')
+        self.stuff['workload_dir'] = os.path.join(self.tmpdir, 'workload')
+        self.stuff['volume_dir'] = os.path.join(self.tmpdir, 'volume')
+        for dirpath in (self.stuff['workload_dir'], self.stuff['volume_dir']):
+            if not os.path.isdir(dirpath):
+                os.makedirs(dirpath)
+        shutil.copy(os.path.join(self.bindir, self.script),
+                    self.stuff['workload_dir'])
+        # location -> workload -> unit -> list of values
+        self.stuff['raw'] = OrderedDict()
+
+    def workload_args(self, directory):
+        """Return workload script arguments to run in directory"""
+        return "%s %d %d" % (directory, self.config['size_mb'],
+                             self.config['ops'])
+
+    def run_container(self, directory):
+        """Return workload results from running in container directory"""
+        finds = ' '.join(get_as_list(self.config['python_names']))
+        command = ("sh -c 'for p in %s; do command -v $p > /dev/null && "
+                   "exec $p /workload/%s %s; done; exit 127'"
+                   % (finds, self.script, self.workload_args(directory)))
+        subargs = ['--rm',
+                   '--volume', '%s:/workload:Z' % self.stuff['workload_dir'],
+                   '--volume', '%s:/volume:Z' % self.stuff['volume_dir'],
+                   self.stuff['fqin'], command]
+        dkrcmd = DockerCmd(self, 'run', subargs,
+                           timeout=self.config['workload_timeout'])
+        return json.loads(mustpass(dkrcmd.execute()).stdout)
+
+    def run_host(self):
+        """Return workload results from running on host, in volume_dir"""
+        command = "%s %s %s" % (sys.executable,
+                                os.path.join(self.stuff['workload_dir'],
+                                             self.script),
+                                self.workload_args(self.stuff['volume_dir']))
+        return json.loads(utils.run(command,
+                                    timeout=self.config['workload_timeout'],
+                                    verbose=False).stdout)
+
+    def run_once(self):
+        super(perf_storage, self).run_once()
+        self.loginfo("Measuring I/O with %s storage driver",
+                     self.stuff['storage_driver'])
+        for _ in xrange(self.config['repeats']):
+            for location, directory in self.locations.iteritems():
+                if directory is None:
+                    results = self.run_host()
+                else:
+                    results = self.run_container(directory)
+                raw = self.stuff['raw'].setdefault(location, OrderedDict())
+                for workload, result in sorted(results.iteritems()):
+                    for unit, value in result.iteritems():
+                        raw.setdefault(workload, {}).setdefault(unit, [])
+                        raw[workload][unit].append(value)
+
+    def medians(self):
+        """Return dict of location -> workload -> unit -> median value"""
+        medians = OrderedDict()
+        for location, workloads in self.stuff['raw'].iteritems():
+            medians[location] = OrderedDict()
+            for workload, units in workloads.iteritems():
+                medians[location][workload] = dict(
+                    (unit, summarize(values)['p50'])
+                    for unit, values in units.iteritems())
+        return medians
+
+    def postprocess(self):
+        super(perf_storage, self).postprocess()
+        medians = self.medians()
+        host = medians['host']
+        ratios = OrderedDict()
+        keyvals = {'storage_driver': self.stuff['storage_driver']}
+        for location, workloads in medians.iteritems():
+            ratios[location] = OrderedDict()
+            for workload, units in workloads.iteritems():
+                for unit, value in units.iteritems():
+                    ratio = value / host[workload][unit]
+                    ratios[location][workload] = ratio
+                    keyvals['%s_%s_%s' % (location, workload, unit)] = value
+                    keyvals['%s_%s_ratio' % (location, workload)] = ratio
+                    if location != 'host':
+                        self.loginfo("%s %s: %0.2f %s (%0.2f of host)",
+                                     location, workload, value, unit, ratio)
+        self.write_test_keyval(keyvals)
+        with open(os.path.join(self.resultsdir, 'perf_storage.json'),
+                  'wb') as results:
+            json.dump({'storage_driver': self.stuff['storage_driver'],
+                       'image': self.stuff['fqin'],
+                       'size_mb': self.config['size_mb'],
+                       'ops': self.config['ops'],
+                       'samples': self.stuff['raw'],
+                       'medians': medians,
+                       'ratios': ratios}, results, indent=2)
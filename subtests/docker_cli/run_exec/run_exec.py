@@ -13,6 +13,22 @@ Operational Summary
 #.  Verify expected result from above step
 #.  Cleanup shell container
 
+Operational Detail
+----------------------
+
+Exec benchmark
+~~~~~~~~~~~~~~~~~
+
+Not run by default, add ``exec_benchmark`` to ``subsubtests`` to enable.
+
+#.  Time ``serial_execs`` of ``exec_cmd``, one after another, into the
+    idling container.
+#.  Time ``parallel_execs`` of ``exec_cmd``, spread across ``concurrency``
+    simultaneous threads, into the same container.
+#.  Report latency percentiles, successful execs per second and failures
+    as keyvals and in ``exec_benchmark.json``.
+#.  Fail on more than ``max_failures``, or exceeded ``thresholds``.
+
 Prerequisites
 ---------------
 
@@ -23,6 +39,7 @@ Prerequisites
 
 
 import os
+import threading
 import time
 from dockertest.subtest import SubSubtest, SubSubtestCaller
 from dockertest.dockercmd import AsyncDockerCmd
@@ -37,6 +54,7 @@ from dockertest.output import OutputGood
 from dockertest.output import OutputNotBad
 from dockertest.output import wait_for_output
 from dockertest.config import get_as_list
+from dockertest.performance import Samples, parse_thresholds
 
 
 class run_exec(SubSubtestCaller):
@@ -174,3 +192,93 @@ class exec_pid_count(exec_base):
         expected = self.config["pid_count"]
         self.failif_ne(len(pids), expected, "Number of pids: %s" % pids)
         super(exec_pid_count, self).postprocess()
+
+
+class exec_benchmark(exec_base):
+
+    def initialize(self):
+        super(exec_benchmark, self).initialize()
+        self.sub_stuff['samples'] = Samples()
+        self.sub_stuff['failures'] = []
+        self.sub_stuff['rates'] = {}
+        # Catch configuration errors before spending time measuring
+        self.sub_stuff['thresholds'] = parse_thresholds(
+            get_as_list(self.config['thresholds'] or ''))
+
+    def exec_timed(self, phase, count):
+        """
+        Execute exec_cmd count times, recording each duration in phase.
+        Also runs in threads, so any exception counts as a failure.
+        """
+        subargs = self.sub_stuff['exec_args'] + [self.config['exec_cmd']]
+        for _ in xrange(count):
+            dkrcmd_exec = DockerCmd(self, 'exec', subargs, timeout=60)
+            dkrcmd_exec.quiet = True
+            dkrcmd_exec.verbose = False
+            try:
+                cmdresult = dkrcmd_exec.execute()
+            # e.g. CmdError from timeout
+            except Exception, xcept:  # pylint: disable=W0703
+                self.sub_stuff['failures'].append("%s: %s"
+                                                  % (dkrcmd_exec.command,
+                                                     xcept))
+                continue
+            if cmdresult.exit_status == 0:
+                self.sub_stuff['samples'].add(phase, cmdresult.duration)
+            else:
+                self.sub_stuff['failures'].append(str(cmdresult))
+
+    def run_once(self):
+        super(exec_benchmark, self).run_once()
+        rates = self.sub_stuff['rates']
+        serial_execs = self.config['serial_execs']
+        start = time.time()
+        self.exec_timed('serial', serial_execs)
+        rates['serial'] = self.completed_rate('serial', time.time() - start)
+        concurrency = self.config['concurrency']
+        parallel_execs = self.config['parallel_execs']
+        self.loginfo("Executing %d serial, then %d execs across %d threads",
+                     serial_execs, parallel_execs, concurrency)
+        each, remainder = divmod(parallel_execs, concurrency)
+        threads = [threading.Thread(target=self.exec_timed,
+                                    args=('parallel',
+                                          each + int(number < remainder)))
+                   for number in xrange(concurrency)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        rates['parallel'] = self.completed_rate('parallel',
+                                                time.time() - start)
+
+    def completed_rate(self, phase, seconds):
+        """Return successful execs per second of phase"""
+        samples = self.sub_stuff['samples']
+        completed = len(samples[phase]) if phase in samples else 0
+        return completed / max(seconds, 0.000001)
+
+    def postprocess(self):
+        samples = self.sub_stuff['samples']
+        rates = self.sub_stuff['rates']
+        failures = self.sub_stuff['failures']
+        for phase, stats in samples.summary().iteritems():
+            self.loginfo("%s: %0.2f execs/sec, p50 %0.4f p99 %0.4f seconds",
+                         phase, rates[phase], stats['p50'], stats['p99'])
+        keyvals = samples.keyvals('exec_benchmark')
+        for phase, rate in rates.iteritems():
+            keyvals['exec_benchmark_%s_per_sec' % phase] = rate
+        keyvals['exec_benchmark_failures'] = len(failures)
+        self.parent_subtest.write_test_keyval(keyvals)
+        results = os.path.join(self.parent_subtest.resultsdir,
+                               'exec_benchmark.json')
+        samples.write_json(results, exec_cmd=self.config['exec_cmd'],
+                           concurrency=self.config['concurrency'],
+                           rates=rates, failures=failures)
+        self.failif(len(failures) > self.config['max_failures'],
+                    "%d of %d execs failed, first: %s"
+                    % (len(failures), self.config['serial_execs'] +
+                       self.config['parallel_execs'], failures[:1]))
+        exceeded = samples.exceeded(self.sub_stuff['thresholds'])
+        self.failif(exceeded, "; ".join(exceeded))
+        super(exec_benchmark, self).postprocess()
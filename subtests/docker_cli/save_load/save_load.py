@@ -10,15 +10,43 @@ Operational Summary
 #.  Prepare image, save it, remove it, load it back again.
 #.  Test simultaneous loading of multiple images in parallel.
 #.  Check results
+
+Operational Detail
+----------------------
+
+Streaming
+~~~~~~~~~~~
+
+Not run by default, add ``streaming`` to ``subsubtests`` to enable it.
+
+#.  For the default image, and every locally present ``stream_images``
+    image, ``stream_repeats`` times:
+
+    #.  Time ``docker save -o`` into a file, then ``docker load -i``
+        from it.
+    #.  Time ``docker save`` piped directly into ``docker load``.
+
+#.  Report durations and MB/s (of the median duration) as keyvals and
+    in ``save_load_streaming.json``.
+
+Since the images are never removed, ``docker load`` reads and verifies
+the entire stream but does not extract layers which are already present.
+Both variants are affected equally, so they remain comparable.  No
+network access is required.
 """
 
+import os
+from collections import OrderedDict
 from autotest.client import utils
 from autotest.client.shared import error
 from dockertest import subtest
+from dockertest.config import get_as_list
 from dockertest.containers import DockerContainers
-from dockertest.dockercmd import DockerCmd
+from dockertest.dockercmd import DockerCmd, PipedDockerCmd
 from dockertest.images import DockerImage, DockerImages
-from dockertest.output import OutputGood
+from dockertest.output import OutputGood, mustpass
+from dockertest.performance import Samples, present_images
+from dockertest.performance import report_transfers, transfer_result
 from dockertest.subtest import SubSubtest
 
 
@@ -61,12 +89,9 @@ class save_load_base(SubSubtest):
 
     def cleanup(self):
         super(save_load_base, self).cleanup()
-        # Auto-converts "yes/no" to a boolean
-        if self.config['remove_after_test']:
-            dc = self.sub_stuff['cont']
-            dc.clean_all(self.sub_stuff["containers"])
-            di = self.sub_stuff['img']
-            di.clean_all(self.sub_stuff["images"])
+        # Removed in bulk by parent, unless remove_after_test is false
+        self.defer_cleanup('container', *self.sub_stuff["containers"])
+        self.defer_cleanup('image', *self.sub_stuff["images"])
 
 
 class simple(save_load_base):
@@ -164,3 +189,47 @@ class simple(save_load_base):
         img_name = self.sub_stuff["rand_name"]
         images = self.sub_stuff["img"].list_imgs_with_full_name(img_name)
         self.failif(images == [], "Unable to find loaded image.")
+
+
+class streaming(save_load_base):
+
+    """ Compare save/load throughput through a pipe and through a file """
+
+    def initialize(self):
+        super(streaming, self).initialize()
+        di = self.sub_stuff['img']
+        self.sub_stuff['fqins'] = present_images(
+            self, di, get_as_list(self.config['stream_images']))
+        self.sub_stuff['results'] = OrderedDict()
+
+    def timed(self, samples, phase, subcmd, subargs, piped=False):
+        """Execute docker subcmd with subargs, recording duration in phase"""
+        if piped:  # Either end of the pipe failing fails the command
+            dkrcmd_class = PipedDockerCmd
+        else:
+            dkrcmd_class = DockerCmd
+        dkrcmd = dkrcmd_class(self, subcmd, subargs,
+                              timeout=self.config['docker_save_load_timeout'])
+        samples.add(phase, mustpass(dkrcmd.execute()).duration)
+
+    def run_once(self):
+        super(streaming, self).run_once()
+        archive = os.path.join(self.tmpdir, 'image.tar')
+        load_command = DockerCmd(self, 'load').command
+        for fqin in self.sub_stuff['fqins']:
+            self.loginfo("Measuring save/load of %s", fqin)
+            samples = Samples()
+            for _ in xrange(self.config['stream_repeats']):
+                self.timed(samples, 'save_disk', 'save', ['-o', archive, fqin])
+                self.timed(samples, 'load_disk', 'load', ['-i', archive])
+                self.timed(samples, 'save_load_pipe', 'save',
+                           [fqin, '|', load_command], piped=True)
+            size = os.path.getsize(archive)
+            os.unlink(archive)
+            self.sub_stuff['results'][fqin] = transfer_result(samples,
+                                                              size)
+
+    def postprocess(self):
+        super(streaming, self).postprocess()
+        report_transfers(self, self.sub_stuff['results'],
+                         'save_load_streaming.json')
@@ -34,7 +34,8 @@ systemd run
 #. Edit unitfile ``p4321.service`` and copy to ``/etc/systemd/system``
 #. Edit ``Dockerfile`` and copy to test temporary directory
 #. Copy a script ``p4321-server.py`` to test temporary directory
-#. Built an image using the Dockerfile and script
+#. Built an image using the Dockerfile and script, or re-use it from the
+   build cache when neither changed
 #. Systemd starts a container using this image
 #. The container writes current time to port ``4321``.
 #. From host, the socket is read and the value is checked
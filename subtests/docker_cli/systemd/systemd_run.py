@@ -7,8 +7,7 @@ import time
 import socket
 from autotest.client import utils
 from autotest.client.shared.utils import is_port_free
-from dockertest.dockercmd import DockerCmd
-from dockertest.output import mustpass
+from dockertest import buildcache
 from dockertest.xceptions import DockerTestError
 from systemd import systemd_base
 
@@ -17,10 +16,8 @@ class systemd_run(systemd_base):
 
     def initialize(self):
         super(systemd_run, self).initialize()
-        # build image using edited Dockerfile in tmpdir
-        dkrcmd = DockerCmd(self, 'build', [self.config['build_opt'],
-                                           self.tmpdir])
-        mustpass(dkrcmd.execute())
+        # build (or re-use) image using edited Dockerfile in tmpdir
+        buildcache.build(self, self.tmpdir, [self.config['build_opt']])
 
     def postprocess(self):
         super(systemd_run, self).postprocess()